@@ -0,0 +1,35 @@
+"""Benchmarks for the time it takes to ``import ndcsv``"""
+
+import subprocess
+import sys
+
+
+class Import:
+    """Time to import ndcsv in a fresh interpreter, with and without the
+    first access to read_csv, which imports pandas and xarray
+    """
+
+    def timeraw_import_ndcsv(self):
+        return "import ndcsv"
+
+    def timeraw_import_read_csv(self):
+        return "from ndcsv import read_csv"
+
+    def track_importtime(self):
+        """Cumulative time of ``import ndcsv``, in microseconds, as reported
+        by ``python -X importtime``
+        """
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import ndcsv"],
+            capture_output=True,
+            check=True,
+            text=True,
+        )
+        for line in proc.stderr.splitlines():
+            # import time: self [us] | cumulative | imported package
+            _, cumulative, package = line.split("|")
+            if package.strip() == "ndcsv":
+                return int(cumulative)
+        raise AssertionError(proc.stderr)  # pragma: nocover
+
+    track_importtime.unit = "us"  # type: ignore[attr-defined]
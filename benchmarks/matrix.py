@@ -0,0 +1,169 @@
+"""Time and peak memory of :func:`ndcsv.read_csv` and :func:`ndcsv.write_csv`
+across a matrix of dimensionality, layouts, coords, and compression.
+
+All benchmarks read and write actual files in a temporary directory, so that
+compression and the file system are included in the measures.
+"""
+
+from __future__ import annotations
+
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+import xarray
+
+from ndcsv import read_csv, write_csv
+
+COMPRESSIONS = ["", ".gz", ".bz2", ".xz"]
+
+
+def _coord(kind: str, size: int, name: str) -> np.ndarray | pd.Index:
+    """Generate labels of the given kind for a dimension"""
+    if kind == "int":
+        return np.arange(size)
+    if kind == "float":
+        return np.arange(size) * 0.25
+    if kind == "str":
+        return np.array([f"{name}{i}" for i in range(size)])
+    if kind == "datetime":
+        return pd.date_range("2000-01-01", periods=size)
+    raise ValueError(kind)  # pragma: nocover
+
+
+def _array(shape: tuple[int, ...], kind: str = "int") -> xarray.DataArray:
+    """Random floats with dims d0, d1, ... and coords of the given kind"""
+    dims = [f"d{i}" for i in range(len(shape))]
+    rng = np.random.default_rng(0)
+    return xarray.DataArray(
+        rng.standard_normal(shape),
+        dims=dims,
+        coords={dim: _coord(kind, size, dim) for dim, size in zip(dims, shape)},
+    )
+
+
+class _Matrix:
+    """Write the array returned by the ``array(*params)`` method of the
+    subclass to a file in setup; then measure reading it back and writing it
+    again.
+    """
+
+    compression = ""
+
+    def setup(self, *params):
+        self.tmpdir = tempfile.mkdtemp()
+        self.data = self.array(*params)
+        self.fname = os.path.join(self.tmpdir, "bench.csv" + self.compression)
+        self.out_fname = os.path.join(self.tmpdir, "out.csv" + self.compression)
+        write_csv(self.data, self.fname)
+
+    def teardown(self, *params):
+        shutil.rmtree(self.tmpdir)
+
+    def time_read_csv(self, *params):
+        read_csv(self.fname)
+
+    def time_write_csv(self, *params):
+        write_csv(self.data, self.out_fname)
+
+    def peakmem_read_csv(self, *params):
+        read_csv(self.fname)
+
+    def peakmem_write_csv(self, *params):
+        write_csv(self.data, self.out_fname)
+
+    def track_file_size(self, *params):
+        return os.stat(self.fname).st_size
+
+    track_file_size.unit = "bytes"  # type: ignore[attr-defined]
+
+
+#: Shapes of 0 to 6 dimensions with 2**16 elements each
+SHAPES = {
+    0: (),
+    1: (2**16,),
+    2: (2**12, 2**4),
+    3: (2**8, 2**4, 2**4),
+    4: (2**4, 2**4, 2**4, 2**4),
+    5: (2**4, 2**3, 2**3, 2**3, 2**4),
+    6: (2**2, 2**2, 2**3, 2**3, 2**3, 2**4),
+}
+
+
+class Dimensions(_Matrix):
+    """0-D to 6-D arrays, plain and compressed.
+    3+ dimensions are stacked on the rows, which is the most common layout.
+    """
+
+    params = (list(SHAPES), COMPRESSIONS)
+    param_names = ["ndim", "compression"]
+
+    def setup(self, ndim, compression):
+        self.compression = compression
+        super().setup(ndim, compression)
+
+    def array(self, ndim, compression):
+        a = _array(SHAPES[ndim])
+        if ndim > 2:
+            a = a.stack(rows=a.dims[:-1]).transpose("rows", a.dims[-1])
+        return a
+
+
+#: Sizes of a 4-D array with 100k elements that yield long or wide files,
+#: depending on the layout
+LAYOUT_SHAPES = {
+    "long": (2000, 5, 5, 2),
+    "wide": (2, 5, 5, 2000),
+}
+
+
+class Layouts(_Matrix):
+    """The layouts documented in :doc:`format`, on long and wide files"""
+
+    params = (
+        ["flat", "plain", "rows", "columns", "rows_and_columns"],
+        list(LAYOUT_SHAPES),
+    )
+    param_names = ["layout", "shape"]
+
+    def array(self, layout, shape):
+        a = _array(LAYOUT_SHAPES[shape])
+        if layout == "flat":
+            # 1-D with MultiIndex
+            return a.stack(rows=["d0", "d1", "d2", "d3"])
+        if layout == "plain":
+            # 2-D without MultiIndex
+            a = a.stack(rows=["d0", "d1"], columns=["d2", "d3"])
+            return a.reset_index(["rows", "columns"], drop=True)
+        if layout == "rows":
+            return a.stack(rows=["d0", "d1", "d2"]).transpose("rows", "d3")
+        if layout == "columns":
+            return a.stack(columns=["d1", "d2", "d3"])
+        assert layout == "rows_and_columns"
+        return a.stack(rows=["d0", "d1"], columns=["d2", "d3"])
+
+
+class Coords(_Matrix):
+    """Numeric, string, and datetime coords on the rows or on the columns"""
+
+    params = (["int", "float", "str", "datetime"], ["rows", "columns"])
+    param_names = ["kind", "axis"]
+
+    def array(self, kind, axis):
+        a = _array((10_000, 10), kind)
+        return a if axis == "rows" else a.T
+
+
+class NonIndexCoords(_Matrix):
+    """Non-index coords on a dimension on the rows or on the columns"""
+
+    params = (["rows", "columns"], [0, 1, 3])
+    param_names = ["axis", "ncoords"]
+
+    def array(self, axis, ncoords):
+        a = _array((10_000, 10))
+        dim = "d0" if axis == "rows" else "d1"
+        labels = a.coords[dim].values.astype(str)
+        return a.assign_coords({f"c{i}": (dim, labels) for i in range(ncoords)})
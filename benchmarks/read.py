@@ -0,0 +1,152 @@
+"""Benchmarks for :func:`ndcsv.read_csv`"""
+
+import io
+import os
+import shutil
+import tempfile
+import tracemalloc
+
+import numpy as np
+import pandas as pd
+import xarray
+
+from ndcsv import read_csv, write_csv
+
+
+class DateCoords:
+    """Parsing of ISO-8601 dates on the rows and on the columns"""
+
+    params = ["rows", "columns"]
+    param_names = ["axis"]
+
+    def setup(self, axis):
+        dates = pd.date_range("2000-01-01", periods=5000)
+        array = xarray.DataArray(
+            np.zeros((5000, 4)),
+            dims=["date", "y"],
+            coords={"date": dates, "y": ["y0", "y1", "y2", "y3"]},
+        )
+        if axis == "columns":
+            array = array.T
+        self.txt = write_csv(array)
+
+    def time_read_csv(self, axis):
+        read_csv(io.StringIO(self.txt))
+
+
+class Engine:
+    """pandas vs. numpy engine on long and wide files of floats"""
+
+    params = (["pandas", "numpy"], [(100_000, 10), (1000, 1000)])
+    param_names = ["engine", "shape"]
+
+    def setup(self, engine, shape):
+        rng = np.random.default_rng(0)
+        array = xarray.DataArray(
+            rng.standard_normal(shape),
+            dims=["x", "y"],
+            coords={"x": [f"x{i}" for i in range(shape[0])], "y": np.arange(shape[1])},
+        )
+        self.txt = write_csv(array)
+
+    def time_read_csv(self, engine, shape):
+        read_csv(io.StringIO(self.txt), engine=engine)
+
+    def peakmem_read_csv(self, engine, shape):
+        read_csv(io.StringIO(self.txt), engine=engine)
+
+
+class PeakMemory:
+    """Peak memory usage of read_csv, as a multiple of the size of the result.
+    See the bound documented in :func:`ndcsv.read_csv`.
+
+    Unlike asv's ``peakmem_`` benchmarks, which measure the RSS of the whole
+    process, this measures only the memory allocated by read_csv itself.
+    """
+
+    params = (["plain", "rows", "columns", "long"], ["pandas", "numpy"])
+    param_names = ["layout", "engine"]
+    unit = "x result size"
+
+    def setup(self, layout, engine):
+        rng = np.random.default_rng(0)
+        a = xarray.DataArray(
+            rng.random((20, 50, 500)),
+            dims=["x", "y", "z"],
+            coords={
+                "x": np.arange(20),
+                "y": [f"y{i}" for i in range(50)],
+                "z": np.arange(500),
+            },
+        )
+        if layout == "plain":
+            a = a.stack(r=["x", "y"]).reset_index("r", drop=True).T
+        elif layout == "rows":
+            a = a.stack(r=["x", "y"]).T
+        elif layout == "columns":
+            a = a.stack(c=["x", "y"])
+        else:
+            a = a.stack(s=["x", "y", "z"])
+        self.tmpdir = tempfile.mkdtemp()
+        self.fname = os.path.join(self.tmpdir, "bench.csv")
+        write_csv(a, self.fname)
+        # Warm up caches and imports
+        read_csv(self.fname, engine=engine)
+
+    def teardown(self, layout, engine):
+        shutil.rmtree(self.tmpdir)
+
+    def track_peakmem_ratio(self, layout, engine):
+        tracemalloc.start()
+        try:
+            base = tracemalloc.get_traced_memory()[0]
+            out = read_csv(self.fname, engine=engine)
+            peak = tracemalloc.get_traced_memory()[1] - base
+        finally:
+            tracemalloc.stop()
+        return peak / out.nbytes
+
+
+class SmallFile:
+    """Per-call overhead of reading a file of a few kB, e.g. FX rates"""
+
+    params = ["1d", "2d", "2d_dates", "3d"]
+    param_names = ["shape"]
+
+    def setup(self, shape):
+        rng = np.random.default_rng(0)
+        if shape == "1d":
+            array = xarray.DataArray(
+                rng.random(50),
+                dims=["ccy"],
+                coords={"ccy": [f"C{i:02d}" for i in range(50)]},
+            )
+        elif shape == "2d":
+            array = xarray.DataArray(
+                rng.random((20, 5)),
+                dims=["x", "y"],
+                coords={"x": [f"x{i}" for i in range(20)], "y": np.arange(5)},
+            )
+        elif shape == "2d_dates":
+            array = xarray.DataArray(
+                rng.random((20, 5)),
+                dims=["date", "ccy"],
+                coords={
+                    "date": pd.date_range("2000-01-01", periods=20),
+                    "ccy": ["USD", "EUR", "GBP", "JPY", "CHF"],
+                },
+            )
+        else:
+            array = xarray.DataArray(
+                rng.random((5, 4, 5)),
+                dims=["x", "y", "z"],
+                coords={"x": np.arange(5), "y": list("abcd"), "z": np.arange(5)},
+            )
+        self.array = array
+        self.txt = write_csv(array)
+
+    def time_read_csv(self, shape):
+        read_csv(io.StringIO(self.txt))
+
+    def time_write_csv(self, shape):
+        write_csv(self.array)
@@ -0,0 +1,54 @@
+"""Benchmarks for :func:`ndcsv.write_csv`"""
+
+import io
+
+import numpy as np
+import xarray
+
+from ndcsv import compile_writer, read_csv, write_csv
+
+
+class SignificantDigits:
+    """File size and throughput of rounded vs. full precision floats"""
+
+    params = [None, 6, 8]
+    param_names = ["significant_digits"]
+
+    def setup(self, significant_digits):
+        rng = np.random.default_rng(0)
+        self.array = xarray.DataArray(
+            rng.standard_normal((2000, 100)),
+            dims=["x", "y"],
+            coords={"x": np.arange(2000), "y": [f"y{i}" for i in range(100)]},
+        )
+        self.txt = write_csv(self.array, significant_digits=significant_digits)
+
+    def time_write_csv(self, significant_digits):
+        write_csv(self.array, significant_digits=significant_digits)
+
+    def time_read_csv(self, significant_digits):
+        read_csv(io.StringIO(self.txt))
+
+    def track_file_size(self, significant_digits):
+        return len(self.txt)
+
+    track_file_size.unit = "bytes"  # type: ignore[attr-defined]
+
+
+class CompiledWriter:
+    """Per-call overhead of write_csv vs. compile_writer for small arrays"""
+
+    def setup(self):
+        rng = np.random.default_rng(0)
+        self.array = xarray.DataArray(
+            rng.integers(0, 100, (10, 3, 4)),
+            dims=["x", "y", "z"],
+            coords={"x": np.arange(10), "y": ["y0", "y1", "y2"], "z": np.arange(4)},
+        )
+        self.writer = compile_writer(self.array)
+
+    def time_write_csv(self):
+        write_csv(self.array)
+
+    def time_compiled_write_csv(self):
+        self.writer.write_csv(self.array)
@@ -1,12 +1,84 @@
-import importlib.metadata
+import importlib
+from typing import TYPE_CHECKING, Any
 
-from ndcsv.read import read_csv
-from ndcsv.write import write_csv
+from ndcsv.profiling import PhaseRecord, Profile, profile
 
-try:
-    __version__ = importlib.metadata.version("ndcsv")
-except importlib.metadata.PackageNotFoundError:  # pragma: nocover
-    # Local copy, not installed with pip
-    __version__ = "9999"
+if TYPE_CHECKING:
+    __version__: str
+    from ndcsv.archive import read_archive, write_archive
+    from ndcsv.check import Problem, validate
+    from ndcsv.compare import CellDiff, Diff, diff
+    from ndcsv.dataset import read_dataset, write_dataset
+    from ndcsv.read import CsvFollower, follow_csv, read_csv
+    from ndcsv.update import update_csv
+    from ndcsv.write import CompiledWriter, compile_writer, write_csv
 
-__all__ = ("__version__", "read_csv", "write_csv")
+__all__ = (
+    "CellDiff",
+    "CompiledWriter",
+    "CsvFollower",
+    "Diff",
+    "PhaseRecord",
+    "Problem",
+    "Profile",
+    "__version__",
+    "compile_writer",
+    "diff",
+    "follow_csv",
+    "profile",
+    "read_archive",
+    "read_csv",
+    "read_dataset",
+    "update_csv",
+    "validate",
+    "write_archive",
+    "write_csv",
+    "write_dataset",
+)
+
+# Functions that depend on pandas and xarray, as well as the version, which
+# depends on importlib.metadata, are imported on first access, so that
+# ``import ndcsv`` is fast.
+_LAZY = {
+    "CellDiff": "ndcsv.compare",
+    "CompiledWriter": "ndcsv.write",
+    "CsvFollower": "ndcsv.read",
+    "Diff": "ndcsv.compare",
+    "Problem": "ndcsv.check",
+    "compile_writer": "ndcsv.write",
+    "diff": "ndcsv.compare",
+    "follow_csv": "ndcsv.read",
+    "read_archive": "ndcsv.archive",
+    "read_csv": "ndcsv.read",
+    "read_dataset": "ndcsv.dataset",
+    "update_csv": "ndcsv.update",
+    "validate": "ndcsv.check",
+    "write_archive": "ndcsv.archive",
+    "write_csv": "ndcsv.write",
+    "write_dataset": "ndcsv.dataset",
+}
+
+
+def __getattr__(name: str) -> Any:
+    if name == "__version__":
+        value = _version()
+    elif name in _LAZY:
+        value = getattr(importlib.import_module(_LAZY[name]), name)
+    else:
+        raise AttributeError(f"module 'ndcsv' has no attribute {name!r}")
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> list[str]:
+    return sorted({*globals(), *__all__})
+
+
+def _version() -> str:
+    import importlib.metadata  # noqa: PLC0415
+
+    try:
+        return importlib.metadata.version("ndcsv")
+    except importlib.metadata.PackageNotFoundError:  # pragma: nocover
+        # Local copy, not installed with pip
+        return "9999"
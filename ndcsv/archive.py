@@ -0,0 +1,161 @@
+"""Read and write many NDCSV arrays as the members of a single zip archive"""
+
+from __future__ import annotations
+
+import bz2
+import gzip
+import io
+import lzma
+import zipfile
+from collections.abc import Callable, Hashable, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Literal
+
+import xarray
+
+from ndcsv.dataset import _SUFFIXES, _file_name, _map, _share_row_labels, _writer
+from ndcsv.read import _FILE_NAME, _decompress, read_csv
+
+#: Compress the bytes of a member, depending on its extension
+_COMPRESSORS: dict[str, Callable[[bytes], bytes]] = {
+    ".csv": bytes,
+    ".csv.gz": lambda data: gzip.compress(data, mtime=0),
+    ".csv.bz2": bz2.compress,
+    ".csv.xz": lzma.compress,
+}
+
+
+def write_archive(
+    arrays: Mapping[str, xarray.DataArray] | xarray.Dataset,
+    path_or_buf: str | IO[bytes],
+    *,
+    suffix: str = ".csv.gz",
+    significant_digits: int | None = None,
+    layout: Literal["default", "auto"] = "default",
+    validate: bool = True,
+    max_workers: int | None = None,
+) -> None:
+    """Write many arrays to a single zip archive, with one NDCSV file
+    ``<name><suffix>`` for each array.
+
+    Every member is compressed on its own, concurrently on a thread pool, and
+    then stored in the archive as it is. The central directory of the zip
+    archive indexes the members, so that :func:`read_csv` with ``member=``
+    can later read and decompress only one of them.
+
+    Arrays with the same dims and coords share the formatting of the header
+    and of the row labels, as with :func:`compile_writer`.
+
+    :param arrays:
+        Mapping of names to :class:`xarray.DataArray`, or
+        :class:`xarray.Dataset`. The names must be strings that are valid file
+        names.
+    :param path_or_buf:
+        Path to the output archive, or binary file-like object open for
+        writing. An existing file is overwritten.
+    :param str suffix:
+        Extension of the members, which also defines their compression:
+        ``.csv``, ``.csv.gz`` (default), ``.csv.bz2``, or ``.csv.xz``
+    :param int significant_digits:
+        See :func:`write_csv`
+    :param str layout:
+        See :func:`write_dataset`
+    :param bool validate:
+        See :func:`write_dataset`
+    :param int max_workers:
+        Maximum number of threads. Default: see
+        :class:`~concurrent.futures.ThreadPoolExecutor`.
+    """
+    if not isinstance(arrays, Mapping) or not all(
+        isinstance(array, xarray.DataArray) for array in arrays.values()
+    ):
+        raise TypeError(
+            "Input data is not a xarray.Dataset or a mapping of xarray.DataArray"
+        )
+    if suffix not in _SUFFIXES:
+        raise ValueError(f"suffix must be one of {_SUFFIXES}; got {suffix!r}")
+    members = {name: _file_name(name) + suffix for name in arrays}
+    compress = _COMPRESSORS[suffix]
+
+    with ThreadPoolExecutor(max_workers) as executor:
+        write_one = _writer(
+            arrays,
+            executor,
+            significant_digits=significant_digits,
+            layout=layout,
+            validate=validate,
+        )
+
+        def compress_one(name: Hashable) -> bytes:
+            text = write_one(name, None)
+            assert text is not None
+            return compress(text.encode("utf-8"))
+
+        with zipfile.ZipFile(path_or_buf, "w") as zf:
+            for member, data in zip(
+                members.values(), _map(executor, compress_one, members)
+            ):
+                # Fixed timestamp, so that the archive is reproducible
+                info = zipfile.ZipInfo(member)
+                info.external_attr = 0o644 << 16
+                zf.writestr(info, data)
+
+
+def read_archive(
+    path_or_buf: str | IO[bytes],
+    unstack: bool = True,
+    *,
+    engine: Literal["pandas", "numpy"] = "pandas",
+    max_workers: int | None = None,
+) -> dict[str, xarray.DataArray]:
+    """Read all the arrays of a zip archive written by :func:`write_archive`,
+    concurrently on a thread pool.
+
+    Members ending with ``.csv``, ``.csv.gz``, ``.csv.bz2``, or ``.csv.xz``
+    are read; the name of the member, without the extension, is the name of
+    the array. All other members are ignored.
+
+    The labels on the rows and the columns are converted only once for all
+    the arrays that share them.
+
+    To read a single array, use :func:`read_csv` with ``member=``.
+
+    :param path_or_buf:
+        Path to the archive, or binary file-like object open for reading
+    :param bool unstack:
+        See :func:`read_csv`
+    :param str engine:
+        See :func:`read_csv`
+    :param int max_workers:
+        Maximum number of threads. Default: see
+        :class:`~concurrent.futures.ThreadPoolExecutor`.
+    :returns:
+        dict of names to :class:`xarray.DataArray`, in the order of the
+        members in the archive
+    :raises ValueError:
+        If the same array is stored in multiple members, e.g. ``x.csv`` and
+        ``x.csv.gz``
+    """
+    with zipfile.ZipFile(path_or_buf) as zf:
+        members: dict[str, str] = {}
+        for member in zf.namelist():
+            m = _FILE_NAME.fullmatch(member)
+            if not m:
+                continue
+            name = m.group(1)
+            if name in members:
+                raise ValueError(f"Multiple members for array {name}")
+            members[name] = member
+
+        # ZipFile is not thread-safe; read the compressed members here and
+        # only decompress and parse them in the worker threads.
+        raw = [zf.read(member) for member in members.values()]
+
+    def read_one(member: str, data: bytes) -> xarray.DataArray:
+        with _decompress(io.BytesIO(data), member) as fh:
+            return read_csv(fh, unstack=unstack, engine=engine)
+
+    with _share_row_labels(), ThreadPoolExecutor(max_workers) as executor:
+        arrays = list(_map(executor, read_one, members.values(), raw))
+
+    return dict(zip(members, arrays))
@@ -0,0 +1,257 @@
+"""Validate an NDCSV file without loading it"""
+
+from __future__ import annotations
+
+import csv
+import io
+import re
+from typing import IO, NamedTuple, TextIO
+
+import numpy as np
+import pandas as pd
+
+from ndcsv.compare import _open
+from ndcsv.profiling import _lap, _profiled
+from ndcsv.read import _NA_VALUES, _NAT_LABELS, _record_lines
+from ndcsv.update import _Rows
+
+#: Labels that :func:`read_csv` reads as NaN or NaT
+_MISSING_LABELS = frozenset(_NA_VALUES + _NAT_LABELS)
+
+
+class Problem(NamedTuple):
+    """A problem found by :func:`validate`"""
+
+    #: Line of the file, counting from 1. For duplicate labels, this is the
+    #: line of the second occurrence.
+    line: int
+    #: Description of the problem
+    message: str
+
+
+@_profiled("validate")
+def validate(path_or_buf: str | IO, *, max_problems: int = 100) -> list[Problem]:
+    """Check that a file is well-formed NDCSV, without loading it.
+
+    The file is streamed in blocks of rows. The checks are:
+
+    - all rows have as many cells as the header
+    - no labels on the rows are empty or NaN, and no labels on the columns
+      are empty, like :func:`write_csv` requires
+    - the combinations of labels of the index coords on the rows, and on the
+      columns, are unique where there are 2 or more of them to be unstacked
+    - non-index coords have the same value for every value of their
+      dimension, where they are unstacked
+
+    Memory usage is bounded by one block of rows, plus the unique values of
+    the dimensions of non-index coords, plus 16 bytes per row: duplicate
+    labels on the rows are detected through a 64-bit hash of each row's
+    labels. The rows with the same hash are then read again to compare
+    their actual labels.
+
+    Reading stops as soon as ``max_problems`` problems have been found.
+    Note that a valid file may still fail to be read by :func:`read_csv`,
+    e.g. if it does not fit in memory.
+
+    :param path_or_buf:
+        .csv, .csv.gz, .csv.bz2, or .csv.xz file path, or file-like object
+        open for reading. It must support rewinding through ``seek(0)``.
+    :param int max_problems:
+        Maximum number of problems to report
+    :returns:
+        List of :class:`Problem`, sorted by line. Empty if the file is valid.
+    """
+    if max_problems < 1:
+        raise ValueError(f"max_problems must be 1 or more; got {max_problems}")
+    with _open(path_or_buf) as buf:
+        lines: list[str] = []
+        try:
+            rows = _Rows(buf, lines)
+        except ValueError:
+            _lap("header", "".join(lines))
+            cells = [[cell.strip() for cell in row] for row in csv.reader(lines)]
+            if len(cells) == 1 and cells[0][0] and not any(cells[0][1:]):
+                # 0-dimensional file
+                return []
+            return [Problem(1, "Malformed N-dimensional CSV")]
+        return _validate(buf, rows, max_problems)
+
+
+def _validate(buf: TextIO, rows: _Rows, max_problems: int) -> list[Problem]:
+    problems: list[Problem] = []
+    num_index_col = rows.size.num_index_col
+    num_cells = num_index_col + rows.num_columns
+    _validate_header(rows, problems)
+    _lap("header", rows.header_text)
+
+    # Non-index coords on the rows, formatted as `name (dim)`: tuples of
+    # (position, name, position of the dim or None, values seen for the dim)
+    names = rows.header.index_names
+    nonindex: list[tuple[int, str, int | None, dict[str, str]]] = []
+    index_levels = []
+    dims = set()
+    for i, name in enumerate(names):
+        m = re.match(r"(.+) \((.+)\)$", name)
+        if m:
+            dim = m.group(2)
+            nonindex.append((i, name, names.index(dim) if dim in names else None, {}))
+            dims.add(dim)
+        else:
+            index_levels.append(i)
+            dims.add(name)
+    # Like read_csv, only check what is unstacked
+    if len(dims) < 2:
+        nonindex = []
+
+    hashes = []
+    numbers = []
+    for _, block, block_numbers in rows.blocks():
+        for row, line in zip(block, block_numbers):
+            if len(row) != num_cells:
+                problems.append(
+                    Problem(line, f"Expected {num_cells} cells, found {len(row)}")
+                )
+                if len(row) < num_index_col:
+                    continue
+            for i in range(num_index_col):
+                if row[i] in _MISSING_LABELS:
+                    problems.append(Problem(line, f"Empty or NaN label in {names[i]}"))
+            for i, name, dim, seen in nonindex:
+                key = row[dim] if dim is not None else ""
+                if seen.setdefault(key, row[i]) != row[i]:
+                    problems.append(
+                        Problem(
+                            line,
+                            f"Non-index coord {name} has different values for the "
+                            "same value of its dimension",
+                        )
+                    )
+
+        if len(index_levels) > 1:
+            hashes.append(
+                np.fromiter(
+                    (hash(_labels(row, index_levels)) for row in block),
+                    dtype=np.int64,
+                    count=len(block),
+                )
+            )
+            numbers.append(np.array(block_numbers, dtype=np.int64))
+        _lap("body")
+        # Any duplicate before the last problem involves rows read so far
+        if len(problems) >= max_problems:
+            break
+
+    if hashes:
+        groups = _same_hash(np.concatenate(hashes), np.concatenate(numbers))
+        if groups:
+            buf.seek(0)
+            _find_duplicates(_Rows(buf), index_levels, groups, problems)
+        _lap("duplicates")
+    problems.sort(key=lambda problem: problem.line)
+    return problems[:max_problems]
+
+
+def _validate_header(rows: _Rows, problems: list[Problem]) -> None:
+    """Check the labels on the columns"""
+    num_index_col = rows.size.num_index_col
+    num_cells = num_index_col + rows.num_columns
+    lines: list[str] = []
+    reader = csv.reader(_record_lines(io.StringIO(rows.header_text), lines))
+    line = 1
+    # The last row of the header holds the names of the coords on the rows
+    for _, row in zip(rows.header.columns, reader):
+        row = [cell.strip() for cell in row]
+        while row and row[-1] == "":
+            del row[-1]
+        if len(row) != num_cells:
+            problems.append(
+                Problem(line, f"Expected {num_cells} cells, found {len(row)}")
+            )
+        # NA, null etc. are valid labels on the columns; write_csv writes them
+        # and read_csv reads them back as strings
+        if "" in row[num_index_col:]:
+            problems.append(Problem(line, f"Empty label in {row[0]}"))
+        line = len(lines) + 1
+
+    # Like read_csv, only check the labels that are unstacked
+    levels = [
+        values
+        for name, values in rows.header.columns
+        if not re.match(r"(.+) \((.+)\)$", name)
+    ]
+    if len(levels) > 1:
+        columns = pd.MultiIndex.from_arrays(levels)
+        for label in columns[columns.duplicated()].unique():
+            label = ", ".join(str(level) for level in label)
+            problems.append(
+                Problem(line - 1, f"Duplicate labels on the columns: {label}")
+            )
+
+
+def _labels(row: list[str], levels: list[int]) -> tuple[str, ...]:
+    """Labels of the index coords of a row, which may be too short"""
+    return tuple(row[i] if i < len(row) else "" for i in levels)
+
+
+def _same_hash(hashes: np.ndarray, numbers: np.ndarray) -> list[np.ndarray]:
+    """Find the rows whose labels may be duplicate
+
+    :param hashes:
+        Hash of the labels of the index coords of every row
+    :param numbers:
+        Line number of every row
+    :returns:
+        Line numbers of the rows of every group of 2 or more rows with the
+        same hash, in the order of the file
+    """
+    order = np.argsort(hashes, kind="stable")
+    hashes = hashes[order]
+    is_first = np.ones(len(hashes), dtype=bool)
+    is_first[1:] = hashes[1:] != hashes[:-1]
+    starts = np.flatnonzero(is_first)
+    sizes = np.diff(np.append(starts, len(hashes)))
+    # Stable sort: the rows of each group are in the order of the file
+    return [
+        numbers[order[start : start + size]]
+        for start, size in zip(starts, sizes)
+        if size > 1
+    ]
+
+
+def _find_duplicates(
+    rows: _Rows,
+    index_levels: list[int],
+    groups: list[np.ndarray],
+    problems: list[Problem],
+) -> None:
+    """Read the rows with the same hash again and report those with the same
+    labels as a previous row
+
+    :param rows:
+        The whole file, read again from the start
+    :param index_levels:
+        Positions of the index coords on the rows
+    :param groups:
+        Output of :func:`_same_hash`
+    """
+    wanted = {int(line) for group in groups for line in group}
+    last = max(wanted)
+    labels: dict[int, tuple[str, ...]] = {}
+    for _, block, block_numbers in rows.blocks():
+        for row, line in zip(block, block_numbers):
+            if line in wanted:
+                labels[line] = _labels(row, index_levels)
+        if block_numbers[-1] >= last:
+            break
+
+    for group in groups:
+        first: dict[tuple[str, ...], int] = {}
+        for line in group.tolist():
+            seen = first.setdefault(labels[line], line)
+            if seen != line:
+                problems.append(
+                    Problem(
+                        line,
+                        f"Duplicate labels on the rows; first seen on line {seen}",
+                    )
+                )
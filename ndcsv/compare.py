@@ -0,0 +1,254 @@
+"""Compare two NDCSV files without loading them"""
+
+from __future__ import annotations
+
+import contextlib
+import io
+from collections.abc import Iterator
+from itertools import zip_longest
+from typing import IO, Any, NamedTuple, TextIO, cast
+
+import numpy as np
+import pandas as pd
+import pshell as sh
+import xarray
+
+from ndcsv.profiling import _lap, _profiled
+from ndcsv.read import _NA_VALUES
+from ndcsv.update import _columns_index, _Rows
+from ndcsv.write import write_csv
+
+
+class CellDiff(NamedTuple):
+    """A cell that differs between the two files compared by :func:`diff`"""
+
+    #: Labels on the row, as they are written in the file: one string for
+    #: each index column, including non-index coords
+    row: tuple[str, ...]
+    #: Labels on the column: one for each coord on the columns. Empty for
+    #: files with 1 dimension.
+    column: tuple[Any, ...]
+    #: Cell of the first file, as it is written in it
+    a: str
+    #: Cell of the second file, as it is written in it
+    b: str
+
+
+class Diff(NamedTuple):
+    """Output of :func:`diff`"""
+
+    #: Cells that differ, on the rows and columns that are in both files
+    cells: list[CellDiff]
+    #: Labels of the rows that are only in the first file
+    rows_only_a: list[tuple[str, ...]]
+    #: Labels of the rows that are only in the second file
+    rows_only_b: list[tuple[str, ...]]
+    #: Labels of the columns that are only in the first file
+    columns_only_a: list[tuple[Any, ...]]
+    #: Labels of the columns that are only in the second file
+    columns_only_b: list[tuple[Any, ...]]
+    #: True if any of the lists above was cut at ``max_diffs`` elements
+    truncated: bool
+
+    @property
+    def equal(self) -> bool:
+        """True if there are no differences"""
+        return not any(self[:5])
+
+
+@_profiled("diff")
+def diff(
+    a: str | IO | xarray.DataArray,
+    b: str | IO | xarray.DataArray,
+    *,
+    rtol: float = 0.0,
+    atol: float = 0.0,
+    max_diffs: int | None = 1000,
+) -> Diff:
+    """Compare two NDCSV files, or an NDCSV file and an array, cell by cell.
+
+    Both files are parsed in lockstep, in blocks of rows, without ever
+    loading them whole. The rows are aligned by their labels. When the rows
+    are in the same order in both files, memory usage is bounded by one block
+    of rows per file; otherwise, the rows that have yet to be matched with the
+    other file are held in memory.
+
+    Labels on the rows are compared as they are written in the files,
+    including non-index coords. Labels on the columns are compared after
+    conversion, like in :func:`read_csv`. Cells are equal if their text is
+    identical or if they are both numbers, or NaN, within the tolerances;
+    e.g. ``1`` and ``1.0`` are equal.
+
+    :param a:
+        One of:
+
+        - .csv, .csv.gz, .csv.bz2, or .csv.xz file path
+        - file-like object open for reading
+        - :class:`xarray.DataArray`, which is formatted with
+          :func:`write_csv` in memory
+
+    :param b:
+        Same as ``a``
+    :param float rtol:
+        Relative tolerance for numbers; see :func:`numpy.isclose`.
+        Default: numbers must be exactly equal.
+    :param float atol:
+        Absolute tolerance for numbers; see :func:`numpy.isclose`.
+        Default: numbers must be exactly equal.
+    :param int max_diffs:
+        Maximum number of differences to report for each list of
+        :class:`Diff`. None for unlimited.
+    :returns:
+        :class:`Diff`
+    :raises ValueError:
+        If the two files have different index names or coords on the
+        columns, or 0 dimensions
+    """
+    with _open(a) as buf_a, _open(b) as buf_b:
+        return _diff(_Rows(buf_a), _Rows(buf_b), rtol, atol, max_diffs)
+
+
+@contextlib.contextmanager
+def _open(obj: str | IO | xarray.DataArray) -> Iterator[TextIO]:
+    """Open the first or second argument of :func:`diff` as a text buffer"""
+    if isinstance(obj, xarray.DataArray):
+        yield io.StringIO(write_csv(obj))
+    elif isinstance(obj, str):
+        with sh.open(obj) as fh:
+            yield cast(TextIO, fh)
+    else:
+        yield cast(TextIO, obj)
+
+
+def _diff(
+    rows_a: _Rows,
+    rows_b: _Rows,
+    rtol: float,
+    atol: float,
+    max_diffs: int | None,
+) -> Diff:
+    if rows_a.header.index_names != rows_b.header.index_names or [
+        name for name, _ in rows_a.header.columns
+    ] != [name for name, _ in rows_b.header.columns]:
+        raise ValueError("The two files have different index names or coords")
+    _lap("header", rows_a.header_text + rows_b.header_text)
+
+    out = Diff([], [], [], [], [], False)
+    truncated = False
+
+    def report(items: list, item: Any) -> None:
+        nonlocal truncated
+        if max_diffs is None or len(items) < max_diffs:
+            items.append(item)
+        else:
+            truncated = True
+
+    if rows_a.header.columns:
+        columns_a = _columns_index(rows_a)
+        columns_b = _columns_index(rows_b)
+        # Positions of the common columns in a and b
+        col_b = np.flatnonzero(columns_b.isin(columns_a))
+        col_a = columns_a.get_indexer(columns_b[col_b])
+        column_labels = columns_b[col_b].tolist()
+        for label in columns_a[~columns_a.isin(columns_b)]:
+            report(out.columns_only_a, label)
+        for label in columns_b[~columns_b.isin(columns_a)]:
+            report(out.columns_only_b, label)
+    else:
+        col_a = col_b = np.array([0])
+        column_labels = [()]
+
+    n = rows_a.size.num_index_col
+    # Rows that have yet to be matched with a row of the other file
+    pending_a: dict[tuple[str, ...], list[str]] = {}
+    pending_b: dict[tuple[str, ...], list[str]] = {}
+
+    for block_a, block_b in zip_longest(rows_a.blocks(), rows_b.blocks()):
+        a = block_a[1] if block_a else []
+        b = block_b[1] if block_b else []
+        keys_a = [tuple(row[:n]) for row in a]
+        keys_b = [tuple(row[:n]) for row in b]
+        if not pending_a and not pending_b and keys_a == keys_b:
+            # Fast path: same rows in the same order
+            keys = keys_b
+            cells_a = [row[n:] for row in a]
+            cells_b = [row[n:] for row in b]
+        else:
+            keys = []
+            cells_a = []
+            cells_b = []
+            for key, row in zip(keys_a, a):
+                other = pending_b.pop(key, None)
+                if other is None:
+                    pending_a[key] = row[n:]
+                else:
+                    keys.append(key)
+                    cells_a.append(row[n:])
+                    cells_b.append(other)
+            for key, row in zip(keys_b, b):
+                other = pending_a.pop(key, None)
+                if other is None:
+                    pending_b[key] = row[n:]
+                else:
+                    keys.append(key)
+                    cells_a.append(other)
+                    cells_b.append(row[n:])
+
+        a_arr = _to_array(cells_a, rows_a.num_columns)[:, col_a]
+        b_arr = _to_array(cells_b, rows_b.num_columns)[:, col_b]
+        for i, j in zip(*np.nonzero(_compare_cells(a_arr, b_arr, rtol, atol))):
+            report(
+                out.cells,
+                CellDiff(keys[i], column_labels[j], str(a_arr[i, j]), str(b_arr[i, j])),
+            )
+        _lap("body")
+
+    for key in pending_a:
+        report(out.rows_only_a, key)
+    for key in pending_b:
+        report(out.rows_only_b, key)
+    return out._replace(truncated=truncated)
+
+
+def _to_array(cells: list[list[str]], num_columns: int) -> np.ndarray:
+    """Convert the value cells of a block of rows to a 2-D array of strings"""
+    out = np.full((len(cells), num_columns), "", dtype=object)
+    for i, row in enumerate(cells):
+        out[i, : len(row)] = row[:num_columns]
+    return out.astype(str)
+
+
+def _compare_cells(
+    a: np.ndarray, b: np.ndarray, rtol: float, atol: float
+) -> np.ndarray:
+    """Compare the value cells of matching rows of the two files
+
+    :param a:
+        2-D array of strings, with shape (rows, common columns)
+    :param b:
+        Same as a
+    :returns:
+        2-D boolean array with the same shape, True where the cells differ
+    """
+    differ = a != b
+    if differ.any():
+        # Compare numbers only where the text differs, which is typically
+        # only a few cells
+        fa, valid_a = _to_float(a[differ])
+        fb, valid_b = _to_float(b[differ])
+        close = valid_a & valid_b & np.isclose(fa, fb, rtol, atol, equal_nan=True)
+        differ[differ] = ~close
+    return differ
+
+
+def _to_float(cells: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """Parse a 1-D array of strings to floats.
+
+    :returns:
+        Tuple of (floats, True where the cell is a number or NaN)
+    """
+    missing = np.isin(cells, _NA_VALUES)
+    values = pd.to_numeric(
+        pd.Series(np.where(missing, "nan", cells), dtype=object), errors="coerce"
+    ).to_numpy(dtype=float, na_value=np.nan)
+    return values, missing | ~np.isnan(values)
@@ -0,0 +1,232 @@
+"""Read and write a :class:`xarray.Dataset` as a directory of NDCSV files,
+one per variable
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import os
+from collections.abc import Callable, Hashable, Iterator, Mapping
+from concurrent.futures import ThreadPoolExecutor
+from typing import IO, Any, Literal, TypeVar
+
+import xarray
+
+from ndcsv.proper_unstack import _UNSTACK_PLAN_CACHE
+from ndcsv.read import _FILE_NAME, _ROW_LABELS_CACHE, read_csv
+from ndcsv.write import CompiledWriter, write_csv
+
+T = TypeVar("T")
+
+#: File extensions supported by :func:`read_dataset` and :func:`write_dataset`
+_SUFFIXES = (".csv", ".csv.gz", ".csv.bz2", ".csv.xz")
+
+
+def write_dataset(
+    dataset: xarray.Dataset,
+    directory: str,
+    *,
+    suffix: str = ".csv",
+    significant_digits: int | None = None,
+    layout: Literal["default", "auto"] = "default",
+    validate: bool = True,
+    max_workers: int | None = None,
+) -> None:
+    """Write each data variable of a :class:`xarray.Dataset` to its own NDCSV
+    file ``<directory>/<name><suffix>``, concurrently on a thread pool.
+
+    Variables with the same dims share the formatting of the header and of
+    the row labels, as with :func:`compile_writer`.
+
+    Only the coords that the NDCSV format can represent are written: index
+    coords and the non-index coords along the dims of each variable.
+    Attributes and coords that are not along any of the dims of a variable
+    are lost.
+
+    :param dataset:
+        :class:`xarray.Dataset` to write. The names of the variables must be
+        strings that are valid file names.
+    :param str directory:
+        Path to the output directory. It is created if it doesn't exist.
+        Other files in it are left untouched.
+    :param str suffix:
+        File extension, which also defines the compression:
+        ``.csv`` (default), ``.csv.gz``, ``.csv.bz2``, or ``.csv.xz``
+    :param int significant_digits:
+        See :func:`write_csv`
+    :param str layout:
+        See :func:`write_csv`. ``layout="auto"`` may choose a different layout
+        for each variable, so it disables the sharing of the formatting.
+    :param bool validate:
+        See :func:`write_csv`. Note that ``validate=False`` also disables the
+        sharing of the formatting, which always validates the coords.
+    :param int max_workers:
+        Maximum number of threads. Default: see
+        :class:`~concurrent.futures.ThreadPoolExecutor`.
+    """
+    if not isinstance(dataset, xarray.Dataset):
+        raise TypeError("Input data is not a xarray.Dataset")
+    if suffix not in _SUFFIXES:
+        raise ValueError(f"suffix must be one of {_SUFFIXES}; got {suffix!r}")
+    paths = {
+        name: os.path.join(directory, _file_name(name) + suffix)
+        for name in dataset.data_vars
+    }
+    os.makedirs(directory, exist_ok=True)
+
+    with ThreadPoolExecutor(max_workers) as executor:
+        write_one = _writer(
+            dataset,
+            executor,
+            significant_digits=significant_digits,
+            layout=layout,
+            validate=validate,
+        )
+        list(_map(executor, lambda name: write_one(name, paths[name]), paths))
+
+
+def read_dataset(
+    directory: str,
+    unstack: bool = True,
+    *,
+    engine: Literal["pandas", "numpy"] = "pandas",
+    max_workers: int | None = None,
+) -> xarray.Dataset:
+    """Read all the NDCSV files in a directory, concurrently on a thread pool,
+    into the variables of a :class:`xarray.Dataset`. This is the counterpart
+    of :func:`write_dataset`.
+
+    Files ending with ``.csv``, ``.csv.gz``, ``.csv.bz2``, or ``.csv.xz`` are
+    read; the file name, without the extension, is the name of the variable.
+    All other files are ignored.
+
+    The labels on the rows and the columns are converted only once for all
+    the files that share them. The variables are assembled into the Dataset
+    without realigning or copying their data.
+
+    :param str directory:
+        Path to the directory
+    :param bool unstack:
+        See :func:`read_csv`
+    :param str engine:
+        See :func:`read_csv`
+    :param int max_workers:
+        Maximum number of threads. Default: see
+        :class:`~concurrent.futures.ThreadPoolExecutor`.
+    :returns:
+        :class:`xarray.Dataset`
+    :raises ValueError:
+        If the same variable is stored in multiple files, e.g. ``x.csv`` and
+        ``x.csv.gz``, or if variables have different labels along the same
+        dim, or different values of the same non-index coord
+    """
+    paths: dict[str, str] = {}
+    for fname in sorted(os.listdir(directory)):
+        m = _FILE_NAME.match(fname)
+        if not m:
+            continue
+        name = m.group(1)
+        if name in paths:
+            raise ValueError(f"Multiple files for variable {name}")
+        paths[name] = os.path.join(directory, fname)
+
+    def read_one(path: str) -> xarray.DataArray:
+        return read_csv(path, unstack=unstack, engine=engine)
+
+    with _share_row_labels(), ThreadPoolExecutor(max_workers) as executor:
+        arrays = list(_map(executor, read_one, paths.values()))
+
+    return xarray.merge(
+        [array.rename(name) for name, array in zip(paths, arrays)],
+        join="exact",
+        compat="equals",
+        combine_attrs="drop",
+    )
+
+
+def _writer(
+    arrays: Mapping[Any, xarray.DataArray],
+    executor: ThreadPoolExecutor,
+    *,
+    significant_digits: int | None,
+    layout: Literal["default", "auto"],
+    validate: bool,
+) -> Callable[[Hashable, str | IO | None], str | None]:
+    """Build a function ``write_one(name, path_or_buf)`` which writes
+    ``arrays[name]`` with :func:`write_csv`, or with a :class:`CompiledWriter`
+    shared by all the arrays with the same dims. The CompiledWriters are
+    built on the executor.
+    """
+    # Variables of a Dataset with the same dims also have the same coords;
+    # arrays of any other mapping may not.
+    is_dataset = isinstance(arrays, xarray.Dataset)
+    templates: dict[tuple[Hashable, ...], xarray.DataArray] = {}
+    shared = set()
+    mismatched = set()
+    for array in arrays.values():
+        template = templates.setdefault(array.dims, array)
+        if template is array:
+            continue
+        if is_dataset or (
+            array.shape == template.shape and array.coords.equals(template.coords)
+        ):
+            shared.add(array.dims)
+        else:
+            mismatched.add(array.dims)
+
+    writers: dict[tuple[Hashable, ...], CompiledWriter] = {}
+    if layout == "default" and validate:
+        dims = [d for d in templates if d in shared and d not in mismatched]
+        compiled = _map(executor, CompiledWriter, [templates[d] for d in dims])
+        writers = dict(zip(dims, compiled))
+
+    def write_one(name: Hashable, path_or_buf: str | IO | None) -> str | None:
+        array = arrays[name]
+        writer = writers.get(array.dims)
+        if writer is not None:
+            return writer.write_csv(
+                array, path_or_buf, significant_digits=significant_digits
+            )
+        return write_csv(
+            array,
+            path_or_buf,
+            significant_digits=significant_digits,
+            layout=layout,
+            validate=validate,
+        )
+
+    return write_one
+
+
+def _file_name(name: Hashable) -> str:
+    """Validate the name of a variable for use as a file name"""
+    if not isinstance(name, str) or not name or os.sep in name or "/" in name:
+        raise ValueError(f"Variable name is not a valid file name: {name!r}")
+    return name
+
+
+def _map(
+    executor: ThreadPoolExecutor, func: Callable[..., T], *iterables: Any
+) -> Iterator[T]:
+    """:meth:`~concurrent.futures.Executor.map`, propagating the context
+    variables of the calling thread, e.g. :func:`~ndcsv.profile`, to the
+    worker threads
+    """
+    ctx = contextvars.copy_context()
+    return executor.map(lambda *args: ctx.copy().run(func, *args), *iterables)
+
+
+@contextlib.contextmanager
+def _share_row_labels() -> Iterator[None]:
+    """Enable the caches of the conversion of the labels on the rows and of
+    the unstack plans, so that the files that share the same labels on the
+    rows process them only once
+    """
+    token1 = _ROW_LABELS_CACHE.set({})
+    token2 = _UNSTACK_PLAN_CACHE.set({})
+    try:
+        yield
+    finally:
+        _UNSTACK_PLAN_CACHE.reset(token2)
+        _ROW_LABELS_CACHE.reset(token1)
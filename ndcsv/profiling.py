@@ -0,0 +1,246 @@
+"""Per-phase instrumentation of :func:`~ndcsv.read_csv` and
+:func:`~ndcsv.write_csv`
+"""
+
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import functools
+import itertools
+import time
+import tracemalloc
+from collections.abc import Callable, Iterator
+from typing import Any, NamedTuple, Optional, TypeVar, cast
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+#: Signature of the ``progress`` parameter of :func:`~ndcsv.read_csv` and
+#: :func:`~ndcsv.write_csv`: (done, total) -> None
+Progress = Callable[[int, Optional[int]], object]
+
+
+class PhaseRecord(NamedTuple):
+    """Measures of a phase of a call to an ndcsv function.
+    Use ``_asdict()`` to convert it to a dict, e.g. to send it to a metrics
+    system.
+    """
+
+    #: Sequential number of the call. All phases of the same call share it.
+    call_id: int
+    #: Name of the function, e.g. ``read_csv``
+    func: str
+    #: Name of the phase, e.g. ``header``
+    phase: str
+    #: Wall time, in seconds
+    seconds: float
+    #: Size in bytes of the data processed by the phase: the text of the
+    #: header, or the values of the array. None if not applicable.
+    nbytes: int | None
+    #: Peak memory allocated during the phase, in bytes, as measured by
+    #: :mod:`tracemalloc`. None if tracemalloc is not tracing.
+    peak_memory: int | None
+
+
+class Profile:
+    """Output of :func:`profile`. Do not instantiate directly."""
+
+    #: :class:`PhaseRecord` of all phases of all calls, in chronological order
+    records: list[PhaseRecord]
+
+    def __init__(self, callback: Callable[[PhaseRecord], object] | None):
+        self.records = []
+        self._callback = callback
+
+    def _record(self, record: PhaseRecord) -> None:
+        self.records.append(record)
+        if self._callback is not None:
+            self._callback(record)
+
+    def __repr__(self) -> str:
+        lines = [f"<Profile: {len(self.records)} records>"]
+        for r in self.records:
+            line = f"{r.call_id:>4} {r.func}.{r.phase}: {r.seconds:.6f}s"
+            if r.nbytes is not None:
+                line += f", {r.nbytes} bytes"
+            if r.peak_memory is not None:
+                line += f", peak memory {r.peak_memory} bytes"
+            lines.append(line)
+        return "\n".join(lines)
+
+
+@contextlib.contextmanager
+def profile(
+    callback: Callable[[PhaseRecord], object] | None = None,
+    *,
+    trace_memory: bool = False,
+) -> Iterator[Profile]:
+    """Context manager that measures every phase of every call to
+    :func:`~ndcsv.read_csv`, :func:`~ndcsv.write_csv`,
+    :meth:`CompiledWriter.write_csv`, :meth:`CsvFollower.refresh`,
+    :func:`~ndcsv.update_csv`, :func:`~ndcsv.diff`, and
+    :func:`~ndcsv.validate` within it.
+
+    Example::
+
+        >>> with ndcsv.profile() as prof:
+        ...     ndcsv.read_csv("foo.csv.gz")
+        >>> prof.records
+        [PhaseRecord(call_id=0, func='read_csv', phase='header', ...), ...]
+
+    The phases of :func:`~ndcsv.read_csv` are:
+
+    header
+        Open the file and parse the header
+    body
+        Parse the values and the row labels. This includes decompression.
+    coords
+        Convert the row labels to numbers, dates, and bools
+    unpack
+        Unstack MultiIndexes and rebuild non-index coords
+
+    The phases of :func:`~ndcsv.write_csv` are ``round`` (only with
+    ``significant_digits``), ``to_pandas`` (not for small arrays),
+    ``validate``, ``header``, and ``body``, which includes compression, plus
+    ``write`` with ``mode="a"``. The phases of
+    :meth:`CompiledWriter.write_csv` are ``round``, ``format``, and ``write``.
+    The phases of :meth:`CsvFollower.refresh` are ``read``, which reads the
+    new bytes and validates the header, followed by those of
+    :func:`~ndcsv.read_csv`.
+    The phases of :func:`~ndcsv.update_csv` are those of
+    :func:`~ndcsv.write_csv` for the delta, followed by ``delta``, which
+    parses the formatted delta, ``header``, and ``merge``, which streams the
+    file to the updated copy.
+    The phases of :func:`~ndcsv.diff` are those of :func:`~ndcsv.write_csv`
+    for the arguments that are arrays, followed by ``header`` and by
+    ``body`` for every block of rows.
+    The phases of :func:`~ndcsv.validate` are ``header``, ``body`` for every
+    block of rows, and ``duplicates``.
+
+    Profiling only applies to the current thread or asyncio task. When it's
+    disabled, the instrumentation has no measurable cost.
+
+    :param callback:
+        Optional function that is invoked with every :class:`PhaseRecord`
+        as soon as it's available.
+    :param bool trace_memory:
+        Set to True to measure the peak memory usage of each phase.
+        This starts :mod:`tracemalloc` if it's not already tracing, which
+        slows everything down considerably. tracemalloc measures the whole
+        process, so measures will be inaccurate if other threads allocate
+        memory at the same time. Note that the peak memory of tracemalloc is
+        reset at the beginning of each phase.
+    :returns:
+        :class:`Profile`
+    """
+    prof = Profile(callback)
+    start_tracing = trace_memory and not tracemalloc.is_tracing()
+    if start_tracing:
+        tracemalloc.start()
+    token = _PROFILES.set((*_PROFILES.get(), prof))
+    try:
+        yield prof
+    finally:
+        _PROFILES.reset(token)
+        if start_tracing:
+            tracemalloc.stop()
+
+
+_PROFILES: contextvars.ContextVar[tuple[Profile, ...]] = contextvars.ContextVar(
+    "ndcsv_profiles", default=()
+)
+_STOPWATCH: contextvars.ContextVar[_Stopwatch | None] = contextvars.ContextVar(
+    "ndcsv_stopwatch", default=None
+)
+_CALL_IDS = itertools.count()
+
+
+class _Stopwatch:
+    """Measure the consecutive phases of a call"""
+
+    def __init__(self, func: str, profiles: tuple[Profile, ...]):
+        self.call_id = next(_CALL_IDS)
+        self.func = func
+        self.profiles = profiles
+        self._restart()
+
+    def _restart(self) -> None:
+        if tracemalloc.is_tracing():
+            self.mem_start: int | None = tracemalloc.get_traced_memory()[0]
+            tracemalloc.reset_peak()
+        else:
+            self.mem_start = None
+        self.t_start = time.perf_counter()
+
+    def lap(self, phase: str, data: Any) -> None:
+        seconds = time.perf_counter() - self.t_start
+        peak_memory = None
+        if self.mem_start is not None and tracemalloc.is_tracing():
+            peak_memory = tracemalloc.get_traced_memory()[1] - self.mem_start
+
+        record = PhaseRecord(
+            call_id=self.call_id,
+            func=self.func,
+            phase=phase,
+            seconds=seconds,
+            nbytes=_nbytes(data),
+            peak_memory=peak_memory,
+        )
+        for prof in self.profiles:
+            prof._record(record)
+        # Don't count the time spent in the callbacks
+        self._restart()
+
+
+def _nbytes(data: Any) -> int | None:
+    """Size in bytes of the data processed by a phase"""
+    if data is None:
+        return None
+    if isinstance(data, str):
+        return len(data)
+    # Duck-type numpy, pandas, and xarray objects, so that this module
+    # doesn't need to import them
+    if hasattr(data, "nbytes"):
+        return int(data.nbytes)
+    if hasattr(data, "memory_usage"):  # pandas.DataFrame
+        return int(data.memory_usage(index=False).sum())
+    return int(data)
+
+
+def _profiled(func_name: str) -> Callable[[F], F]:
+    """Decorator that measures the phases of a function, which are marked
+    by calls to :func:`_lap`. Nested and recursive calls are measured as part
+    of the outermost call.
+    """
+
+    def decorator(func: F) -> F:
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            profiles = _PROFILES.get()
+            if not profiles or _STOPWATCH.get() is not None:
+                return func(*args, **kwargs)
+            token = _STOPWATCH.set(_Stopwatch(func_name, profiles))
+            try:
+                return func(*args, **kwargs)
+            finally:
+                _STOPWATCH.reset(token)
+
+        return cast(F, wrapper)
+
+    return decorator
+
+
+def _lap(phase: str, data: Any = None) -> None:
+    """Mark the end of a phase of the function decorated by :func:`_profiled`
+    that is currently running. Do nothing if profiling is disabled.
+
+    :param phase:
+        Name of the phase that just ended
+    :param data:
+        Data processed by the phase: str, numpy array, pandas or xarray
+        object, or number of bytes. Its size is only computed when profiling
+        is enabled.
+    """
+    stopwatch = _STOPWATCH.get()
+    if stopwatch is not None:
+        stopwatch.lap(phase, data)
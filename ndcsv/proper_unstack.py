@@ -5,16 +5,22 @@ Copy-pasted from xarray-extras
 
 from __future__ import annotations
 
-from collections.abc import Hashable
-from typing import TypeVar
+import contextvars
+import functools
+import threading
+from collections.abc import Callable, Hashable, Iterator
+from typing import Any, TypeVar, Union
 
+import numpy as np
 import pandas as pd
 import xarray
 
 T = TypeVar("T", xarray.DataArray, xarray.Dataset)
+#: numpy array or function (shape, dtype) -> numpy array
+Out = Union[np.ndarray, Callable[[tuple[int, ...], np.dtype], np.ndarray]]
 
 
-def proper_unstack(array: T, dim: Hashable) -> T:
+def proper_unstack(array: T, dim: Hashable, *, out: Out | None = None) -> T:
     """Work around an issue in xarray that causes the data to be sorted
     alphabetically by label on unstack():
 
@@ -29,38 +35,291 @@ def proper_unstack(array: T, dim: Hashable) -> T:
         xarray.DataArray or xarray.Dataset to unstack
     :param Hashable dim:
         Name of existing dimension to unstack
+    :param out:
+        DataArray only. Optional numpy array to write the result into, or
+        function that accepts the shape and dtype of the result and returns
+        such an array. See :func:`ndcsv.read_csv`.
     :returns:
         xarray.DataArray or xarray.Dataset with unstacked dimension
     """
-    # Regenerate Pandas multi-index to be ordered by first appearance
-    mindex = array.coords[dim].to_pandas().index
-
+    mindex = array.get_index(dim)
     prev_names: list[Hashable] = mindex.names
-    levels = []
-    codes = []
-
-    for levels_i, codes_i in zip(mindex.levels, mindex.codes):
-        level_map: dict[Hashable, int] = {}
-
-        for code in codes_i:
-            if code not in level_map:
-                level_map[code] = len(level_map)
-
-        levels.append([levels_i[k] for k in level_map])
-        codes.append([level_map[k] for k in codes_i])
-
-    mindex = pd.MultiIndex(levels, codes, names=mindex.names)
-    array = array.copy()
-    array = array.drop_vars([dim, *prev_names])
-    array.coords.update(xarray.Coordinates.from_pandas_multiindex(mindex, dim))
+    plan = _unstack_plan(mindex)
+    # Regenerate Pandas multi-index to be ordered by first appearance
+    levels = [
+        level if order is None else level[order]
+        for level, order in zip(mindex.levels, plan.order)
+    ]
+    codes = plan.codes
 
-    # Invoke builtin unstack
-    array = array.unstack((dim,))
+    if isinstance(array, xarray.DataArray) and all(
+        k == dim or k in prev_names or dim not in v.dims
+        for k, v in array.coords.items()
+    ):
+        array = _unstack_dataarray(array, dim, levels, plan, prev_names, out=out)
+    else:
+        mindex = pd.MultiIndex(levels, codes, names=prev_names)
+        # Replace the coords on a shallow copy; don't deep-copy the data.
+        array = array.drop_vars([dim, *prev_names])
+        array.coords.update(xarray.Coordinates.from_pandas_multiindex(mindex, dim))
+        # Invoke builtin unstack
+        array = array.unstack((dim,))
+        if out is not None:
+            assert isinstance(array, xarray.DataArray)
+            array = _copy_to_out(array, out)
 
     # Convert numpy arrays of Python objects to numpy arrays of C floats, ints,
     # strings, etc.
-    for name in mindex.names:
+    for name in prev_names:
         if array.coords[name].dtype == object:
             array.coords[name] = array.coords[name].values.tolist()
 
     return array
+
+
+def _unique(codes: np.ndarray, block_size: int = 2**16) -> np.ndarray:
+    """Equivalent to :func:`pandas.unique`, which internally casts the whole
+    input to int64. Process one block at a time, so that the temporary array
+    doesn't take 8 times the memory of the typical int8 or int16 codes.
+    """
+    if codes.size <= block_size:
+        return pd.unique(codes)
+    blocks = [
+        pd.unique(codes[i : i + block_size]) for i in range(0, codes.size, block_size)
+    ]
+    return pd.unique(np.concatenate(blocks))
+
+
+#: Cache of :func:`_unstack_plan`, which is enabled by
+#: :func:`~ndcsv.read_dataset` and :func:`~ndcsv.read_archive` for all the
+#: files they read
+_UNSTACK_PLAN_CACHE: contextvars.ContextVar[
+    dict[tuple[tuple[int, str, bytes], ...], list[Any]] | None
+] = contextvars.ContextVar("ndcsv_unstack_plan_cache", default=None)
+
+
+def _unstack_plan(mindex: pd.MultiIndex) -> _UnstackPlan:
+    """Return the :class:`_UnstackPlan` of a MultiIndex.
+
+    Many files that share the same labels on the rows, e.g. the variables of
+    a Dataset, have MultiIndexes with the same codes; if the cache is enabled,
+    they compute the plan only once. Like the cache of the row labels, this
+    is only enabled on request, as the codes can be very long.
+    """
+    cache = _UNSTACK_PLAN_CACHE.get()
+    if cache is None:
+        return _UnstackPlan(mindex)
+    key = tuple(
+        (len(level), codes.dtype.str, codes.tobytes())
+        for level, codes in zip(mindex.levels, mindex.codes)
+    )
+    # [lock] or [lock, plan]; see :func:`ndcsv.read._convert_row_labels`
+    entry = cache.setdefault(key, [threading.Lock()])
+    with entry[0]:
+        if len(entry) == 1:
+            entry.append(_UnstackPlan(mindex))
+    return entry[1]
+
+
+class _UnstackPlan:
+    """How to unstack a MultiIndex, using a first-seen order. This only
+    depends on the codes of the MultiIndex and on the number of labels of
+    each of its levels, and not on the labels themselves.
+
+    Instances are shared between calls; don't modify their arrays.
+    """
+
+    def __init__(self, mindex: pd.MultiIndex):
+        #: For each level, positions of its labels in first-seen order, or
+        #: None if they are already in that order
+        self.order: list[np.ndarray | None] = []
+        #: Codes of each level, in first-seen order. -1 codes are NaNs.
+        self.codes: list[np.ndarray] = []
+
+        for levels_i, codes_i in zip(mindex.levels, mindex.codes):
+            # -1 codes are NaNs
+            seen = _unique(codes_i)
+            seen = seen[seen >= 0]
+            if len(seen) == len(levels_i) and (seen == np.arange(len(seen))).all():
+                # Already in first-seen order
+                self.order.append(None)
+                self.codes.append(codes_i)
+                continue
+            level_map = np.full(len(levels_i) + 1, -1, dtype=codes_i.dtype)
+            level_map[seen] = np.arange(len(seen))
+            self.order.append(seen)
+            self.codes.append(level_map[codes_i])
+
+        #: Shape of the unstacked dims
+        self.shape = tuple(
+            len(level) if order is None else len(order)
+            for level, order in zip(mindex.levels, self.order)
+        )
+
+    @property
+    def size(self) -> int:
+        """Size of the unstacked dims"""
+        return int(np.prod(self.shape))
+
+    @property
+    def num_rows(self) -> int:
+        """Size of the stacked dim"""
+        return len(self.codes[0]) if self.codes else 0
+
+    def positions(self) -> Iterator[tuple[slice, np.ndarray]]:
+        """Flat position of every element of the stacked dim in the unstacked
+        dims. The positions are computed one block of elements at a time, into
+        the same buffer, so that they never take as much memory as the data.
+
+        :returns:
+            Iterator of tuples of (slice of the stacked dim, positions). The
+            positions are overwritten by the next iteration.
+        """
+        buf = np.empty(min(self.num_rows, _BLOCK_SIZE), dtype=np.intp)
+        for start in range(0, self.num_rows, _BLOCK_SIZE):
+            block = slice(start, start + _BLOCK_SIZE)
+            pos = buf[: len(self.codes[0][block])]
+            # Same as np.ravel_multi_index, without casting all the codes to
+            # intp at once
+            pos[:] = self.codes[0][block]
+            for codes_i, size_i in zip(self.codes[1:], self.shape[1:]):
+                pos *= size_i
+                pos += codes_i[block]
+            yield block, pos
+
+    @functools.cached_property
+    def has_nans(self) -> bool:
+        """True if there are NaNs in the MultiIndex"""
+        return any((c < 0).any() for c in self.codes)
+
+    @functools.cached_property
+    def is_unique(self) -> bool:
+        """True if there are no duplicates in the MultiIndex. Requires
+        :attr:`has_nans` to be False.
+        """
+        found = np.zeros(self.size, dtype=bool)
+        for _, pos in self.positions():
+            found[pos] = True
+        return int(found.sum()) == self.num_rows
+
+    @functools.cached_property
+    def is_range(self) -> bool:
+        """True if the positions are exactly ``range(size)``. Requires
+        :attr:`is_unique` to be True.
+        """
+        if self.num_rows != self.size:
+            return False
+        # There are no duplicates, so the positions are a permutation of
+        # range(size). If they're also sorted, then they're exactly range(size).
+        prev = -1
+        for _, pos in self.positions():
+            if pos[0] <= prev or (pos[1:] <= pos[:-1]).any():
+                return False
+            prev = pos[-1]
+        return True
+
+
+#: Number of elements of the stacked dim whose positions are computed at once
+#: by :meth:`_UnstackPlan.positions`
+_BLOCK_SIZE = 2**16
+
+
+def _unstack_dataarray(
+    array: xarray.DataArray,
+    dim: Hashable,
+    levels: list[pd.Index],
+    plan: _UnstackPlan,
+    names: list[Hashable],
+    *,
+    out: Out | None = None,
+) -> xarray.DataArray:
+    """Unstack a DataArray without non-index coords along the stacked dim.
+
+    :meth:`xarray.DataArray.unstack` holds up to 4 times the size of the data
+    in memory at once. This function instead allocates the output once and
+    scatters the input into it. When the MultiIndex is already the ordered
+    cartesian product of its levels, which is the case of any array that was
+    stacked by :meth:`xarray.DataArray.stack`, and the dim is the last one,
+    the output is a view of the input.
+    """
+    shape = plan.shape
+    size = plan.size
+    if plan.has_nans:
+        raise ValueError("Cannot unstack MultiIndex containing NaNs")
+    if not plan.is_unique:
+        raise ValueError(
+            f"cannot unstack dimension with duplicate index values: {dim!r} ({names})"
+        )
+
+    data = np.moveaxis(array.values, array.dims.index(dim), -1)
+    sparse = plan.num_rows < size
+    dtype, fill_value = _maybe_promote(data.dtype) if sparse else (data.dtype, None)
+    if out is None and plan.is_range:
+        out = data.reshape(data.shape[:-1] + shape)
+    else:
+        if out is not None:
+            out = _resolve_out(out, data.shape[:-1] + shape, dtype)
+            flat_out = out.reshape(*data.shape[:-1], size)
+            if sparse:
+                flat_out[...] = fill_value
+        elif sparse:
+            flat_out = np.full((*data.shape[:-1], size), fill_value, dtype=dtype)
+        else:
+            flat_out = np.empty_like(data, shape=(*data.shape[:-1], size))
+        for block, pos in plan.positions():
+            flat_out[..., pos] = data[..., block]
+        out = flat_out.reshape(data.shape[:-1] + shape)
+
+    # Drop the stacked dim, then add the unstacked dims on the right.
+    # expand_dims() returns a broadcasted view, which is then replaced.
+    template = array.isel({dim: 0}, drop=True).expand_dims(
+        dict(zip(names, levels)), axis=list(range(array.ndim - 1, out.ndim))
+    )
+    return template.copy(deep=False, data=out)
+
+
+def _maybe_promote(dtype: np.dtype) -> tuple[np.dtype, object]:
+    """Return the dtype and fill value for the missing elements after
+    unstacking. This mimics what :meth:`xarray.DataArray.unstack` does.
+    """
+    if dtype.kind in "fc":
+        return dtype, np.nan
+    if dtype.kind in "iu":
+        return np.result_type(dtype, np.float32), np.nan
+    if dtype.kind in "mM":
+        return dtype, np.array("NaT", dtype=dtype)
+    return np.dtype(object), np.nan
+
+
+def _resolve_out(out: Out, shape: tuple[int, ...], dtype: np.dtype) -> np.ndarray:
+    """Validate the ``out`` parameter of :func:`ndcsv.read_csv` and
+    :func:`proper_unstack` against the shape and dtype of the result.
+
+    :param out:
+        numpy array or function (shape, dtype) -> numpy array
+    :returns:
+        numpy array that the result can be written into
+    :raises ValueError:
+        if out has the wrong shape, the dtype can't be safely cast to out,
+        or out is not a writeable, C-contiguous array
+    """
+    if callable(out):
+        out = out(shape, dtype)
+    if not isinstance(out, np.ndarray):
+        raise TypeError(f"out must be a numpy array; got {type(out)}")
+    if out.shape != shape:
+        raise ValueError(f"out has shape {out.shape}; the data has shape {shape}")
+    if not np.can_cast(dtype, out.dtype):
+        raise ValueError(f"out has dtype {out.dtype}; the data has dtype {dtype}")
+    if not out.flags.writeable or not out.flags.c_contiguous:
+        raise ValueError("out must be a writeable, C-contiguous array")
+    return out
+
+
+def _copy_to_out(array: xarray.DataArray, out: Out) -> xarray.DataArray:
+    """Copy the data of array into out and return a new DataArray that wraps
+    out
+    """
+    out = _resolve_out(out, array.shape, array.dtype)
+    out[...] = array.values
+    return array.copy(deep=False, data=out)
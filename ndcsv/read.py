@@ -5,20 +5,39 @@ See :doc:`format` for format specs
 
 from __future__ import annotations
 
+import contextvars
 import csv
+import functools
 import io
+import os
 import re
-from collections.abc import Hashable
-from typing import Any, TextIO, cast
+import threading
+import warnings
+import zipfile
+import zlib
+from collections.abc import Callable, Hashable, Iterator
+from typing import IO, Any, BinaryIO, Literal, NamedTuple, TextIO, cast
 
+import numpy as np
 import pandas as pd
 import pshell as sh
+import xarray
 from xarray import DataArray
 
-from ndcsv.proper_unstack import proper_unstack
+from ndcsv.profiling import Progress, _lap, _profiled
+from ndcsv.proper_unstack import Out, _copy_to_out, _resolve_out, proper_unstack
 
 
-def read_csv(path_or_buf: str | TextIO, unstack: bool = True) -> DataArray:
+@_profiled("read_csv")
+def read_csv(
+    path_or_buf: str | IO,
+    unstack: bool = True,
+    *,
+    member: str | None = None,
+    engine: Literal["pandas", "numpy"] = "pandas",
+    out: Out | None = None,
+    progress: Progress | None = None,
+) -> DataArray:
     """Parse an NDCSV file into a :class:`xarray.DataArray`.
 
     This function is conceptually similar to :func:`pandas.read_csv`, except
@@ -26,6 +45,27 @@ def read_csv(path_or_buf: str | TextIO, unstack: bool = True) -> DataArray:
     :doc:`format` and, by design, does not offer any of the many config
     switches available in :func:`pandas.read_csv`.
 
+    The file is parsed in chunks of rows, and every step after parsing either
+    works on views or releases its inputs as soon as possible. Peak memory
+    usage, on top of the file buffer, is at most:
+
+    - twice the size of the returned array, plus
+    - ~24 bytes for every row of the file, plus
+    - a few MiB for the chunk of rows being parsed, plus
+    - with ``engine="pandas"``, ~1.5 kiB for every column of the file. Prefer
+      ``engine="numpy"`` for files with many thousands of columns.
+
+    With ``engine="pandas"``, if pandas infers different dtypes for different
+    chunks, e.g. ints in the first chunk and strings in a later one, the file
+    is silently read again all at once in order to replicate pandas' type
+    recognition; the above bound does not apply in this case.
+
+    Small files, up to 32 kiB, with at most 2 dimensions, no MultiIndex, no
+    non-index coords, and only numbers in the body, are parsed without pandas
+    to reduce the fixed overhead of each call. Their values are parsed the
+    same way as by the chosen engine, so the result does not depend on the
+    size of the file.
+
     :param path_or_buf:
         One of:
 
@@ -34,6 +74,9 @@ def read_csv(path_or_buf: str | TextIO, unstack: bool = True) -> DataArray:
           is inferred automatically)
         - file-like object open for reading. It must support rewinding through
           ``seek(0)``.
+        - with ``member``, path to a zip archive written by
+          :func:`~ndcsv.write_archive`, or binary file-like object open for
+          reading it
 
     :param bool unstack:
         Set to True (the default) to automatically unstack any and all stacked
@@ -45,53 +88,1021 @@ def read_csv(path_or_buf: str | TextIO, unstack: bool = True) -> DataArray:
 
         Set to False to return the stacked dimensions as they appear in
         the CSV file.
+    :param str member:
+        Name of the array to read from a zip archive; see
+        :func:`~ndcsv.write_archive`. Only this member is read and
+        decompressed.
+    :param str engine:
+        Parser for the values. One of:
+
+        ``pandas`` (default)
+            Use :func:`pandas.read_csv`
+        ``numpy``
+            Parse ints and floats straight into a 2-D numpy array, without
+            building an intermediate :class:`pandas.DataFrame`. Floats are
+            parsed exactly, whereas pandas may be off by one unit in the last
+            place, at the cost of being slower. Fall back to pandas if any
+            value is not an int or a float, e.g. for strings, bools, or NaNs.
+    :param out:
+        Optional numpy array to write the data into, e.g. one backed by
+        :class:`multiprocessing.shared_memory.SharedMemory`. The returned
+        DataArray wraps it. It must be writeable, C-contiguous, have the same
+        shape as the result and a dtype that the data can be safely cast to.
+
+        Alternatively, a function that accepts the shape and dtype of the
+        data, which are not known until the file has been parsed, and returns
+        such an array.
+
+        The data is unstacked straight into out, without an intermediate copy
+        of the whole result.
+    :param progress:
+        Optional function ``progress(done, total)``, which is invoked after
+        parsing each chunk of rows with the number of bytes read so far and
+        the total size of the file, in bytes. For compressed files, these are
+        the bytes of the compressed file. For file-like objects that don't
+        wrap a file on disk, e.g. :class:`io.StringIO`, these are the
+        positions returned by ``tell()``.
     :returns:
         :class:`xarray.DataArray`
     """
+    if engine not in ("pandas", "numpy"):
+        raise ValueError(f"engine must be 'pandas' or 'numpy'; got {engine!r}")
+
+    if member is not None:
+        with zipfile.ZipFile(path_or_buf) as zf, _open_member(zf, member) as buf:
+            return read_csv(
+                buf, unstack=unstack, engine=engine, out=out, progress=progress
+            )
+
     if isinstance(path_or_buf, str):
         with sh.open(path_or_buf) as fh:
-            return read_csv(cast(TextIO, fh), unstack=unstack)
+            return read_csv(
+                cast(TextIO, fh),
+                unstack=unstack,
+                engine=engine,
+                out=out,
+                progress=progress,
+            )
+
+    buf = cast(TextIO, path_or_buf)
+    report = _progress_reporter(buf, progress)
+    xa = _read_small(buf, engine)
+    if xa is not None:
+        report()
+        if out is not None:
+            xa = _copy_to_out(xa, out)
+        _lap("unpack", xa)
+        return xa
 
-    xa = _buf_to_xarray(path_or_buf)
+    xa = _buf_to_xarray(buf, engine, report)
+    report()
     assert xa.ndim in (0, 1, 2)
+    _lap("body", xa)
     # print(f"==== _buf_to_array:\n{xa}")
 
-    xa = _coords_format_conversion(xa)
+    if xa.ndim > 0:
+        xa = _coords_format_conversion(xa, xa.dims[0])
     assert xa.ndim in (0, 1, 2)
+    _lap("coords", xa)
     # print(f"==== _coords_format_conversion:\n{xa}")
 
+    # Only the last unstack writes into out.
+    # Keep track of whether it actually happened.
+    out_used = []
+
+    def out_factory(shape: tuple[int, ...], dtype: np.dtype) -> np.ndarray:
+        assert out is not None
+        out_used.append(True)
+        return _resolve_out(out, shape, dtype)
+
+    factory = out_factory if out is not None else None
     if xa.ndim == 1:
-        xa = _unpack(xa, xa.dims[0], unstack)
+        xa = _unpack(xa, xa.dims[0], unstack, out=factory)
         # print(f"==== _unpack(dim_0):\n{xa}")
     elif xa.ndim == 2:
         dims = xa.dims
-        xa = _unpack(xa, dims[0], unstack)
+        if isinstance(xa.get_index(dims[1]), pd.MultiIndex):
+            rows_out, cols_out = None, factory
+        else:
+            rows_out, cols_out = factory, None
+        xa = _unpack(xa, dims[0], unstack, out=rows_out)
         # print(f"==== _unpack(dim_0):\n{xa}")
-        xa = _unpack(xa, dims[1], unstack)
+        xa = _unpack(xa, dims[1], unstack, out=cols_out)
         # print(f"==== _unpack(dim_1):\n{xa}")
 
+    if out is not None and not out_used:
+        xa = _copy_to_out(xa, out)
+    _lap("unpack", xa)
+    return xa
+
+
+def follow_csv(
+    path: str,
+    unstack: bool = True,
+    *,
+    engine: Literal["pandas", "numpy"] = "pandas",
+) -> CsvFollower:
+    """Read an NDCSV file that is growing, e.g. because a producer keeps
+    appending rows to it, and prepare to read only the rows that will be
+    appended later on.
+
+    Example::
+
+        >>> follower = ndcsv.follow_csv("prices.csv")
+        >>> follower.array  # All the rows written so far
+        >>> new_rows = follower.refresh()  # Only the rows written since
+        >>> follower.array  # All the rows, including new_rows
+
+    The file must be uncompressed. It is read up to its last complete line;
+    a line that is still being written is picked up by the next
+    :meth:`CsvFollower.refresh`.
+
+    The file may hold only its header, or nothing at all, e.g. because the
+    producer has just created it. In this case, :attr:`CsvFollower.array` is
+    None and the header is parsed by the first :meth:`CsvFollower.refresh`
+    that finds rows after it.
+
+    :param str path:
+        Path to a .csv file with 1 or 2 dimensions
+    :param bool unstack:
+        See :func:`read_csv`. The rows are never unstacked, so that new rows
+        can be appended to them; it is an error to set it to True for a file
+        with a MultiIndex on the rows.
+    :param str engine:
+        See :func:`read_csv`
+    :returns:
+        :class:`CsvFollower`
+    """
+    return CsvFollower(path, unstack, engine)
+
+
+class CsvFollower:
+    """Output of :func:`follow_csv`. Do not instantiate directly."""
+
+    def __init__(
+        self,
+        path: str,
+        unstack: bool = True,
+        engine: Literal["pandas", "numpy"] = "pandas",
+    ):
+        if path.endswith((".gz", ".bz2", ".xz")):
+            raise ValueError("Cannot follow a compressed file")
+        self._path = path
+        self._unstack = unstack
+        self._engine = engine
+        self._pieces: list[DataArray] = []
+        self._offset = 0
+        self._start()
+
+    def _start(self) -> None:
+        """Parse the header and the rows of the whole file, if there are any
+        rows after the header
+        """
+        with open(self._path, "rb") as fh:
+            data = fh.read()
+        data = data[: data.rfind(b"\n") + 1]
+        text = data.decode("utf-8")
+        lines: list[str] = []
+        _, size = _sniff_header(io.StringIO(text), lines)
+        if size is None:
+            # Only the header, or part of it, has been written so far. Every
+            # row of the header of a file with 1 or more dimensions has 2 or
+            # more cells, counting the trailing empty ones.
+            if all(len(row) > 1 for row in csv.reader(lines) if row):
+                return
+            raise ValueError("Cannot follow a 0-dimensional or malformed file")
+        self._header_text = "".join(lines[: size.num_header_lines])
+        self._header = self._header_text.encode("utf-8")
+        self._header_crc = zlib.crc32(self._header)
+
+        index_names = _parse_header(self._header_text, size.num_index_col).index_names
+        # Non-index coords are formatted as `name (dim)`
+        num_index = sum(not re.match(r"(.+) \((.+)\)$", n) for n in index_names)
+        if self._unstack and num_index > 1:
+            raise ValueError(
+                "Cannot follow a file with a MultiIndex on the rows with unstack=True"
+            )
+
+        array = self._read(text)
+        self._dim = array.dims[0]
+        self._pieces = [array]
+        self._offset = len(data)
+
+    @property
+    def array(self) -> DataArray | None:
+        """All the rows read so far. The rows read by every
+        :meth:`refresh` are concatenated only when this is accessed.
+        None if the file had no rows after its header yet.
+        """
+        if not self._pieces:
+            return None
+        if len(self._pieces) > 1:
+            self._pieces = [
+                xarray.concat(
+                    self._pieces,
+                    dim=self._dim,
+                    coords="minimal",
+                    compat="override",
+                    join="exact",
+                )
+            ]
+        return self._pieces[0]
+
+    @property
+    def offset(self) -> int:
+        """Number of bytes of the file read so far"""
+        return self._offset
+
+    @_profiled("CsvFollower.refresh")
+    def refresh(self) -> DataArray | None:
+        """Read the complete lines appended to the file since the previous
+        call, or since :func:`follow_csv`.
+
+        The header of the file, which was parsed once by :func:`follow_csv`,
+        is validated by checksum. The new rows are parsed and their labels
+        converted on their own; the cost is proportional to the new rows,
+        not to the whole file.
+
+        :returns:
+            :class:`xarray.DataArray` with the new rows only, or None if
+            there are no new complete lines. The new rows are also added to
+            :attr:`array`.
+        :raises ValueError:
+            If the file was truncated or its header changed, e.g. because it
+            was rewritten from scratch. Call :func:`follow_csv` again.
+        """
+        if not self._pieces:
+            # The file had no rows yet; parse its header now
+            self._start()
+            return self.array
+
+        with open(self._path, "rb") as fh:
+            header = fh.read(len(self._header))
+            if zlib.crc32(header) != self._header_crc:
+                raise ValueError(f"The header of {self._path} changed")
+            if os.fstat(fh.fileno()).st_size < self._offset:
+                raise ValueError(f"{self._path} was truncated")
+            fh.seek(self._offset)
+            data = fh.read()
+        data = data[: data.rfind(b"\n") + 1]
+        _lap("read", len(header) + len(data))
+        if not data:
+            return None
+
+        array = self._read(self._header_text + data.decode("utf-8"))
+        self._pieces.append(array)
+        self._offset += len(data)
+        return array
+
+    def _read(self, text: str) -> DataArray:
+        """Parse the header and the rows of the file"""
+        array = read_csv(io.StringIO(text), self._unstack, engine=self._engine)
+        if array.ndim == 0:
+            raise ValueError("Cannot follow a 0-dimensional file")
+        return array
+
+
+#: Names of the NDCSV files in a directory or of the members of a zip archive.
+#: The first group is the name of the array.
+_FILE_NAME = re.compile(r"(.+)\.csv(\.gz|\.bz2|\.xz)?$")
+
+
+def _open_member(zf: zipfile.ZipFile, member: str) -> TextIO:
+    """Open a member of a zip archive for reading as text
+
+    :param member:
+        Name of the array, e.g. ``foo`` for ``foo.csv.gz``, or full name of
+        the member
+    """
+    names = zf.namelist()
+    if member not in names:
+        matches = [
+            name
+            for name in names
+            if (m := _FILE_NAME.fullmatch(name)) and m.group(1) == member
+        ]
+        if not matches:
+            raise KeyError(f"No array named {member!r} in the archive")
+        if len(matches) > 1:
+            raise ValueError(f"Multiple members for array {member}")
+        member = matches[0]
+    return _decompress(cast(BinaryIO, zf.open(member)), member)
+
+
+def _decompress(raw: BinaryIO, fname: str) -> TextIO:
+    """Wrap a binary buffer, compressed according to the extension of fname,
+    into a text buffer
+    """
+    for ext, compression in _COMPRESSIONS.items():
+        if fname.endswith(ext):
+            return cast(TextIO, sh.open(raw, compression=compression))
+    # Same defaults as pshell.open
+    return io.TextIOWrapper(raw, encoding="utf-8", errors="replace")
+
+
+_COMPRESSIONS: dict[str, Literal["gzip", "bzip2", "lzma"]] = {
+    ".gz": "gzip",
+    ".bz2": "bzip2",
+    ".xz": "lzma",
+}
+
+
+#: Files up to this many characters are read by :func:`_read_small`
+_SMALL_FILE_CHARS = 2**15
+
+
+def _read_small(
+    buf: TextIO, engine: Literal["pandas", "numpy"] = "pandas"
+) -> DataArray | None:
+    """Fast path of read_csv() for small files, e.g. config tables or FX rates,
+    where the fixed overhead of pandas and xarray would dominate.
+
+    :param engine:
+        See :func:`read_csv`
+    :returns:
+        The final DataArray, or None if the file is too large or is not
+        supported by :func:`_parse_small`. In this case, buf is rewound.
+    """
+    text = buf.read(_SMALL_FILE_CHARS + 1)
+    xa = _parse_small(text, engine) if len(text) <= _SMALL_FILE_CHARS else None
+    if xa is None:
+        buf.seek(0)
     return xa
 
 
-def _buf_to_xarray(buf: TextIO) -> DataArray:
+def _parse_small(
+    text: str, engine: Literal["pandas", "numpy"] = "pandas"
+) -> DataArray | None:
+    """Parse the whole text of a file with :mod:`csv` and build the final
+    DataArray straight from numpy arrays, without intermediate pandas or
+    xarray objects and without :func:`_coords_format_conversion` and
+    :func:`_unpack`.
+
+    Only files with 0 to 2 dimensions, no MultiIndex, no non-index coords, and
+    only ints, floats, and NaNs in the body are supported.
+
+    :param text:
+        whole text of the file
+    :param engine:
+        See :func:`_parse_numbers`
+    :returns:
+        DataArray, or None if the file is not supported
+    """
+    lines: list[str] = []
+    # Don't strip the body rows, which may end with empty cells (NaN)
+    rows: list[list[str]] = []
+    # Number of lines of text read after each row
+    rows_end: list[int] = []
+    for row in csv.reader(_record_lines(io.StringIO(text), lines)):
+        if row:
+            rows.append(row)
+            rows_end.append(len(lines))
+    num_header_rows = _small_num_header_rows(rows)
+    if num_header_rows is None:
+        return None
+
+    if num_header_rows == 0:
+        # 0-dimensional file
+        value = _parse_numbers(np.array([rows[0][0].strip()]), engine)
+        if value is None:
+            return None
+        _lap("header", "")
+        _lap("body", value)
+        _lap("coords")
+        return DataArray(value[0])
+
+    dims = [rows[i][0].strip() for i in reversed(range(num_header_rows))]
+    ncols = len(rows[0]) - 1 if num_header_rows == 2 else 1
+    body = rows[num_header_rows:]
+    if any(len(row) != ncols + 1 for row in body):
+        return None
+    labels = np.array([row[0] for row in body])
+    values = _parse_numbers(np.array([row[1:] for row in body]), engine)
+    if values is None or np.isin(labels, _NA_VALUES).any():
+        return None
+
+    header_text = "".join(lines[: rows_end[num_header_rows - 1]])
+    header = _parse_header(header_text, 1)
+    _lap("header", header_text)
+    _lap("body", values)
+
+    coords = {dims[0]: _convert_row_labels(labels)}
+    if num_header_rows == 1:
+        values = values[:, 0]
+    else:
+        # Copy the cached numpy array, so that it can't be altered
+        ((_, columns),) = header.columns
+        coords[dims[1]] = columns.copy()
+    xa = DataArray(values, dims=dims, coords=coords)
+    _lap("coords", xa)
+    return xa
+
+
+def _small_num_header_rows(rows: list[list[str]]) -> int | None:
+    """Detect the layout of a file for :func:`_parse_small`.
+
+    :param rows:
+        all the non-empty rows of the file
+    :returns:
+        number of header rows: 0 for a 0-dimensional file, 1 for a
+        1-dimensional file, 2 for a 2-dimensional file without MultiIndex.
+        None for anything else, including files with non-index coords.
+    """
+    if not rows:
+        return None
+    header = [[cell.strip() for cell in row] for row in rows[:2]]
+    for row in header:
+        while row and row[-1] == "":
+            del row[-1]
+
+    if len(header) == 1:
+        num_header_rows = 0 if len(header[0]) == 1 else None
+    elif len(header[0]) == 1 and len(header[1]) == 2:
+        num_header_rows = 1
+    elif (
+        len(rows) > 2
+        and len(header[0]) > 1
+        and header[0][1] != ""
+        and len(header[1]) == 1
+        # No empty cells to the right of the column labels
+        and len(header[0]) == len(rows[0])
+    ):
+        num_header_rows = 2
+    else:
+        return None
+
+    if any(re.match(r"(.+) \((.+)\)$", row[0]) for row in header[:num_header_rows]):
+        # Non-index coords
+        return None
+    return num_header_rows
+
+
+def _parse_numbers(
+    cells: np.ndarray, engine: Literal["pandas", "numpy"] = "pandas"
+) -> np.ndarray | None:
+    """Parse an array of strings containing ints, floats, and the NaN
+    representations of :func:`pandas.read_csv` to an array of int64 or
+    float64. Return None if any cell is anything else.
+
+    :param engine:
+        "numpy" parses floats exactly, like ``engine="numpy"`` of
+        :func:`read_csv`; "pandas" replicates the float parser of
+        :func:`pandas.read_csv`, which may differ in the last bit.
+    """
+    missing = np.isin(cells, _NA_VALUES)
+    chars = np.ascontiguousarray(cells[~missing]).view(np.uint32)
+    if (chars >= 128).any() or not _NUMERIC[chars].all():
+        return None
+    is_float = missing.any() or _FLOAT_CHARS[chars].any()
+    try:
+        if is_float and engine == "pandas":
+            # Same parser as pandas.read_csv(float_precision="high")
+            out = np.full(cells.shape, np.nan)
+            out[~missing] = pd.to_numeric(cells[~missing].astype(object))
+            return out
+        if is_float:
+            return np.where(missing, "nan", cells).astype(np.float64)
+        return cells.astype(np.int64)
+    except (ValueError, OverflowError):
+        # e.g. 2017-01-01, or more than 64 bits
+        return None
+
+
+def _buf_to_xarray(
+    buf: TextIO,
+    engine: Literal["pandas", "numpy"] = "pandas",
+    report: Callable[[], None] | None = None,
+) -> DataArray:
     """Step 1 of read_csv().
     Read text buffer object and convert it to a :class:`xarray.DataArray`.
 
     - the Array always has 0, 1, or 2 dimensions
     - in case of MultiIndex, dims are arbitrarily labelled dim0, dim1
-    - coords may be MultiIndexes
+    - coords on the rows and on the columns may be MultiIndexes
+    - coords on the columns have already been converted by
+      :func:`_convert_coord`
     - non-index coords are merged inside the MultiIndex with the label
       `coord name (dim)`
-    - coords are auto-converted by Pandas (poorly)
-    - bools and datetimes are in string format
+    - coords on the rows are auto-converted by Pandas (poorly)
+    - bools and datetimes on the rows are in string format
     - Anything inside a MultiIndex has dtype=object
     """
-    reader = csv.reader(buf)
+    lines: list[str] = []
+    rows, size = _sniff_header(buf, lines)
+    if size is None:
+        # Reached end of file
+        _lap("header", "".join(lines))
+        if len(rows) == 1 and len(rows[0]) == 1:
+            # 0-dimensional file
+            # Let pd.read_csv() apply its magic type detection
+            df = pd.read_csv(
+                io.StringIO(rows[0][0]), header=None, float_precision="high"
+            )
+            return DataArray(df.iloc[0, 0])
+        raise ValueError("Malformed N-dimensional CSV")
+
+    num_index_col, num_header_rows, num_header_lines = size
+    header_text = "".join(lines[:num_header_lines])
+    header = _parse_header(header_text, num_index_col)
+    _lap("header", header_text)
+
+    if engine == "numpy":
+        num_columns = len(header.columns[0][1]) if header.columns else 1
+        body = _read_numeric_body(
+            buf,
+            num_header_lines,
+            header.index_names,
+            num_columns,
+            report,
+        )
+    else:
+        body = _read_pandas_body(buf, num_header_rows, header.index_names, report)
+    if body is not None:
+        index, data = body
+        if isinstance(index, pd.MultiIndex):
+            index_dim: Hashable = "dim_0"
+            index_coords: Any = xarray.Coordinates.from_pandas_multiindex(
+                index, index_dim
+            )
+        else:
+            index_dim = index.name
+            index_coords = {index_dim: index}
+        # Don't pass the coords to the DataArray constructor, which would
+        # expand all the levels of a MultiIndex to the full length of the dim
+        if not header.columns:
+            return DataArray(data[:, 0], dims=[index_dim]).assign_coords(index_coords)
+        xa = DataArray(data, dims=[index_dim, "dim_1"]).assign_coords(index_coords)
+    else:
+        # Use pandas to read the whole file in one go
+        buf.seek(0)
+        df = pd.read_csv(
+            buf,
+            index_col=0 if num_index_col == 1 else list(range(num_index_col)),
+            header=None,
+            low_memory=False,
+            skiprows=num_header_rows,
+            float_precision="high",
+        )
+        df.index.names = list(header.index_names)
+
+        if not header.columns:
+            # If originally a Series, squeeze empty df dim
+            # Do not use df.squeeze() as it will convert a (1, 1) DataFrame
+            # into a scalar, whereas we always want a Series.
+            xa = DataArray(df.iloc[:, 0])
+            xa.name = None
+            return xa
+
+        xa = DataArray(df).drop_vars("dim_1")
+
+    # Copy the cached numpy arrays, so that they can't be altered
+    if len(header.columns) == 1:
+        # Simple index on the columns
+        ((columns_dim, values),) = header.columns
+        xa = xa.rename({"dim_1": columns_dim})
+        return xa.assign_coords({columns_dim: values.copy()})
+
+    # MultiIndex on the columns
+    mindex = pd.MultiIndex.from_arrays(
+        [values for _, values in header.columns],
+        names=[name for name, _ in header.columns],
+    )
+    return xa.assign_coords(xarray.Coordinates.from_pandas_multiindex(mindex, "dim_1"))
+
+
+#: Number of rows parsed at once by :func:`_read_pandas_body`
+_CHUNK_ROWS = 2**14
+
+
+class _GrowingArray:
+    """Array that grows along the first axis as chunks of rows are appended
+    to it.
+
+    Concatenating the chunks at the end would hold twice their size in
+    memory. Instead, a single buffer is grown in place with realloc by 25% at
+    a time, which for large arrays doesn't copy the data on most platforms.
+
+    The chunks must all have the same dtype, except that int64 and float64
+    chunks can be mixed; the result is then float64.
+    """
+
+    def __init__(self) -> None:
+        self._data: np.ndarray | None = None
+        #: True if _data was allocated here and can be resized
+        self._owned = False
+        self._size = 0
+        self._dtypes: set[np.dtype] = set()
+        #: Rows that hold int64, when they need to be cast to float64
+        self._int_rows: list[slice] = []
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, chunk: np.ndarray) -> None:
+        """Append a chunk of rows"""
+        start = self._size
+        self._size += len(chunk)
+        self._dtypes.add(chunk.dtype)
+        if chunk.dtype == np.int64:
+            self._int_rows.append(slice(start, self._size))
+
+        if self._data is None:
+            # Don't copy the data of files with a single chunk
+            self._data = chunk
+            return
+        if self._size > len(self._data):
+            shape = (max(self._size, len(self._data) * 5 // 4), *chunk.shape[1:])
+            if self._owned:
+                self._data.resize(shape, refcheck=False)
+            else:
+                # The first chunk is typically a view, e.g. of a DataFrame.
+                # Copy it into a buffer that can be resized.
+                data = np.empty(shape, dtype=self._data.dtype)
+                data[:start] = self._data
+                self._data = data
+                self._owned = True
+        # Store float64 rows in an int64 buffer or vice versa as raw bits, to
+        # be converted later by result()
+        self._data[start : self._size].view(chunk.dtype)[...] = chunk
+
+    def result(self) -> np.ndarray:
+        """Return the whole array. The object must not be used afterwards."""
+        data = self._data
+        assert data is not None
+        if self._owned:
+            data.resize((self._size, *data.shape[1:]), refcheck=False)
+        if len(self._dtypes) == 1:
+            return data
+
+        assert self._dtypes == {np.dtype(np.int64), np.dtype(np.float64)}
+        ints = data.view(np.int64)
+        floats = data.view(np.float64)
+        for rows in self._int_rows:
+            for start in range(rows.start, rows.stop, _CHUNK_ROWS):
+                block = slice(start, min(start + _CHUNK_ROWS, rows.stop))
+                floats[block] = ints[block].astype(np.float64)
+        return floats
+
+
+def _read_pandas_body(
+    buf: TextIO,
+    num_header_rows: int,
+    index_names: tuple[str, ...],
+    report: Callable[[], None] | None = None,
+) -> tuple[pd.Index, np.ndarray] | None:
+    """Read the body of the file with :func:`pandas.read_csv`, one chunk of
+    rows at a time.
+
+    This is much faster than csv.reader and also applies pandas automatic
+    type recognition. Reading in chunks caps peak memory usage to twice the
+    size of the values, plus a chunk: the values of each chunk are copied out
+    of their DataFrame, which is then discarded, into a growing buffer; see
+    :class:`_GrowingArray`.
+    The row labels of each chunk are immediately reduced to their unique
+    values plus small integer codes; a long format file would otherwise hold
+    one int64 or Python object per label, which can be many times the size
+    of the data itself.
+
+    :param buf:
+        text buffer of the whole file
+    :param num_header_rows:
+        number of rows of the header
+    :param index_names:
+        names of the columns of row labels
+    :param report:
+        optional function to invoke after each chunk; see
+        :func:`_progress_reporter`
+    :returns:
+        tuple of (row labels, 2-D array of values), or None if pandas inferred
+        different dtypes for different chunks. The caller must then read the
+        whole file at once to replicate pandas' type recognition.
+    """
+    num_index_col = len(index_names)
+    dtypes = None
+    values = _GrowingArray()
+    levels: list[list[pd.Index]] = [[] for _ in range(num_index_col)]
+    codes: list[list[np.ndarray]] = [[] for _ in range(num_index_col)]
+
+    buf.seek(0)
+    with pd.read_csv(
+        buf,
+        index_col=0 if num_index_col == 1 else list(range(num_index_col)),
+        header=None,
+        low_memory=False,
+        skiprows=num_header_rows,
+        float_precision="high",
+        chunksize=_CHUNK_ROWS,
+    ) as reader:
+        for df in reader:
+            index = df.index
+            if isinstance(index, pd.MultiIndex):
+                chunk_codes = list(index.codes)
+                chunk_levels = list(index.levels)
+            else:
+                chunk_codes, chunk_levels = _factorize(index)
+
+            chunk_dtypes = [level.dtype for level in chunk_levels] + list(df.dtypes)
+            if dtypes is None:
+                dtypes = chunk_dtypes
+            elif dtypes != chunk_dtypes and not (
+                _all_int_or_float(dtypes) and _all_int_or_float(chunk_dtypes)
+            ):
+                return None
+
+            for i in range(num_index_col):
+                levels[i].append(chunk_levels[i])
+                codes[i].append(chunk_codes[i])
+            values.append(df.to_numpy())
+            del df, index
+            if report is not None:
+                report()
+
+    if not values:
+        return None
+    return _build_index(levels, codes, index_names), values.result()
+
+
+def _all_int_or_float(dtypes: list[Any]) -> bool:
+    """Return True if all dtypes are int64 or float64. When all columns are
+    numbers, concatenating chunks of ints and chunks of floats gives the same
+    result as reading them at once.
+    """
+    return all(dtype in (np.int64, np.float64) for dtype in dtypes)
+
+
+def _min_int(n: int) -> type:
+    """Smallest signed int that can store the codes of n labels, plus -1"""
+    for dtype in (np.int8, np.int16, np.int32):
+        if n <= np.iinfo(dtype).max:
+            return dtype
+    return np.int64
+
+
+def _factorize(labels: Any) -> tuple[list[np.ndarray], list[pd.Index]]:
+    """Reduce a chunk of row labels to unique values and the smallest
+    possible integer codes, in first-seen order. NaNs have code -1.
+    """
+    codes, level = pd.factorize(labels)
+    return [codes.astype(_min_int(len(level)), copy=False)], [pd.Index(level)]
+
+
+def _build_index(
+    levels: list[list[pd.Index]],
+    codes: list[list[np.ndarray]],
+    index_names: tuple[str, ...],
+) -> pd.Index:
+    """Build the index on the rows from the unique labels and codes of each
+    chunk. Only a non-MultiIndex is expanded to the full length of the dim.
+
+    :param levels:
+        for each column of row labels, for each chunk, unique labels
+    :param codes:
+        for each column of row labels, for each chunk, codes of the labels
+    :param index_names:
+        names of the columns of row labels
+    """
+    merged = [_merge_codes(*args) for args in zip(levels, codes)]
+    if len(merged) == 1:
+        ((level, codes_0),) = merged
+        fill_value = np.nan if (codes_0 < 0).any() else None
+        index = level.take(codes_0, allow_fill=True, fill_value=fill_value)
+        return index.rename(index_names[0])
+
+    return pd.MultiIndex(
+        [level for level, _ in merged],
+        [codes_i for _, codes_i in merged],
+        names=list(index_names),
+        verify_integrity=False,
+    )
+
+
+def _merge_codes(
+    levels: list[pd.Index], codes: list[np.ndarray]
+) -> tuple[pd.Index, np.ndarray]:
+    """Merge the unique labels and codes of the same column of row labels,
+    taken from multiple chunks, into a single level and array of codes.
+    Preserve first-seen order; -1 (NaN) is preserved.
+    """
+    if len(levels) == 1:
+        return levels[0], codes[0]
+
+    remap, level = pd.factorize(levels[0].append(levels[1:]))
+    dtype = _min_int(len(level))
+    out: np.ndarray = np.empty(sum(c.size for c in codes), dtype=dtype)
+    start = 0
+    for level_i, codes_i in zip(levels, codes):
+        # Add -1 at the end, so that code -1 is mapped to itself
+        remap_i: np.ndarray = np.append(remap[: len(level_i)], -1).astype(dtype)
+        remap = remap[len(level_i) :]
+        out[start : start + codes_i.size] = remap_i[codes_i]
+        start += codes_i.size
+    return level, out
+
+
+#: Size in characters of the chunks of text parsed at once by
+#: :func:`_read_numeric_body`
+_CHUNK_SIZE = 2**18
+
+
+def _read_numeric_body(
+    buf: TextIO,
+    num_header_lines: int,
+    index_names: tuple[str, ...],
+    num_columns: int,
+    report: Callable[[], None] | None = None,
+) -> tuple[pd.Index, np.ndarray] | None:
+    """Implementation of ``engine="numpy"`` of :func:`read_csv`, for the most
+    common case where all the values of the body are ints or floats.
+
+    Split the row labels from the values, line by line, and parse the values
+    straight into a 2-D numpy array with :func:`numpy.fromstring`. This
+    avoids creating a pandas.DataFrame with one object per column and is
+    exact for floats, whereas pandas is not.
+
+    :param buf:
+        text buffer of the whole file
+    :param num_header_lines:
+        number of lines of text of the header
+    :param index_names:
+        names of the columns of row labels
+    :param num_columns:
+        number of columns of values
+    :param report:
+        optional function to invoke after each chunk; see
+        :func:`_progress_reporter`
+    :returns:
+        tuple of (row labels, 2-D array of values), or None if the fast path
+        can't handle the file, e.g. because of strings, bools, NaNs, or quotes.
+    """
+    buf.seek(0)
+    for _ in range(num_header_lines):
+        buf.readline()
+
+    num_index_col = len(index_names)
+    levels: list[list[pd.Index]] = [[] for _ in range(num_index_col)]
+    codes: list[list[np.ndarray]] = [[] for _ in range(num_index_col)]
+    values = _GrowingArray()
+    dtype: type = np.int64
+
+    for lines in iter(lambda: buf.readlines(_CHUNK_SIZE), []):
+        rows = _split_rows(lines, num_index_col)
+        if rows is None:
+            return None
+        for i in range(num_index_col):
+            # Don't keep one Python string per row
+            (codes_i,), (level,) = _factorize(
+                np.array([row[i] for row in rows], dtype=object)
+            )
+            codes[i].append(codes_i)
+            levels[i].append(level)
+
+        text = ",".join(row[-1] for row in rows)
+        if dtype is np.int64 and any(c in text for c in ".eEnNiI"):
+            dtype = np.float64
+        try:
+            # Older versions of numpy emit a DeprecationWarning, instead of
+            # raising, when they stop parsing at a non-numeric or empty cell
+            with warnings.catch_warnings():
+                warnings.simplefilter("error", DeprecationWarning)
+                chunk: np.ndarray = np.fromstring(text, dtype=dtype, sep=",")
+        except (ValueError, DeprecationWarning):
+            # Non-numeric or empty cells
+            return None
+        if chunk.size != len(rows) * num_columns or (
+            dtype is np.int64 and np.isin(chunk, _INT64_LIMITS).any()
+        ):
+            # Ragged rows or overflow; or DeprecationWarning suppressed in
+            # numpy <2.0
+            return None
+        values.append(chunk.reshape(len(rows), num_columns))
+        if report is not None:
+            report()
+
+    if not values or any(
+        level.isin(_NA_VALUES).any() for levels_i in levels for level in levels_i
+    ):
+        # Let pandas deal with NaN labels and with files without rows
+        return None
+    return _build_index(levels, codes, index_names), values.result()
+
+
+def _split_rows(lines: list[str], num_index_col: int) -> list[list[str]] | None:
+    """Split lines of text into row labels and the text of the values.
+    Return None in case of quoted cells or missing values.
+    """
+    text = "".join(lines)
+    if '"' in text:
+        return None
+    rows = [row.split(",", num_index_col) for row in text.splitlines() if row]
+    if any(len(row) != num_index_col + 1 for row in rows):
+        return None
+    return rows
+
+
+#: Strings that pandas.read_csv interprets as NaN by default
+_NA_VALUES = [
+    "",
+    "#N/A",
+    "#N/A N/A",
+    "#NA",
+    "-1.#IND",
+    "-1.#QNAN",
+    "-NaN",
+    "-nan",
+    "1.#IND",
+    "1.#QNAN",
+    "<NA>",
+    "N/A",
+    "NA",
+    "NULL",
+    "NaN",
+    "None",
+    "n/a",
+    "nan",
+    "null",
+]
+_INT64_LIMITS = [np.iinfo(np.int64).min, np.iinfo(np.int64).max]
+
+
+def _progress_reporter(buf: TextIO, progress: Progress | None) -> Callable[[], None]:
+    """Build a function that invokes ``progress(done, total)`` with how much
+    of buf has been read so far. See :func:`read_csv`.
+    """
+    if progress is None:
+        return lambda: None
+
+    try:
+        # File on disk, possibly compressed. fileno() of gzip, bz2, and lzma
+        # files is the one of the underlying compressed file.
+        fd = buf.fileno()
+        total = os.fstat(fd).st_size
+
+        def position() -> int:
+            return os.lseek(fd, 0, os.SEEK_CUR)
+
+    except (AttributeError, OSError):
+        # e.g. io.StringIO
+        start = buf.tell()
+        total = buf.seek(0, io.SEEK_END)
+        buf.seek(start)
+        position = buf.tell
+
+    last = -1
+
+    def report() -> None:
+        nonlocal last
+        done = min(position(), total)
+        if done != last:
+            last = done
+            progress(done, total)
+
+    return report
+
+
+def _record_lines(buf: TextIO, lines: list[str]) -> Iterator[str]:
+    """Iterate over the lines of a text buffer, keeping a copy of them"""
+    for line in buf:
+        lines.append(line)
+        yield line
+
+
+class _HeaderSize(NamedTuple):
+    """Size of the header of an NDCSV file with 1 or 2 dimensions"""
+
+    #: Number of index columns, e.g. levels of the MultiIndex on the rows
+    num_index_col: int
+    #: Number of CSV rows of the header
+    num_header_rows: int
+    #: Number of lines of text of the header. This differs from the number
+    #: of rows when there are newlines in quoted strings.
+    num_header_lines: int
+
+
+def _sniff_header(
+    buf: TextIO, lines: list[str]
+) -> tuple[list[list[str]], _HeaderSize | None]:
+    """Read the header of an NDCSV file, and nothing more than the first row
+    of the body.
+
+    :param buf:
+        Text buffer positioned at the start of the file
+    :param lines:
+        Empty list, which is populated with the lines of text read from buf
+    :returns:
+        Tuple of
+
+        - rows read so far, with whitespaces stripped from the cells and
+          empty cells to the right removed
+        - size of the header, or None if the end of the file was reached
+          first, which is the case of 0-dimensional or malformed files
+    """
+    reader = csv.reader(_record_lines(buf, lines))
 
     # Store header rows (only). Won't read the whole file with csv.reader.
     rows: list[list[str]] = []
-    columns: list = []
-    indexes: list = []
+    # Number of lines of text read after each row. This differs from the number
+    # of rows when there are newlines in quoted strings.
+    rows_end: list[int] = []
     num_index_col = None
     num_header_rows = None
 
@@ -103,6 +1114,7 @@ def _buf_to_xarray(buf: TextIO) -> DataArray:
             del row[-1]
 
         rows.append(row)
+        rows_end.append(len(lines))
 
         if len(rows) == 2 and len(rows[0]) == len(rows[1]) - 1:
             # This is a pd.Series
@@ -113,131 +1125,314 @@ def _buf_to_xarray(buf: TextIO) -> DataArray:
         if len(rows) == 3:
             # This is a pd.DataFrame
             # Do we have a MultiIndex on the rows?
-            try:
-                num_index_col = rows[0].index("") + 1
-            except ValueError:
-                # No MultiIndex on the rows
-                num_index_col = 1
+            # If so, cells 2 to N of the first row are blank.
+            num_index_col = 1
+            while num_index_col < len(rows[0]) and rows[0][num_index_col] == "":
+                num_index_col += 1
 
             # Find the first line exactly as long as num_index_col
             if len(rows[1]) == num_index_col:
-                num_header_rows = 1
-                indexes = rows[1]
-                columns = rows[0]
+                num_header_rows = 2
                 break
 
             # Find the first line exactly as long as num_index_col
             if len(rows[2]) == num_index_col:
-                num_header_rows = 2
-                indexes = rows[2]
-                columns = rows[:2]
+                num_header_rows = 3
                 break
 
         if len(rows) >= 3:
             assert num_index_col is not None
             if len(rows[-1]) == num_index_col:
-                num_header_rows = len(rows) - 1
-                indexes = rows[-1]
-                columns = rows[:-1]
+                num_header_rows = len(rows)
                 break
     else:
-        # Reached end of file
-        if len(rows) == 1 and len(rows[0]) == 1:
-            # 0-dimensional file
-            # Let pd.read_csv() apply its magic type detection
-            df = pd.read_csv(
-                io.StringIO(rows[0][0]), header=None, float_precision="high"
-            )
-            return DataArray(df.iloc[0, 0])
-        raise ValueError("Malformed N-dimensional CSV")
+        return rows, None
 
-    # Use pandas to read the whole file
-    # This is much faster than csv.reader and also applies pandas
-    # automatic type recognition.
-    buf.seek(0)
-    index_col = 0 if num_index_col == 1 else list(range(num_index_col))
+    assert num_index_col is not None
     assert num_header_rows is not None
-    header = list(range(num_header_rows))
+    return rows, _HeaderSize(
+        num_index_col, num_header_rows, rows_end[num_header_rows - 1]
+    )
 
-    # If no MultiIndex on columns and it's not a Series, read_csv should not be
-    # passed a header
-    if len(header) == 1 and len(indexes) > 0:
-        df = pd.read_csv(
-            buf,
-            index_col=index_col,
-            header=None,
-            low_memory=False,
-            skiprows=2,
-            float_precision="high",
-        )
-        df.index.names = indexes
-        df.columns = columns[num_index_col:]
-        df.columns.names = [columns[0]]
-    else:
-        df = pd.read_csv(
-            buf,
-            index_col=index_col,
-            header=header[0] if len(header) == 1 else header,
-            low_memory=False,
-            float_precision="high",
-        )
 
-    if len(indexes) == 0:
-        # If originally a Series, squeeze empty df dim
-        # Do not use df.squeeze() as it will convert a (1, 1) DataFrame
-        # into a scalar, whereas we always want a Series.
-        df = df.iloc[:, 0]
+class _Header(NamedTuple):
+    """Header of an NDCSV file with 1 or 2 dimensions"""
 
-    xa = DataArray(df)
-    xa.name = None
-    return xa
+    #: Names of the levels of the index (rows)
+    index_names: tuple[str, ...]
+    #: Names and already converted values of the coords along the columns.
+    #: Empty for a 1-dimensional file.
+    columns: tuple[tuple[str, np.ndarray], ...]
+
+
+@functools.lru_cache(maxsize=64)
+def _parse_header(text: str, num_index_col: int) -> _Header:
+    """Parse the header of an NDCSV file with 1 or 2 dimensions and convert
+    the coords along the columns.
 
+    Reading many files with identical headers is a very common use case,
+    e.g. one file per scenario or per business day. Cache the result so that
+    they don't need to be converted again; this is particularly impactful for
+    wide files.
 
-def _coords_format_conversion(xa: DataArray) -> DataArray:
+    :param text:
+        Raw text of the header rows
+    :param num_index_col:
+        Number of columns of row labels
+    """
+    rows = []
+    for row in csv.reader(io.StringIO(text)):
+        row = [cell.strip() for cell in row]
+        while row[-1] == "":
+            del row[-1]
+        rows.append(row)
+
+    if len(rows) == 1:
+        # pd.Series
+        return _Header(index_names=tuple(rows[0]), columns=())
+
+    columns = []
+    for row in rows[:-1]:
+        values = _convert_coord(np.array(row[num_index_col:]))
+        values = np.asarray(values)
+        values.flags.writeable = False
+        columns.append((row[0], values))
+    return _Header(index_names=tuple(rows[-1]), columns=tuple(columns))
+
+
+def _coords_format_conversion(xa: DataArray, dim: Hashable) -> DataArray:
     """Automated format conversion for coords
 
-    For every coord (either inside or outside of a MultiIndex), auto-convert
-    to numeric, date, or boolean
-    Any MultiIndex objects are unpacked.
+    For every coord along dim (either inside or outside of a MultiIndex),
+    auto-convert to numeric, date, or boolean.
+
+    The levels of a MultiIndex are converted in place, without ever expanding
+    them to the full length of the dim. Large stacked files repeat the same
+    few labels on every row; this keeps them in memory as integer codes until
+    the final unstack.
 
     :param xa:
         array whose coords need to be converted
+    :param dim:
+        dimension whose coords need to be converted
     :returns:
         array with converted coords
     """
-    # Unpack any MultiIndexes
-    for k, v in list(xa.coords.items()):
-        if isinstance(v.to_index(), pd.MultiIndex):
-            xa = xa.reset_index(k)
-
-    for k, v in list(xa.coords.items()):
-        # Convert numpy array of objects, as loaded by pandas, to array of
-        # int, float, etc.
-        xa.coords[k] = v.dims, v.values.tolist()
-        v_data = xa.coords[k].values
-        v_data = _try_to_date(v_data)
-        v_data = _try_to_numeric(v_data)
-        v_data = _try_to_bool(v_data)
-        xa.coords[k] = xa.coords[k].dims, v_data
-    return xa
+    index = xa.get_index(dim)
+    if not isinstance(index, pd.MultiIndex):
+        return xa.assign_coords({dim: _convert_row_labels(_index_to_numpy(index))})
+
+    levels = []
+    codes = []
+    for level, codes_i in zip(index.levels, index.codes):
+        values = np.asarray(_convert_row_labels(_index_to_numpy(level)))
+        # Conversion may merge different labels, e.g. 1 and 1.0
+        remap, _ = pd.factorize(values)
+        if remap.max(initial=-1) + 1 < len(remap):
+            _, first = np.unique(remap, return_index=True)
+            values = values[first]
+            codes_i = np.where(codes_i >= 0, remap[codes_i], -1)
+        levels.append(values)
+        codes.append(codes_i)
+
+    mindex = pd.MultiIndex(levels, codes, names=index.names, verify_integrity=False)
+    return xa.assign_coords(xarray.Coordinates.from_pandas_multiindex(mindex, dim))
+
+
+def _index_to_numpy(index: pd.Index) -> np.ndarray:
+    """Convert a :class:`pandas.Index` to a numpy array.
+    Indices of Python objects or strings become numpy arrays of ints, floats,
+    strings, etc.
+    """
+    if index.dtype.kind in "OUT":
+        return np.array(index.tolist())
+    return index.to_numpy()
+
+
+def _take(values: np.ndarray, codes: np.ndarray) -> np.ndarray:
+    """Expand the values of a level of a MultiIndex to the full length of the
+    dim. Codes of -1 are replaced with NaN.
+    """
+    out = values[codes]
+    missing = codes < 0
+    if missing.any():
+        if out.dtype.kind in "mM":
+            out[missing] = np.datetime64("NaT")
+        else:
+            out = out.astype(float if out.dtype.kind in "biuf" else object)
+            out[missing] = np.nan
+    return out
+
+
+#: Cache of :func:`_convert_row_labels`, which is enabled by
+#: :func:`~ndcsv.read_dataset` for all the files it reads
+_ROW_LABELS_CACHE: contextvars.ContextVar[dict[tuple[str, bytes], list[Any]] | None] = (
+    contextvars.ContextVar("ndcsv_row_labels_cache", default=None)
+)
+
+
+def _convert_row_labels(x: np.ndarray) -> Any:
+    """Wrapper around :func:`_convert_coord` for the labels on the rows.
 
+    Many files that share the same row labels, e.g. the variables of a
+    Dataset, convert them only once if the cache is enabled. This is the
+    counterpart of the cache of :func:`_parse_header` for the columns; unlike
+    headers, row labels can be very long, so the cache is only enabled on
+    request.
+    """
+    cache = _ROW_LABELS_CACHE.get()
+    if cache is None or x.dtype.kind != "U":
+        return _convert_coord(x)
+    # [lock] or [lock, converted labels]. The lock prevents threads that
+    # read files with the same labels at the same time from converting them
+    # more than once.
+    entry = cache.setdefault((x.dtype.str, x.tobytes()), [threading.Lock()])
+    with entry[0]:
+        if len(entry) == 1:
+            entry.append(_convert_coord(x))
+    out = entry[1]
+    # Don't share mutable numpy arrays between the outputs
+    return out.copy() if isinstance(out, np.ndarray) else out
+
+
+def _convert_coord(x: np.ndarray) -> Any:
+    """Convert a numpy array of strings to date, numeric, or bool.
+    Return anything else unaltered.
+
+    The labels are classified in a single vectorized pass on their characters,
+    and then only the matching converter is run.
+    Note that, in practice, x always contains unique labels: the index of a
+    plain dimension, the levels of a MultiIndex, or the header of the columns.
+    """
+    if x.dtype.kind != "U" or not x.size:  # unicode string
+        return x
+
+    # Unicode code points of each label, right-padded with zeros
+    chars = np.ascontiguousarray(x).view(np.uint32).reshape(x.size, -1)
+    if (chars >= 128).any():
+        return x
+    if _BOOL_CHARS[chars].all():
+        out = _try_to_bool(x)
+        if out is not x:
+            return out
+
+    has_digit = _DIGIT[chars].any(axis=1)
+    # Labels without digits can only be inf, NaN, or NaT
+    upper = np.char.upper(np.char.strip(x[~has_digit]))
+
+    # Signs are only valid at the beginning or in the exponent, e.g. -1e-5.
+    # This excludes dates such as 2017-01-01.
+    num_chars = chars[has_digit]
+    if (
+        _NUMERIC[num_chars].all()
+        and not (_SIGN[num_chars[:, 1:]] & ~_PRE_SIGN[num_chars[:, :-1]]).any()
+        and np.isin(upper, _NUMERIC_WORDS).all()
+    ):
+        out = _try_to_numeric(x)
+        if out is not x:
+            return out
+        # e.g. 2017-01-01
 
-def _try_to_date(x: Any) -> Any:
+    # Dates have digits and either separators, e.g. 2017-01-01, or the name
+    # of a month, e.g. 01JAN2017 or Jan2017. This excludes labels such as x0.
+    date_chars = chars[has_digit]
+    if (
+        _DATE_SEP[date_chars].any(axis=1) | (_ALPHA[date_chars].sum(axis=1) >= 3)
+    ).all() and np.isin(upper, _NAT_VALUES).all():
+        return _try_to_date(x)
+    return x
+
+
+def _char_table(chars: str) -> np.ndarray:
+    """Build a lookup table of ASCII code points -> bool"""
+    table = np.zeros(128, dtype=bool)
+    table[[ord(c) for c in chars]] = True
+    return table
+
+
+_DIGIT = _char_table("0123456789")
+_BOOL_CHARS = _char_table("\x00 TRUEFALSYNOtruefalsyno")
+# Zero is the padding of numpy strings
+_NUMERIC = _char_table("\x00 0123456789+-.eE")
+_SIGN = _char_table("+-")
+_FLOAT_CHARS = _char_table(".eE")
+_PRE_SIGN = _char_table(" eE")
+_DATE_SEP = _char_table("-/: .")
+_ALPHA = _char_table("ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz")
+_NUMERIC_WORDS = ["", "INF", "+INF", "-INF", "INFINITY", "+INFINITY", "-INFINITY"]
+_NAT_VALUES = ["", "NAT"]
+_NAT_LABELS = ["", "NaT", "nat", "NAT"]
+
+
+def _try_to_date(x: np.ndarray) -> Any:
     """Wrapper around :func:`pandas.to_datetime` that returns
     the input unaltered if it's not a date.
-    Don't attempt converting numeric or boolean arrays.
+
+    ISO-8601 dates, which is what :func:`~ndcsv.write_csv` writes, are parsed
+    with a fixed format. Anything else is parsed with format inference, which
+    is much slower, preferring DD/MM/YYYY to MM/DD/YYYY.
     """
-    if x.dtype.kind != "U":  # unicode string
-        return x
-    try:
+    missing = np.isin(x, _NAT_LABELS)
+    out: Any = x
+    fmt = _iso_format(x[~missing])
+    if fmt is not None:
+        out = pd.to_datetime(x, format=fmt, errors="coerce")
+        # Don't fall back to dayfirst for invalid dates such as 2017-13-01
+        return x if (out.isna() & ~missing).any() else out
+
+    # Test the first label before parsing everything
+    for n in (1, x.size):
         # In case of ambiguity, prefer European format DD/MM/YYYY to the
         # American format MM/DD/YYYY
-        return pd.to_datetime(x, dayfirst=True)
-    except ValueError:
-        return x
+        out = pd.to_datetime(x[:n], dayfirst=True, errors="coerce")
+        if (out.isna() & ~missing[:n]).any():
+            return x
+    return out
+
+
+def _iso_format(x: np.ndarray) -> str | None:
+    """Detect ISO-8601 dates and datetimes without timezone, e.g.
+    ``2017-01-02``, ``2017-01-02 03:04:05``, ``2017-01-02T03:04:05.123456``.
+
+    :param x:
+        numpy array of strings
+    :returns:
+        :func:`~datetime.datetime.strptime` format shared by all elements of
+        x, or None if the elements are not all ISO-8601 with the same length
+    """
+    if not x.size:
+        return None
+    length = len(x[0])
+    if length not in _ISO_FORMATS and not 21 <= length <= 29:
+        return None
+    chars = np.ascontiguousarray(x).view(np.uint32).reshape(x.size, -1)
+    if (chars[:, length:] != 0).any() or not chars[:, length - 1].all():
+        # Not all elements have the same length
+        return None
+
+    sep = chr(chars[0, 10]) if length > 10 else " "
+    pattern = f"dddd-dd-dd{sep}dd:dd:dd.ddddddddd"[:length]
+    for i, c in enumerate(pattern):
+        col = chars[:, i]
+        if c == "d":
+            if not ((col >= ord("0")) & (col <= ord("9"))).all():
+                return None
+        elif c not in "-: T." or (col != ord(c)).any():
+            return None
+    fmt = _ISO_FORMATS.get(length, "%Y-%m-%d %H:%M:%S.%f")
+    return fmt.replace(" ", sep)
 
 
-def _try_to_numeric(x: Any) -> Any:
+#: strptime formats of ISO-8601 dates by length, without fractions of seconds
+_ISO_FORMATS = {
+    10: "%Y-%m-%d",
+    13: "%Y-%m-%d %H",
+    16: "%Y-%m-%d %H:%M",
+    19: "%Y-%m-%d %H:%M:%S",
+}
+
+
+def _try_to_numeric(x: np.ndarray) -> Any:
     """Wrapper around :func:`pandas.to_numeric` that returns
     the input unaltered if it's a string or another non-numeric type.
 
@@ -250,116 +1445,153 @@ def _try_to_numeric(x: Any) -> Any:
 
       [_try_to_numeric(x) for x in v]
     """
-    if x.dtype.kind != "U":  # Unicode string
-        return x
-    try:
-        return pd.to_numeric(x)
-    except ValueError:
+    out = pd.to_numeric(x, errors="coerce")
+    if (np.isnan(out) & (x != "")).any():
         return x
+    return out
 
 
-_BOOL_MAP = {
-    "T": True,
-    "Y": True,
-    "YES": True,
-    "TRUE": True,
-    "F": False,
-    "N": False,
-    "NO": False,
-    "FALSE": False,
-}
+_BOOL_VALUES = ["T", "Y", "YES", "TRUE", "F", "N", "NO", "FALSE"]
+_TRUE_VALUES = ["T", "Y", "YES", "TRUE"]
 
 
-def _try_to_bool(x: Any) -> Any:
+def _try_to_bool(x: np.ndarray) -> Any:
     """Attempt converting an array of strings into an array of bools. Return
     the original, unaltered array if any element fails conversion.
     """
-    if x.dtype.kind != "U":  # Unicode string
-        return x
-    try:
-        return [_BOOL_MAP[i.upper()] for i in x.tolist()]
-    except KeyError:
+    upper = np.char.upper(np.char.strip(x))
+    if not np.isin(upper, _BOOL_VALUES).all():
         return x
+    return np.isin(upper, _TRUE_VALUES)
 
 
-def _unpack(xa: DataArray, dim: Hashable, unstack: bool = True) -> DataArray:
+def _unpack(
+    xa: DataArray, dim: Hashable, unstack: bool = True, *, out: Out | None = None
+) -> DataArray:
     """Deal with MultiIndex and non-index coords
 
     :param DataArray xa:
-        array where all MultiIndex'es have been reset
+        array as returned by :func:`_coords_format_conversion`
     :param str dim:
-        dim to unstack (dim_0 or dim_1). This function does nothing if
-        the dim is not present at all
+        dim to unstack (dim_0 or dim_1)
     :param bool unstack:
         If True, unstack all index dims using first-seen order
+    :param out:
+        See :func:`read_csv`. Only used if the dim is unstacked.
     """
-    rename_map = {}
+    index = xa.get_index(dim)
+    if not isinstance(index, pd.MultiIndex):
+        m = re.match(r"(.+) \((.+)\)$", str(dim))
+        if m:
+            # Special case where the dim is `y (x)`
+            coord_name, new_dim = m.group(1), m.group(2)
+            xa = xa.drop_vars([dim]).rename({dim: new_dim})
+            xa.coords[coord_name] = (new_dim, index.to_numpy())
+        return xa
+
     dims = []
-    index_coords = []
-    nonindex_coords = []
-
-    for k, v in xa.coords.items():
-        assert len(v.dims) == 1
-        if v.dims[0] == dim:
-            # Non-index coords are formatted as `name (dim)`
-            m = re.match(r"(.+) \((.+)\)$", str(k))
-            if m:
-                coord_name, coord_dim = m.group(1), m.group(2)
-                # Non-index coordinate
-                rename_map[k] = coord_name
-                nonindex_coords.append((k, coord_dim))
-                if coord_dim not in dims:
-                    dims.append(coord_dim)
+    index_levels = []
+    nonindex_levels = []
+
+    for i, name in enumerate(index.names):
+        # Non-index coords are formatted as `name (dim)`
+        m = re.match(r"(.+) \((.+)\)$", str(name))
+        if m:
+            coord_name, coord_dim = m.group(1), m.group(2)
+            nonindex_levels.append((i, coord_name, coord_dim))
+            if coord_dim not in dims:
+                dims.append(coord_dim)
+        else:
+            index_levels.append(i)
+            if name not in dims:
+                dims.append(name)
+
+    levels = [_index_to_numpy(level) for level in index.levels]
+    index_names = [index.names[i] for i in index_levels]
+    coords: dict[Hashable, tuple[Hashable, np.ndarray]] = {}
+
+    if unstack and len(dims) > 1:
+        # Check that non-index coords are consistent with their dim and
+        # reduce them to 1-D before unstacking, so that they are never
+        # broadcast to the full N-D shape. Work on the integer codes.
+        for i, coord_name, coord_dim in nonindex_levels:
+            if coord_dim in index_names:
+                owner = index.codes[index.names.index(coord_dim)]
             else:
-                # Stacked dimension
-                index_coords.append(k)
-                if k not in dims:
-                    dims.append(k)
-
-    # If multiple index coordinates, set a MultiIndex for them
-    # Leave non-index coordinates out
-    if len(dims) > 1:
-        # Unstack MultiIndex, using a first-seen order
-        xa = xa.set_index({dim: index_coords})  # type:ignore[dict-item]
-        if unstack:
-            xa = proper_unstack(xa, dim)
-            # Now non-index coords will have become multi-dimensional
-            # Drop extra dims if there is no ambiguity, otherwise raise error
-            for coord, coord_dim in nonindex_coords:
-                cvalue = xa.coords[coord]
-                slice0 = cvalue.isel(
-                    {
-                        other_dim: 0
-                        for other_dim in cvalue.dims
-                        if other_dim != coord_dim
-                    },
-                    drop=True,
-                )
-                if (cvalue == slice0).all():
-                    xa.coords[coord] = slice0
-                else:
-                    raise ValueError(
-                        f"Non-index coord {coord} has different values for the same "
-                        f"value of its dimension {coord_dim}"
-                    )
-        # Finally rename non-index coords
-        xa = xa.rename(rename_map)
-
-    elif len(nonindex_coords) == 1 and not index_coords:
-        # Special case where the dim will be y (x)
-        assert len(dims) == 1
-        assert len(rename_map) == 1
-        new_dim = nonindex_coords[0][1]
-        old_dim, coord_name = next(iter(rename_map.items()))
-        coord_value = xa.coords[xa.dims[0]]
-        xa = xa.rename({old_dim: new_dim})
-        del xa.coords[xa.dims[0]]
-        xa.coords[coord_name] = (xa.dims[0], coord_value.data)
+                # Dim without an index coord; the non-index coord must be a
+                # scalar
+                owner = np.zeros(len(index), dtype=np.int8)
+            codes = _reduce_nonindex_codes(
+                owner, index.codes[i], index.names[i], coord_dim
+            )
+            if coord_dim in index_names:
+                coords[coord_name] = (coord_dim, _take(levels[i], codes))
+            else:
+                coords[coord_name] = ((), _take(levels[i], codes)[0])
+    else:
+        # The stacked dim is renamed if it doesn't have a MultiIndex anymore
+        new_dim = dim if len(index_levels) > 1 else dims[0]
+        for i, coord_name, _ in nonindex_levels:
+            coords[coord_name] = (new_dim, _take(levels[i], index.codes[i]))
 
+    if len(index_levels) > 1:
+        mindex = pd.MultiIndex(
+            [index.levels[i] for i in index_levels],
+            [index.codes[i] for i in index_levels],
+            names=index_names,
+            verify_integrity=False,
+        )
+        xa = xa.drop_vars([dim, *index.names])
+        if unstack:
+            # Unstack MultiIndex, using a first-seen order
+            xa = xa.assign_coords(
+                xarray.Coordinates.from_pandas_multiindex(mindex, dim)
+            )
+            xa = proper_unstack(xa, dim, out=out)
+        else:
+            # Let xarray preserve the dtype of the levels
+            xa = xa.assign_coords(
+                {
+                    index.names[i]: (dim, _take(levels[i], index.codes[i]))
+                    for i in index_levels
+                }
+            )
+            xa = xa.set_index({dim: index_names})  # type:ignore[dict-item]
     else:
-        assert len(dims) == 1
-        # Rename dim_0, dim_1 as index coord (if necessary)
-        xa = xa.rename({dim: dims[0]})
-        # Finally rename non-index coords
-        xa = xa.rename(rename_map)
-    return xa
+        xa = xa.drop_vars([dim, *index.names]).rename({dim: dims[0]})
+        if index_levels:
+            (i,) = index_levels
+            xa.coords[dims[0]] = _take(levels[i], index.codes[i])
+
+    return xa.assign_coords(coords)
+
+
+def _reduce_nonindex_codes(
+    owner: np.ndarray, codes: np.ndarray, coord: Hashable, dim: Hashable
+) -> np.ndarray:
+    """Reduce the codes of a non-index coord to one code for each unique
+    value of the index coord it is attached to, in first-seen order.
+
+    :param owner:
+        codes of the index coord along the stacked dim
+    :param codes:
+        codes of the non-index coord along the stacked dim
+    :param coord:
+        name of the non-index coord, e.g. ``z (x)``
+    :param dim:
+        name of the index coord, e.g. ``x``
+    :returns:
+        codes of the non-index coord along dim
+    :raises ValueError:
+        if coord has different values for the same value of dim
+    """
+    seen, first = np.unique(owner, return_index=True)
+    lookup = np.empty(seen[-1] + 2 if len(seen) else 0, dtype=codes.dtype)
+    lookup[seen] = codes[first]
+    if (lookup[owner] != codes).any():
+        raise ValueError(
+            f"Non-index coord {coord} has different values for the same "
+            f"value of its dimension {dim}"
+        )
+    # Sort by first-seen order, like proper_unstack does
+    return codes[np.sort(first)]
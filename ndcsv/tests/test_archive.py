@@ -0,0 +1,159 @@
+import io
+import zipfile
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray
+
+import ndcsv
+import ndcsv.read
+import ndcsv.write
+from ndcsv import read_archive, read_csv, write_archive
+
+arrays = {
+    "a": xarray.DataArray(
+        np.arange(6.0).reshape(2, 3),
+        dims=["x", "y"],
+        coords={"x": ["x0", "x1"], "y": [10, 20, 30]},
+    ),
+    "b": xarray.DataArray(
+        np.arange(6).reshape(2, 3),
+        dims=["x", "y"],
+        coords={"x": ["x0", "x1"], "y": [10, 20, 30]},
+    ),
+    "c": xarray.DataArray(
+        [1.5, 2.5],
+        dims=["t"],
+        coords={"t": pd.date_range("2017-01-01", periods=2)},
+    ),
+    # Same dims as a and b, but different coords
+    "d": xarray.DataArray(
+        np.ones((1, 2)), dims=["x", "y"], coords={"x": ["x2"], "y": [1, 2]}
+    ),
+}
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".csv.gz", ".csv.bz2", ".csv.xz"])
+def test_roundtrip(tmpdir, suffix):
+    fname = f"{tmpdir}/foo.zip"
+    write_archive(arrays, fname, suffix=suffix)
+    with zipfile.ZipFile(fname) as zf:
+        assert zf.namelist() == [f"{k}{suffix}" for k in "abcd"]
+        assert {i.compress_type for i in zf.infolist()} == {zipfile.ZIP_STORED}
+    for k in "abcd":
+        xarray.testing.assert_equal(read_csv(fname, member=k), arrays[k])
+        xarray.testing.assert_equal(read_csv(fname, member=k + suffix), arrays[k])
+
+    actual = read_archive(fname)
+    assert list(actual) == list("abcd")
+    for k in "abcd":
+        xarray.testing.assert_equal(actual[k], arrays[k])
+
+
+def test_members_are_ndcsv(tmpdir):
+    """Every member is the plain NDCSV file that write_csv would write"""
+    fname = f"{tmpdir}/foo.zip"
+    write_archive(arrays, fname, suffix=".csv", significant_digits=2)
+    with zipfile.ZipFile(fname) as zf:
+        for k in "abcd":
+            text = zf.read(f"{k}.csv").decode("utf-8")
+            assert text == ndcsv.write_csv(arrays[k], significant_digits=2)
+
+
+def test_buffers():
+    buf = io.BytesIO()
+    write_archive(arrays, buf)
+    buf.seek(0)
+    xarray.testing.assert_equal(read_csv(buf, member="c"), arrays["c"])
+    buf.seek(0)
+    assert list(read_archive(buf)) == list("abcd")
+
+
+def test_reproducible(tmpdir):
+    write_archive(arrays, f"{tmpdir}/1.zip")
+    write_archive(arrays, f"{tmpdir}/2.zip")
+    with open(f"{tmpdir}/1.zip", "rb") as fh1, open(f"{tmpdir}/2.zip", "rb") as fh2:
+        assert fh1.read() == fh2.read()
+
+
+def test_dataset(tmpdir):
+    ds = xarray.Dataset({k: arrays[k] for k in "ab"})
+    fname = f"{tmpdir}/foo.zip"
+    write_archive(ds, fname)
+    xarray.testing.assert_equal(xarray.Dataset(read_archive(fname)), ds)
+
+
+def test_write_shared(tmpdir, monkeypatch):
+    """Arrays with the same dims and coords share the formatting"""
+    templates = []
+    orig_init = ndcsv.write.CompiledWriter.__init__
+
+    def init(self, template):
+        templates.append(template.dims)
+        orig_init(self, template)
+
+    monkeypatch.setattr(ndcsv.write.CompiledWriter, "__init__", init)
+    write_archive({k: arrays[k] for k in "ab"}, f"{tmpdir}/1.zip")
+    assert templates == [("x", "y")]
+    # d has the same dims but different coords
+    templates.clear()
+    write_archive(arrays, f"{tmpdir}/2.zip")
+    assert templates == []
+
+
+def test_read_one_member(tmpdir, monkeypatch):
+    """read_csv(member=...) only decompresses the requested member"""
+    fname = f"{tmpdir}/foo.zip"
+    write_archive(arrays, fname)
+    opened = []
+    orig = zipfile.ZipFile.open
+
+    def open_(self, name, *args, **kwargs):
+        opened.append(name)
+        return orig(self, name, *args, **kwargs)
+
+    monkeypatch.setattr(zipfile.ZipFile, "open", open_)
+    read_csv(fname, member="b")
+    assert opened == ["b.csv.gz"]
+
+
+def test_read_ignore_other_members(tmpdir):
+    fname = f"{tmpdir}/foo.zip"
+    write_archive({"c": arrays["c"]}, fname)
+    with zipfile.ZipFile(fname, "a") as zf:
+        zf.writestr("README.txt", "foo")
+        zf.writestr("c.csv.zip", "foo")
+    assert list(read_archive(fname)) == ["c"]
+
+
+def test_missing_member(tmpdir):
+    fname = f"{tmpdir}/foo.zip"
+    write_archive(arrays, fname)
+    with pytest.raises(KeyError, match="No array named 'e'"):
+        read_csv(fname, member="e")
+
+
+def test_duplicate_member(tmpdir):
+    fname = f"{tmpdir}/foo.zip"
+    write_archive({"c": arrays["c"]}, fname)
+    with zipfile.ZipFile(fname, "a") as zf:
+        zf.writestr("c.csv", ndcsv.write_csv(arrays["c"]))
+    with pytest.raises(ValueError, match="Multiple members for array c"):
+        read_csv(fname, member="c")
+    with pytest.raises(ValueError, match="Multiple members for array c"):
+        read_archive(fname)
+    # Full member name
+    xarray.testing.assert_equal(read_csv(fname, member="c.csv"), arrays["c"])
+
+
+def test_write_invalid(tmpdir):
+    fname = f"{tmpdir}/foo.zip"
+    with pytest.raises(TypeError, match=r"mapping of xarray\.DataArray"):
+        write_archive(arrays["a"], fname)
+    with pytest.raises(TypeError, match=r"mapping of xarray\.DataArray"):
+        write_archive({"a": arrays["a"].to_pandas()}, fname)
+    with pytest.raises(ValueError, match="suffix"):
+        write_archive(arrays, fname, suffix=".txt")
+    with pytest.raises(ValueError, match="not a valid file name"):
+        write_archive({"x/y": arrays["a"]}, fname)
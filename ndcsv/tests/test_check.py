@@ -0,0 +1,188 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray
+
+import ndcsv
+import ndcsv.check
+import ndcsv.update
+from ndcsv import Problem, validate, write_csv
+
+
+@pytest.mark.parametrize(
+    "array",
+    [
+        xarray.DataArray(
+            [[1.0, 2.0], [3.0, 4.0]],
+            dims=["t", "x"],
+            coords={"t": pd.date_range("2020-01-01", periods=2), "x": ["x0", "x1"]},
+        ),
+        xarray.DataArray([1.0, 2.0], dims=["t"], coords={"t": [1, 2]}),
+        xarray.DataArray(1.5),
+        xarray.DataArray(
+            np.arange(8.0).reshape(2, 2, 2),
+            dims=["r", "t", "x"],
+            coords={
+                "r": ["r0", "r1"],
+                "t": [1, 2],
+                "x": ["x0", "x1"],
+                "s": ("r", ["s0", "s1"]),
+            },
+        ),
+        xarray.DataArray(
+            np.arange(8.0).reshape(4, 2),
+            dims=["t", "x"],
+            coords={"t": [1, 2, 3, 4], "x": ["x0", "x1"], "u": ("t", list("aabb"))},
+        ),
+        # Labels on the columns that would be NaN on the rows
+        xarray.DataArray(
+            [[1.0, 2.0, 3.0]],
+            dims=["t", "x"],
+            coords={"t": [1], "x": ["NA", "null", "nan"]},
+        ),
+    ],
+)
+def test_valid(tmpdir, array):
+    fname = f"{tmpdir}/foo.csv.gz"
+    write_csv(array, fname)
+    assert validate(fname) == []
+    assert validate(io.StringIO(write_csv(array))) == []
+    xarray.testing.assert_identical(ndcsv.read_csv(fname), array)
+
+
+@pytest.mark.parametrize(
+    "txt",
+    [
+        # Trailing empty cells in the first row of the body
+        "y,1,2\nx,,\na,1.0,\nb,2.0,3.0\n",
+        # Duplicate labels are only a problem when they are unstacked
+        "x,\na,1.0\na,2.0\n",
+        "y,c1,c1\nx,,\na,1,2\nb,3,4\n",
+        "x,u (x),\na,1,1\na,1,2\n",
+        "x,u (x),\na,1,1\na,2,2\n",
+    ],
+)
+def test_valid_text(txt):
+    """validate() accepts everything that read_csv() accepts"""
+    ndcsv.read_csv(io.StringIO(txt))
+    assert validate(io.StringIO(txt)) == []
+
+
+def test_row_lengths():
+    buf = io.StringIO("x,x0,x1\nt,,\n1,2,3\n2,4\n\n3,5,6,7\n")
+    assert validate(buf) == [
+        Problem(4, "Expected 3 cells, found 2"),
+        Problem(6, "Expected 3 cells, found 4"),
+    ]
+
+
+def test_empty_labels():
+    buf = io.StringIO("x,x0,,nan\nt,,,\n1,2,3,4\n,4,5,6\nNaN,6,7,8\n")
+    assert validate(buf) == [
+        Problem(1, "Empty label in x"),
+        Problem(4, "Empty or NaN label in t"),
+        Problem(5, "Empty or NaN label in t"),
+    ]
+
+
+def test_duplicates():
+    buf = io.StringIO(
+        "x,,x0,x0\ny,,y0,y0\nt,u,,\n1,a,2,3\n2,a,4,5\n1,a,6,7\n1,b,7,8\n1,a,8,9\n"
+    )
+    assert validate(buf) == [
+        Problem(2, "Duplicate labels on the columns: x0, y0"),
+        Problem(6, "Duplicate labels on the rows; first seen on line 4"),
+        Problem(8, "Duplicate labels on the rows; first seen on line 4"),
+    ]
+
+
+def test_hash_collisions(monkeypatch):
+    """Rows with the same hash are compared by their actual labels"""
+    monkeypatch.setattr(ndcsv.check, "hash", lambda _: 0, raising=False)
+    buf = io.StringIO("t,u,\n1,a,2\n2,a,4\n1,a,6\n2,b,7\n2,a,8\n")
+    assert validate(buf) == [
+        Problem(4, "Duplicate labels on the rows; first seen on line 2"),
+        Problem(6, "Duplicate labels on the rows; first seen on line 3"),
+    ]
+
+
+def test_duplicates_multiindex():
+    """Non-index coords are not part of the labels to unstack"""
+    buf = io.StringIO(
+        "r,t,u (t),\nr0,1,u0,1\nr0,2,u1,2\nr1,1,u0,3\nr0,1,u0,4\nr1,2,u2,5\n"
+    )
+    assert validate(buf) == [
+        Problem(5, "Duplicate labels on the rows; first seen on line 2"),
+        Problem(
+            6,
+            "Non-index coord u (t) has different values for the same value of "
+            "its dimension",
+        ),
+    ]
+
+
+def test_scalar_nonindex_coord():
+    buf = io.StringIO("t,u (r),\n1,u0,1\n2,u1,2\n")
+    assert validate(buf) == [
+        Problem(
+            3,
+            "Non-index coord u (r) has different values for the same value of "
+            "its dimension",
+        )
+    ]
+
+
+def test_multiline():
+    """Line numbers account for newlines in quoted strings"""
+    buf = io.StringIO('t,u,\n"a\nb",c,1\n"a\nb",c,2\n,c,3\n')
+    assert validate(buf) == [
+        Problem(4, "Duplicate labels on the rows; first seen on line 2"),
+        Problem(6, "Empty or NaN label in t"),
+    ]
+
+
+def test_malformed():
+    assert validate(io.StringIO("a,b\nc,d,e,f\n")) == [
+        Problem(1, "Malformed N-dimensional CSV")
+    ]
+    assert validate(io.StringIO("1.5\n2\n")) == [
+        Problem(1, "Malformed N-dimensional CSV")
+    ]
+
+
+def test_max_problems(monkeypatch):
+    """Reading stops after the block with the Nth problem"""
+    monkeypatch.setattr(ndcsv.update, "_CHUNK_ROWS", 2)
+    text = "t,u,\n" + "".join(f"{i % 3},u,{i}\n" for i in range(20))
+    assert validate(io.StringIO(text), max_problems=3) == [
+        Problem(5, "Duplicate labels on the rows; first seen on line 2"),
+        Problem(6, "Duplicate labels on the rows; first seen on line 3"),
+        Problem(7, "Duplicate labels on the rows; first seen on line 4"),
+    ]
+    assert len(validate(io.StringIO(text))) == 17
+
+    buf = io.StringIO("t,\n" + ",1\n" * 100)
+    assert len(validate(buf, max_problems=5)) == 5
+    # Stopped reading after the block with the 5th problem
+    assert buf.tell() < len(buf.getvalue())
+
+    with pytest.raises(ValueError, match="max_problems"):
+        validate(io.StringIO(text), max_problems=0)
+
+
+def test_profile():
+    a = xarray.DataArray(
+        np.arange(8.0).reshape(2, 2, 2),
+        dims=["r", "t", "x"],
+        coords={"r": ["r0", "r1"], "t": [1, 2], "x": ["x0", "x1"]},
+    )
+    buf = io.StringIO(write_csv(a.stack(s=["r", "t"]).T))
+    with ndcsv.profile() as prof:
+        validate(buf)
+    assert [(r.func, r.phase) for r in prof.records] == [
+        ("validate", "header"),
+        ("validate", "body"),
+        ("validate", "duplicates"),
+    ]
@@ -0,0 +1,208 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray
+
+import ndcsv
+import ndcsv.update
+from ndcsv import CellDiff, Diff, diff, write_csv
+
+
+def test_equal(tmpdir):
+    a = xarray.DataArray(
+        np.arange(12.0).reshape(4, 3),
+        dims=["t", "x"],
+        coords={
+            "t": pd.date_range("2020-01-01", periods=4),
+            "x": ["x0", "x1", "x2"],
+        },
+    )
+    fname = f"{tmpdir}/foo.csv.gz"
+    write_csv(a, fname)
+    expect = Diff([], [], [], [], [], False)
+    assert diff(a, a) == expect
+    assert diff(fname, a) == expect
+    assert diff(a, fname).equal
+    assert diff(io.StringIO(write_csv(a)), fname).equal
+    # Same numbers, formatted differently
+    assert diff(a, a.astype(int)).equal
+
+
+def test_cells():
+    a = xarray.DataArray(
+        np.arange(12.0).reshape(4, 3),
+        dims=["t", "x"],
+        coords={
+            "t": pd.date_range("2020-01-01", periods=4),
+            "x": ["x0", "x1", "x2"],
+        },
+    )
+    b = a.copy()
+    b[1, 2] = 100
+    b[3, 0] = np.nan
+    actual = diff(a, b)
+    assert actual.cells == [
+        CellDiff(("2020-01-02",), ("x2",), "5.0", "100.0"),
+        CellDiff(("2020-01-04",), ("x0",), "9.0", ""),
+    ]
+    assert not actual.equal
+    assert not actual.truncated
+
+
+def test_tolerance():
+    a = xarray.DataArray(
+        np.arange(12.0).reshape(4, 3),
+        dims=["t", "x"],
+        coords={
+            "t": pd.date_range("2020-01-01", periods=4),
+            "x": ["x0", "x1", "x2"],
+        },
+    )
+    b = a + 1e-9
+    assert not diff(a, b).equal
+    assert diff(a, b, atol=1e-8).equal
+    assert diff(a + 1, (a + 1) * 1.001, rtol=0.01).equal
+    assert not diff(a + 1, (a + 1) * 1.001, rtol=0.0001).equal
+
+
+def test_nan_and_strings():
+    s1 = xarray.DataArray(["foo", "1", np.nan], dims=["x"], coords={"x": [1, 2, 3]})
+    s2 = xarray.DataArray(["foo", "1.0", np.nan], dims=["x"], coords={"x": [1, 2, 3]})
+    s3 = xarray.DataArray(["bar", "1", "baz"], dims=["x"], coords={"x": [1, 2, 3]})
+    assert diff(s1, s2).equal
+    assert diff(s1, s3).cells == [
+        CellDiff(("1",), (), "foo", "bar"),
+        CellDiff(("3",), (), "nan", "baz"),
+    ]
+
+
+def test_labels():
+    a = xarray.DataArray(
+        np.arange(12.0).reshape(4, 3),
+        dims=["t", "x"],
+        coords={
+            "t": pd.date_range("2020-01-01", periods=4),
+            "x": ["x0", "x1", "x2"],
+        },
+    )
+    b = a.isel(t=[0, 2, 3]).sel(x=["x2", "x0"])
+    b = xarray.concat(
+        [b, b[:1].assign_coords(t=pd.to_datetime(["2021-01-01"]))], dim="t"
+    )
+    b = b.assign_coords(x=["x2", "x9"])
+    actual = diff(a, b)
+    assert actual.rows_only_a == [("2020-01-02",)]
+    assert actual.rows_only_b == [("2021-01-01",)]
+    assert actual.columns_only_a == [("x0",), ("x1",)]
+    assert actual.columns_only_b == [("x9",)]
+    assert actual.cells == []
+
+
+@pytest.mark.parametrize("chunk_rows", [2, 3, 1000])
+def test_order(monkeypatch, chunk_rows):
+    """Rows are aligned by label, regardless of their order and of the blocks"""
+    a = xarray.DataArray(
+        np.arange(12.0).reshape(4, 3),
+        dims=["t", "x"],
+        coords={
+            "t": pd.date_range("2020-01-01", periods=4),
+            "x": ["x0", "x1", "x2"],
+        },
+    )
+    monkeypatch.setattr(ndcsv.update, "_CHUNK_ROWS", chunk_rows)
+    b = a.isel(t=[3, 1, 2, 0]).copy()
+    b[0, 0] = -1
+    actual = diff(a, b)
+    assert actual.cells == [CellDiff(("2020-01-04",), ("x0",), "9.0", "-1.0")]
+    assert actual.rows_only_a == actual.rows_only_b == []
+
+
+def test_multiindex():
+    b = xarray.DataArray(
+        np.arange(8).reshape(2, 2, 2),
+        dims=["r", "c1", "c2"],
+        coords={"r": ["a", "b"], "c1": ["x", "y"], "c2": [1, 2], "w": ("r", [1, 2])},
+    )
+    c = b.copy()
+    c[1, 1, 0] = 100
+    assert diff(b, c).cells == [CellDiff(("b", "2"), ("y", 1), "6", "100")]
+    # Non-index coords are part of the labels on the rows
+    c = b.assign_coords(w=("r", [1, 3]))
+    actual = diff(b, c)
+    assert actual.rows_only_a == [("b", "2")]
+    assert actual.rows_only_b == [("b", "3")]
+
+
+def test_max_diffs():
+    a = xarray.DataArray(
+        np.arange(12.0).reshape(4, 3),
+        dims=["t", "x"],
+        coords={
+            "t": pd.date_range("2020-01-01", periods=4),
+            "x": ["x0", "x1", "x2"],
+        },
+    )
+    actual = diff(a, a + 1, max_diffs=5)
+    assert len(actual.cells) == 5
+    assert actual.truncated
+    actual = diff(a, a + 1, max_diffs=None)
+    assert len(actual.cells) == 12
+    assert not actual.truncated
+
+
+def test_bounded_memory(tmpdir, monkeypatch):
+    """When the rows are in the same order, unmatched rows are never held in
+    memory for longer than a block
+    """
+    monkeypatch.setattr(ndcsv.update, "_CHUNK_ROWS", 10)
+    big = xarray.DataArray(np.arange(1000), dims=["x"], coords={"x": np.arange(1000)})
+    write_csv(big, f"{tmpdir}/a.csv")
+    write_csv(big + 1, f"{tmpdir}/b.csv")
+    blocks = []
+    orig = ndcsv.update._Rows.blocks
+
+    def blocks_(self):
+        for block in orig(self):
+            blocks.append(len(block[1]))
+            yield block
+
+    monkeypatch.setattr(ndcsv.update._Rows, "blocks", blocks_)
+    assert len(diff(f"{tmpdir}/a.csv", f"{tmpdir}/b.csv", max_diffs=None).cells) == 1000
+    assert max(blocks) == 10
+
+
+@pytest.mark.parametrize(
+    "b",
+    [
+        xarray.DataArray([[1.0]], dims=["u", "x"], coords={"u": [1], "x": ["x0"]}),
+        xarray.DataArray([[1.0]], dims=["t", "y"], coords={"t": [1], "y": ["x0"]}),
+        xarray.DataArray([1.0], dims=["t"], coords={"t": [1]}),
+    ],
+)
+def test_mismatched_dims(b):
+    a = xarray.DataArray(
+        [[1.0, 2.0], [3.0, 4.0]],
+        dims=["t", "x"],
+        coords={"t": [1, 2], "x": ["x0", "x1"]},
+    )
+    with pytest.raises(ValueError, match="different index names or coords"):
+        diff(a, b)
+
+
+def test_0d():
+    with pytest.raises(ValueError, match="1 or more dimensions"):
+        diff(xarray.DataArray(1), xarray.DataArray(1))
+
+
+def test_profile():
+    a = xarray.DataArray(
+        [[1.0, 2.0], [3.0, 4.0]],
+        dims=["t", "x"],
+        coords={"t": [1, 2], "x": ["x0", "x1"]},
+    )
+    with ndcsv.profile() as prof:
+        diff(a, a)
+    assert {r.func for r in prof.records} == {"diff"}
+    assert [r.phase for r in prof.records][-2:] == ["header", "body"]
@@ -0,0 +1,94 @@
+import io
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray
+from numpy import nan
+
+from ndcsv import compile_writer, read_csv, write_csv
+
+ARRAYS = [
+    xarray.DataArray(1.5),
+    xarray.DataArray([nan, 1.0, 2.0], dims=["x"], coords={"x": [1, 2, 3]}),
+    xarray.DataArray(
+        [1.0, nan, 2.0], dims=["x"], coords={"x": [1, 2, 3], "c": ("x", [4, 5, 6])}
+    ),
+    xarray.DataArray([True, False], dims=["x"]),
+    xarray.DataArray(["foo", "bar"], dims=["x"]),
+    xarray.DataArray(
+        [[1.5, nan], [3.25, 4.0]],
+        dims=["x", "y"],
+        coords={"x": [1, 2], "y": ["y0", "y1"]},
+    ),
+    xarray.DataArray(
+        np.arange(3 * 4 * 2).reshape((3, 4, 2)),
+        dims=["x", "y", "z"],
+        coords={
+            "x": pd.to_datetime(["2000-01-01", "2000-01-02", "2000-01-03"]),
+            "y": ["a,b", 'c"d', "e\nf", "g"],
+            "z": [5.5, 6],
+            "c": ("y", ["p", "q", "r", "s"]),
+        },
+    ),
+    xarray.DataArray(
+        np.arange(16.0).reshape((2, 2, 2, 2)), dims=["x", "y", "z", "w"]
+    ).stack(r=["x", "y"]),
+    # Sparse MultiIndex, which is unstacked with NaNs
+    xarray.DataArray(np.arange(12.0).reshape((3, 2, 2)), dims=["x", "y", "z"])
+    .stack(r=["y", "z"])
+    .isel(r=[0, 1, 3])
+    .expand_dims(q=[1, 2])
+    .transpose("x", "q", "r"),
+]
+
+
+@pytest.mark.parametrize("a", ARRAYS)
+@pytest.mark.parametrize("significant_digits", [None, 2])
+def test_compile_writer(a, significant_digits):
+    writer = compile_writer(a)
+    txt = writer.write_csv(a, significant_digits=significant_digits)
+    assert txt == write_csv(a, significant_digits=significant_digits).replace("\r", "")
+
+    # Change data, but not coords
+    b = a.copy(data=a.values[::-1] if a.ndim else a.values + 1)
+    txt = writer.write_csv(b, significant_digits=significant_digits)
+    assert txt == write_csv(b, significant_digits=significant_digits).replace("\r", "")
+
+
+def test_compile_writer_io(tmpdir):
+    a = xarray.DataArray(
+        [[1, 2], [3, 4]], dims=["x", "y"], coords={"x": [1, 2], "y": ["y0", "y1"]}
+    )
+    writer = compile_writer(a)
+    buf = io.StringIO()
+    writer.write_csv(a, buf)
+    buf.seek(0)
+    xarray.testing.assert_equal(read_csv(buf), a)
+
+    fname = f"{tmpdir}/test.csv.gz"
+    writer.write_csv(a, fname)
+    xarray.testing.assert_equal(read_csv(fname), a)
+
+
+def test_compile_writer_mismatch():
+    a = xarray.DataArray([1, 2], dims=["x"], coords={"x": [10, 20]})
+    writer = compile_writer(a)
+    for b in (
+        xarray.DataArray([1, 2], dims=["x"], coords={"x": [10, 30]}),
+        xarray.DataArray([1, 2], dims=["y"], coords={"y": [10, 20]}),
+        xarray.DataArray([1, 2, 3], dims=["x"], coords={"x": [10, 20, 30]}),
+        a.assign_coords(c=("x", [1, 2])),
+    ):
+        with pytest.raises(ValueError, match="does not match the template"):
+            writer.write_csv(b)
+    with pytest.raises(TypeError):
+        writer.write_csv(a.to_pandas())
+    with pytest.raises(TypeError):
+        compile_writer(a.to_pandas())
+
+
+def test_compile_writer_blank_coord():
+    a = xarray.DataArray([1, 2], dims=["x"], coords={"x": ["", "x1"]})
+    with pytest.raises(ValueError, match="Empty string in index"):
+        compile_writer(a)
@@ -0,0 +1,186 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray
+
+import ndcsv
+import ndcsv.dataset
+import ndcsv.proper_unstack
+import ndcsv.read
+import ndcsv.write
+from ndcsv import read_dataset, write_dataset
+
+ds = xarray.Dataset(
+    {
+        "a": (("x", "y"), np.arange(6.0).reshape(2, 3)),
+        "b": (("x", "y"), np.arange(6).reshape(2, 3)),
+        "c": ("x", ["foo", "bar"]),
+        "d": (("t", "x", "z"), np.arange(12.0).reshape(2, 2, 3)),
+        "e": ("t", [True, False]),
+    },
+    coords={
+        "x": ["x0", "x1"],
+        "y": [10, 20, 30],
+        "z": [1.5, 2.5, 3.5],
+        "t": pd.date_range("2017-01-01", periods=2),
+        "w": ("x", ["w0", "w1"]),
+    },
+)
+
+
+@pytest.mark.parametrize("suffix", [".csv", ".csv.gz", ".csv.bz2", ".csv.xz"])
+def test_roundtrip(tmpdir, suffix):
+    write_dataset(ds, str(tmpdir), suffix=suffix)
+    assert sorted(os.listdir(tmpdir)) == [f"{k}{suffix}" for k in "abcde"]
+    for k in "abcde":
+        xarray.testing.assert_equal(ndcsv.read_csv(f"{tmpdir}/{k}{suffix}"), ds[k])
+    xarray.testing.assert_equal(read_dataset(str(tmpdir)), ds)
+
+
+@pytest.mark.parametrize("layout", ["default", "auto"])
+@pytest.mark.parametrize("validate", [True, False])
+def test_write_shared(tmpdir, monkeypatch, layout, validate):
+    """Variables with the same dims share the formatting"""
+    templates = []
+    orig_init = ndcsv.write.CompiledWriter.__init__
+
+    def init(self, template):
+        templates.append(template.dims)
+        orig_init(self, template)
+
+    monkeypatch.setattr(ndcsv.write.CompiledWriter, "__init__", init)
+    write_dataset(
+        ds, f"{tmpdir}/out", layout=layout, validate=validate, significant_digits=3
+    )
+    if layout == "default" and validate:
+        assert templates == [("x", "y")]
+    else:
+        assert templates == []
+    for k in "abcde":
+        with open(f"{tmpdir}/out/{k}.csv") as fh:
+            assert fh.read() == ndcsv.write_csv(
+                ds[k], layout=layout, significant_digits=3
+            )
+
+
+def test_read_shared(tmpdir, monkeypatch):
+    """Row labels shared by multiple files are converted only once"""
+    dates = pd.date_range("2017-01-01", periods=3)
+    shared = xarray.Dataset(
+        {k: (("t", "x"), np.ones((3, 2))) for k in "abc"},
+        coords={"t": dates, "x": ["x0", "x1"]},
+    )
+    shared["d"] = ("t", [1, 2, 3])
+    write_dataset(shared, str(tmpdir))
+
+    calls = []
+    orig = ndcsv.read._convert_coord
+
+    def convert(x):
+        calls.append(x.tolist())
+        return orig(x)
+
+    monkeypatch.setattr(ndcsv.read, "_convert_coord", convert)
+    ndcsv.read._parse_header.cache_clear()
+    actual = read_dataset(str(tmpdir))
+    xarray.testing.assert_identical(actual, shared)
+    assert sorted(calls) == [[str(d.date()) for d in dates], ["x0", "x1"]]
+    # The cache is only enabled by read_dataset
+    assert ndcsv.read._ROW_LABELS_CACHE.get() is None
+
+
+def test_read_shared_unstack_plan(tmpdir, monkeypatch):
+    """Files with the same MultiIndex on the rows compute how to unstack it
+    only once
+    """
+    shared = xarray.Dataset(
+        {k: (("t", "x", "z"), np.ones((2, 2, 3))) for k in "abc"},
+        coords={"t": [1, 2], "x": ["x0", "x1"], "z": [10, 20, 30]},
+    )
+    shared["d"] = (("t", "z"), np.ones((2, 3)))
+    write_dataset(shared, str(tmpdir))
+
+    plans = []
+    orig_init = ndcsv.proper_unstack._UnstackPlan.__init__
+
+    def init(self, mindex):
+        plans.append(list(mindex.names))
+        orig_init(self, mindex)
+
+    monkeypatch.setattr(ndcsv.proper_unstack._UnstackPlan, "__init__", init)
+    xarray.testing.assert_identical(read_dataset(str(tmpdir)), shared)
+    assert plans == [["x", "z"]]
+    # The cache is only enabled by read_dataset
+    assert ndcsv.proper_unstack._UNSTACK_PLAN_CACHE.get() is None
+    ndcsv.read_csv(f"{tmpdir}/a.csv")
+    ndcsv.read_csv(f"{tmpdir}/a.csv")
+    assert len(plans) == 3
+
+
+def test_read_no_copy(tmpdir, monkeypatch):
+    """The variables wrap the arrays returned by read_csv"""
+    arrays = []
+
+    def read_csv(*args, **kwargs):
+        arrays.append(ndcsv.read_csv(*args, **kwargs))
+        return arrays[-1]
+
+    write_dataset(ds, str(tmpdir))
+    monkeypatch.setattr(ndcsv.dataset, "read_csv", read_csv)
+    actual = read_dataset(str(tmpdir))
+    for array in arrays:
+        assert any(np.shares_memory(array.values, v.values) for v in actual.values())
+
+
+def test_read_ignore_other_files(tmpdir):
+    write_dataset(ds[["c"]], str(tmpdir))
+    for fname in ("README.txt", "c.csv.zip", ".csv"):
+        with open(f"{tmpdir}/{fname}", "w") as fh:
+            fh.write("foo")
+    os.mkdir(f"{tmpdir}/subdir")
+    xarray.testing.assert_equal(read_dataset(str(tmpdir)), ds[["c"]])
+
+
+def test_read_empty(tmpdir):
+    xarray.testing.assert_identical(read_dataset(str(tmpdir)), xarray.Dataset())
+
+
+def test_read_duplicate(tmpdir):
+    write_dataset(ds[["c"]], str(tmpdir))
+    write_dataset(ds[["c"]], str(tmpdir), suffix=".csv.gz")
+    with pytest.raises(ValueError, match="Multiple files for variable c"):
+        read_dataset(str(tmpdir))
+
+
+def test_read_misaligned(tmpdir):
+    ndcsv.write_csv(xarray.DataArray([1, 2], dims=["x"]), f"{tmpdir}/a.csv")
+    ndcsv.write_csv(xarray.DataArray([1, 2, 3], dims=["x"]), f"{tmpdir}/b.csv")
+    with pytest.raises(ValueError, match="cannot align"):
+        read_dataset(str(tmpdir))
+
+
+@pytest.mark.parametrize("name", ["", "x/y", 1])
+def test_write_invalid_name(tmpdir, name):
+    with pytest.raises(ValueError, match="not a valid file name"):
+        write_dataset(xarray.Dataset({name: ("x", [1])}), str(tmpdir))
+    assert os.listdir(tmpdir) == []
+
+
+def test_write_invalid(tmpdir):
+    with pytest.raises(TypeError, match=r"not a xarray\.Dataset"):
+        write_dataset(ds["a"], str(tmpdir))
+    with pytest.raises(ValueError, match="suffix"):
+        write_dataset(ds, str(tmpdir), suffix=".txt")
+
+
+def test_profile(tmpdir):
+    """Profiling is propagated to the worker threads"""
+    with ndcsv.profile() as prof:
+        write_dataset(ds, str(tmpdir))
+        read_dataset(str(tmpdir))
+    funcs = sorted(r.func for r in prof.records if r.phase in ("body", "write"))
+    assert funcs == (
+        ["CompiledWriter.write_csv"] * 2 + ["read_csv"] * 5 + ["write_csv"] * 3
+    )
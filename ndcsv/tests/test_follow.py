@@ -0,0 +1,183 @@
+import numpy as np
+import pandas as pd
+import pytest
+import xarray
+
+import ndcsv
+from ndcsv import follow_csv, write_csv
+
+
+@pytest.mark.parametrize("engine", ["pandas", "numpy"])
+def test_follow(tmpdir, engine):
+    a = xarray.DataArray(
+        np.arange(12.0).reshape(4, 3),
+        dims=["t", "x"],
+        coords={
+            "t": pd.date_range("2020-01-01", periods=4),
+            "x": ["x0", "x1", "x2"],
+            "w": ("x", [10, 20, 30]),
+        },
+    )
+    fname = f"{tmpdir}/foo.csv"
+    write_csv(a[:1], fname)
+    follower = follow_csv(fname, engine=engine)
+    xarray.testing.assert_identical(follower.array, a[:1])
+    offset = follower.offset
+    assert follower.refresh() is None
+    assert follower.offset == offset
+
+    write_csv(a[1:3], fname, mode="a")
+    xarray.testing.assert_identical(follower.refresh(), a[1:3])
+    assert follower.offset > offset
+    write_csv(a[3:], fname, mode="a")
+    xarray.testing.assert_identical(follower.refresh(), a[3:])
+    assert follower.refresh() is None
+    xarray.testing.assert_identical(follower.array, a)
+    with open(fname, "rb") as fh:
+        assert follower.offset == len(fh.read())
+
+
+def test_1d(tmpdir):
+    s = xarray.DataArray(
+        [1.5, 2.5, 3.5, 4.5],
+        dims=["t"],
+        coords={"t": pd.date_range("2020-01-01", periods=4)},
+    )
+    fname = f"{tmpdir}/foo.csv"
+    write_csv(s[:2], fname)
+    follower = follow_csv(fname)
+    write_csv(s[2:], fname, mode="a")
+    xarray.testing.assert_identical(follower.refresh(), s[2:])
+    xarray.testing.assert_identical(follower.array, s)
+
+
+def test_partial_line(tmpdir):
+    """A line that is still being written is read by the next refresh"""
+    fname = f"{tmpdir}/foo.csv"
+    with open(fname, "w") as fh:
+        fh.write("t,\n2020-01-01,1\n2020-01-0")
+    follower = follow_csv(fname)
+    assert follower.array.sizes == {"t": 1}
+    assert follower.refresh() is None
+    with open(fname, "a") as fh:
+        fh.write("2,2\n2020-01-03,3\n2020-01")
+    assert follower.refresh().values.tolist() == [2, 3]
+    with open(fname, "a") as fh:
+        fh.write("-04,4\n")
+    assert follower.refresh().values.tolist() == [4]
+    assert follower.array.values.tolist() == [1, 2, 3, 4]
+
+
+def test_only_new_bytes_are_read(tmpdir, monkeypatch):
+    a = xarray.DataArray(
+        [[1, 2], [3, 4], [5, 6]],
+        dims=["t", "x"],
+        coords={"t": [10, 20, 30], "x": ["x0", "x1"]},
+    )
+    fname = f"{tmpdir}/foo.csv"
+    write_csv(a[:2], fname)
+    follower = follow_csv(fname)
+    texts = []
+    orig = ndcsv.read.read_csv
+
+    def read_csv(buf, *args, **kwargs):
+        texts.append(buf.getvalue())
+        return orig(buf, *args, **kwargs)
+
+    monkeypatch.setattr(ndcsv.read, "read_csv", read_csv)
+    write_csv(a[2:], fname, mode="a")
+    follower.refresh()
+    (text,) = texts
+    assert text == write_csv(a[2:])
+
+
+def test_multiindex(tmpdir):
+    b = xarray.DataArray(
+        np.arange(6.0).reshape(3, 2),
+        dims=["t", "x"],
+        coords={"t": [10, 20, 30], "x": ["x0", "x1"]},
+    ).stack(rows=["t", "x"])
+    fname = f"{tmpdir}/foo.csv"
+    write_csv(b[:5], fname)
+    with pytest.raises(ValueError, match="MultiIndex on the rows"):
+        follow_csv(fname)
+    follower = follow_csv(fname, unstack=False)
+    write_csv(b[5:], fname, mode="a")
+    expect = ndcsv.read_csv(fname, unstack=False)
+    xarray.testing.assert_identical(follower.refresh(), expect[5:])
+    xarray.testing.assert_identical(follower.array, expect)
+
+
+@pytest.mark.parametrize(
+    "header",
+    [
+        "",
+        "t,\n",
+        "x,x0,x1\nt,,\n",
+        # Part of the header
+        "x,x0,x1\n",
+    ],
+)
+def test_header_only(tmpdir, header):
+    """Follow a file that the producer has just started writing"""
+    fname = f"{tmpdir}/foo.csv"
+    with open(fname, "w") as fh:
+        fh.write(header)
+    follower = follow_csv(fname)
+    assert follower.array is None
+    assert follower.offset == 0
+    assert follower.refresh() is None
+
+    text = "x,x0,x1\nt,,\n10,1,2\n" if "x" in header else "t,\n10,1\n"
+    with open(fname, "w") as fh:
+        fh.write(text)
+    expect = ndcsv.read_csv(fname)
+    xarray.testing.assert_identical(follower.refresh(), expect)
+    xarray.testing.assert_identical(follower.array, expect)
+    assert follower.offset == len(text)
+
+
+def test_rewritten(tmpdir):
+    a = xarray.DataArray(
+        [[1, 2], [3, 4]], dims=["t", "x"], coords={"t": [10, 20], "x": ["x0", "x1"]}
+    )
+    fname = f"{tmpdir}/foo.csv"
+    write_csv(a, fname)
+    follower = follow_csv(fname)
+    write_csv(a[:1], fname)
+    with pytest.raises(ValueError, match="truncated"):
+        follower.refresh()
+    write_csv(a.rename(x="y"), fname)
+    with pytest.raises(ValueError, match=r"header of .* changed"):
+        follower.refresh()
+
+
+def test_invalid(tmpdir):
+    fname = f"{tmpdir}/foo.csv"
+    write_csv(xarray.DataArray(1), fname)
+    with pytest.raises(ValueError, match="0-dimensional"):
+        follow_csv(fname)
+    with pytest.raises(ValueError, match="compressed"):
+        follow_csv(f"{tmpdir}/foo.csv.gz")
+
+
+def test_profile(tmpdir):
+    a = xarray.DataArray(
+        [[1, 2], [3, 4], [5, 6]],
+        dims=["t", "x"],
+        coords={"t": [10, 20, 30], "x": ["x0", "x1"]},
+    )
+    fname = f"{tmpdir}/foo.csv"
+    write_csv(a[:2], fname)
+    follower = follow_csv(fname)
+    write_csv(a[2:], fname, mode="a")
+    with ndcsv.profile() as prof:
+        follower.refresh()
+    assert [r.func for r in prof.records] == ["CsvFollower.refresh"] * 5
+    assert [r.phase for r in prof.records] == [
+        "read",
+        "header",
+        "body",
+        "coords",
+        "unpack",
+    ]
@@ -0,0 +1,33 @@
+import subprocess
+import sys
+
+import pytest
+
+import ndcsv
+import ndcsv.read
+import ndcsv.write
+
+
+def test_lazy_import():
+    """import ndcsv doesn't import the heavy dependencies"""
+    code = (
+        "import sys, ndcsv; "
+        "print(sorted(m for m in ('numpy', 'pandas', 'pshell', 'xarray') "
+        "if m in sys.modules))"
+    )
+    out = subprocess.check_output([sys.executable, "-c", code], text=True)
+    assert out.strip() == "[]"
+
+
+def test_lazy_attributes():
+    for name in ndcsv.__all__:
+        assert getattr(ndcsv, name) is not None
+        assert name in dir(ndcsv)
+    assert isinstance(ndcsv.__version__, str)
+    assert ndcsv.read_csv is ndcsv.read.read_csv
+    assert ndcsv.CompiledWriter is ndcsv.write.CompiledWriter
+
+
+def test_missing_attribute():
+    with pytest.raises(AttributeError, match="no attribute 'foo'"):
+        ndcsv.foo  # noqa: B018
@@ -2,10 +2,15 @@ import bz2
 import gzip
 import io
 import lzma
+import os
 
+import numpy as np
+import pandas as pd
 import pytest
 import xarray
 
+import ndcsv.read
+import ndcsv.write
 from ndcsv import read_csv, write_csv
 
 
@@ -41,3 +46,160 @@ def test_file_io(tmpdir, open_func, ext):
         assert fh.read() == "1\n"
     b = read_csv(fname)
     xarray.testing.assert_equal(a, b)
+
+
+@pytest.mark.parametrize("engine", ["pandas", "numpy"])
+@pytest.mark.parametrize("ext", ["csv", "csv.gz", "csv.bz2", "csv.xz"])
+def test_progress_read_file(tmpdir, monkeypatch, engine, ext):
+    monkeypatch.setattr(ndcsv.read, "_CHUNK_ROWS", 100)
+    monkeypatch.setattr(ndcsv.read, "_CHUNK_SIZE", 2**12)
+    rng = np.random.default_rng(0)
+    # Compressed files are read in large blocks, so there's no point testing
+    # a large file, which would be slow to compress
+    nrows = 2000 if ext == "csv" else 200
+    a = xarray.DataArray(rng.integers(2**40, size=(nrows, 50)), dims=["x", "y"])
+    fname = f"{tmpdir}/test.{ext}"
+    write_csv(a, fname)
+
+    calls = []
+    b = read_csv(fname, engine=engine, progress=lambda *args: calls.append(args))
+    np.testing.assert_array_equal(b.values, a.values)
+    size = os.path.getsize(fname)
+    if ext == "csv":
+        assert len(calls) > 2
+    assert calls[-1] == (size, size)
+    done = [d for d, _ in calls]
+    assert done == sorted(set(done))
+    assert {t for _, t in calls} == {size}
+
+
+def test_progress_read_buf():
+    txt = write_csv(xarray.DataArray([1, 2], dims=["x"]))
+    calls = []
+    read_csv(io.StringIO(txt), progress=lambda *args: calls.append(args))
+    assert calls == [(len(txt), len(txt))]
+
+
+def test_progress_read_0d():
+    calls = []
+    read_csv(io.StringIO("1\n"), progress=lambda *args: calls.append(args))
+    assert calls == [(2, 2)]
+
+
+@pytest.mark.parametrize("shape", [(250,), (250, 3)])
+def test_progress_write(tmpdir, monkeypatch, shape):
+    a = xarray.DataArray(np.arange(np.prod(shape)).reshape(shape))
+    expect = write_csv(a)
+
+    calls = []
+    write_csv(a, progress=lambda *args: calls.append(args))
+    assert calls == [(250, 250)]
+
+    # Disable the fast path for small arrays
+    monkeypatch.setattr(ndcsv.write, "_SMALL_ARRAY_SIZE", 0)
+    monkeypatch.setattr(ndcsv.write, "_CHUNK_CELLS", 300)
+    calls.clear()
+    assert write_csv(a, progress=lambda *args: calls.append(args)) == expect
+    step = 300 // (shape[1] if len(shape) > 1 else 1)
+    assert calls == [(min(i + step, 250), 250) for i in range(0, 250, step)]
+
+    calls.clear()
+    write_csv(a, f"{tmpdir}/test.csv.gz", progress=lambda *args: calls.append(args))
+    assert calls[-1] == (250, 250)
+
+
+def test_progress_write_0d():
+    calls = []
+    write_csv(xarray.DataArray(1), progress=lambda *args: calls.append(args))
+    assert calls == [(1, 1)]
+
+
+@pytest.mark.parametrize("ext", ["csv", "csv.gz", "csv.bz2", "csv.xz"])
+@pytest.mark.parametrize(
+    "a",
+    [
+        xarray.DataArray(
+            [1.5, np.nan, 3.5, 4.5],
+            dims=["t"],
+            coords={"t": pd.date_range("2020-01-01", periods=4)},
+        ),
+        xarray.DataArray(
+            np.arange(24).reshape(4, 2, 3),
+            dims=["r", "c1", "c2"],
+            coords={"r": ["a", "b", "c", "d"], "c1": [1, 2], "c2": ["x", "y", "z"]},
+        ),
+    ],
+)
+def test_append(tmpdir, ext, a):
+    fname = f"{tmpdir}/foo.{ext}"
+    # Missing file is created
+    write_csv(a[:1], fname, mode="a")
+    write_csv(a[1:3], fname, mode="a")
+    write_csv(a[3:], fname, mode="a")
+    xarray.testing.assert_identical(read_csv(fname), a)
+
+
+def test_append_empty_file(tmpdir):
+    a = xarray.DataArray([1, 2], dims=["x"], coords={"x": [10, 20]})
+    fname = f"{tmpdir}/foo.csv"
+    open(fname, "w").close()
+    write_csv(a, fname, mode="a")
+    xarray.testing.assert_identical(read_csv(fname), a)
+
+
+def test_append_header_only_read(tmpdir, monkeypatch):
+    """Appending reads the header of the file, not the body"""
+    a = xarray.DataArray(np.zeros((10_000, 2)), dims=["r", "c"])
+    fname = f"{tmpdir}/foo.csv"
+    write_csv(a, fname)
+    lines = []
+    orig = ndcsv.read._record_lines
+
+    def record_lines(buf, out):
+        for line in orig(buf, out):
+            lines.append(line)
+            yield line
+
+    monkeypatch.setattr(ndcsv.read, "_record_lines", record_lines)
+    write_csv(a[:1], fname, mode="a")
+    # Header and first row of the file, header and first row of the array
+    assert len(lines) == 6
+
+
+@pytest.mark.parametrize(
+    "b",
+    [
+        # Different columns
+        xarray.DataArray([[1, 2]], dims=["r", "c"], coords={"c": ["x", "z"]}),
+        xarray.DataArray([[1, 2, 3]], dims=["r", "c"], coords={"c": ["x", "y", "z"]}),
+        # Different index name
+        xarray.DataArray([[1, 2]], dims=["s", "c"], coords={"c": ["x", "y"]}),
+        xarray.DataArray([[1, 2]], dims=["r", "d"], coords={"d": ["x", "y"]}),
+        # Different number of dimensions
+        xarray.DataArray([1], dims=["r"]),
+        xarray.DataArray([[[1, 2]]], dims=["r", "c", "d"], coords={"c": [0]}),
+    ],
+)
+def test_append_mismatch(tmpdir, b):
+    a = xarray.DataArray([[1, 2]], dims=["r", "c"], coords={"c": ["x", "y"]})
+    fname = f"{tmpdir}/foo.csv"
+    write_csv(a, fname)
+    with pytest.raises(ValueError, match="Cannot append to"):
+        write_csv(b, fname, mode="a")
+    with open(fname) as fh:
+        assert fh.read() == write_csv(a)
+
+
+def test_append_invalid(tmpdir):
+    a = xarray.DataArray([1, 2], dims=["x"])
+    fname = f"{tmpdir}/foo.csv"
+    with pytest.raises(ValueError, match="requires a file path"):
+        write_csv(a, io.StringIO(), mode="a")
+    with pytest.raises(ValueError, match="mode must be"):
+        write_csv(a, fname, mode="x")
+    write_csv(a, fname)
+    with pytest.raises(ValueError, match="0-dimensional"):
+        write_csv(xarray.DataArray(1), fname, mode="a")
+    write_csv(xarray.DataArray(1), fname)
+    with pytest.raises(ValueError, match="Cannot append to"):
+        write_csv(a, fname, mode="a")
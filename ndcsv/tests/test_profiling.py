@@ -0,0 +1,125 @@
+import io
+import threading
+
+import numpy as np
+import xarray
+
+import ndcsv
+from ndcsv import read_csv, write_csv
+
+
+def _phases(prof):
+    return [(r.call_id, r.func, r.phase) for r in prof.records]
+
+
+def test_profile_read_write():
+    a = xarray.DataArray(
+        np.arange(24.0).reshape(2, 3, 4),
+        dims=["x", "y", "z"],
+        coords={"x": ["x0", "x1"], "y": [10, 20, 30], "z": np.arange(4)},
+    )
+    with ndcsv.profile() as prof:
+        txt = write_csv(a)
+        read_csv(io.StringIO(txt))
+
+    ids = sorted({r.call_id for r in prof.records})
+    assert len(ids) == 2
+    assert _phases(prof) == [
+        (ids[0], "write_csv", "to_pandas"),
+        (ids[0], "write_csv", "validate"),
+        (ids[0], "write_csv", "header"),
+        (ids[0], "write_csv", "body"),
+        (ids[1], "read_csv", "header"),
+        (ids[1], "read_csv", "body"),
+        (ids[1], "read_csv", "coords"),
+        (ids[1], "read_csv", "unpack"),
+    ]
+    for r in prof.records:
+        assert r.seconds >= 0
+        assert r.peak_memory is None
+    nbytes = {r.phase: r.nbytes for r in prof.records if r.func == "read_csv"}
+    assert nbytes == {
+        "header": len("".join(txt.splitlines(keepends=True)[:3])),
+        "body": 192,
+        "coords": 192,
+        "unpack": 192,
+    }
+    assert "read_csv.unpack" in repr(prof)
+
+
+def test_profile_file(tmpdir):
+    """Recursive calls are measured as a single call"""
+    fname = f"{tmpdir}/test.csv.gz"
+    # 3 dimensions skip the fast path for small files
+    a = xarray.DataArray(
+        np.full((2, 2, 2), 1.2345),
+        dims=["x", "y", "z"],
+        coords={"x": [1, 2], "y": ["y0", "y1"], "z": [3, 4]},
+    )
+    with ndcsv.profile() as prof:
+        write_csv(a, fname, significant_digits=3)
+        read_csv(fname)
+    assert [(func, phase) for _, func, phase in _phases(prof)] == [
+        ("write_csv", "round"),
+        ("write_csv", "to_pandas"),
+        ("write_csv", "validate"),
+        ("write_csv", "header"),
+        ("write_csv", "body"),
+        ("read_csv", "header"),
+        ("read_csv", "body"),
+        ("read_csv", "coords"),
+        ("read_csv", "unpack"),
+    ]
+
+
+def test_profile_compiled_writer():
+    a = xarray.DataArray(
+        [[1.2345, 2.5]], dims=["x", "y"], coords={"x": [1], "y": [2, 3]}
+    )
+    writer = ndcsv.compile_writer(a)
+    with ndcsv.profile() as prof:
+        writer.write_csv(a, significant_digits=3)
+    assert [phase for _, _, phase in _phases(prof)] == ["round", "format", "write"]
+    assert {r.func for r in prof.records} == {"CompiledWriter.write_csv"}
+
+
+def test_profile_callback():
+    records = []
+    with ndcsv.profile(records.append) as prof:
+        read_csv(io.StringIO("1\n"))
+    assert records == prof.records
+    assert [r.phase for r in records] == ["header", "body", "coords", "unpack"]
+    assert records[0]._asdict()["func"] == "read_csv"
+
+
+def test_profile_nested():
+    with ndcsv.profile() as outer:
+        read_csv(io.StringIO("1\n"))
+        with ndcsv.profile() as inner:
+            read_csv(io.StringIO("2\n"))
+    assert len(outer.records) == 8
+    assert inner.records == outer.records[4:]
+
+
+def test_profile_trace_memory():
+    with ndcsv.profile(trace_memory=True) as prof:
+        read_csv(io.StringIO(write_csv(xarray.DataArray([[1, 2]], dims=["x", "y"]))))
+    for r in prof.records:
+        assert r.peak_memory is not None
+        assert r.peak_memory >= 0
+
+
+def test_profile_disabled():
+    with ndcsv.profile() as prof:
+        pass
+    read_csv(io.StringIO("1\n"))
+    assert prof.records == []
+
+
+def test_profile_thread():
+    """Profiling applies to the current thread only"""
+    with ndcsv.profile() as prof:
+        t = threading.Thread(target=read_csv, args=(io.StringIO("1\n"),))
+        t.start()
+        t.join()
+    assert prof.records == []
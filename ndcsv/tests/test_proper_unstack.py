@@ -1,5 +1,7 @@
 """Copy-pasted from xarray-extras"""
 
+import tracemalloc
+
 import numpy as np
 import pandas as pd
 import pytest
@@ -119,3 +121,69 @@ def test_proper_unstack_other_mi():
         },
     )
     xarray.testing.assert_equal(b, c)
+
+
+def test_proper_unstack_sparse():
+    a = xarray.DataArray(
+        [[1, 2], [3, 4]],
+        dims=["r", "c"],
+        coords={"r": ["r1", "r0"], "c": ["c1", "c0"]},
+    )
+    b = a.stack(s=["r", "c"]).isel(s=[0, 1, 3])
+    c = proper_unstack(b, "s")
+    expect = xarray.DataArray(
+        [[1.0, 2.0], [np.nan, 4.0]],
+        dims=["r", "c"],
+        coords={"r": ["r1", "r0"], "c": ["c1", "c0"]},
+    )
+    xarray.testing.assert_identical(c, expect)
+
+
+def test_proper_unstack_duplicates():
+    index = pd.MultiIndex.from_tuples([("x0", "y0"), ("x0", "y0")], names=["x", "y"])
+    xa = xarray.DataArray([1, 2], dims=["s"], coords={"s": index})
+    with pytest.raises(ValueError, match="duplicate"):
+        proper_unstack(xa, "s")
+
+
+def _peak_memory(func):
+    """Return the output of func() and the peak memory it allocated"""
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        out = func()
+        return out, tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+
+
+@pytest.mark.parametrize(
+    "stack,isel",
+    [
+        (["y", "z"], None),
+        (["y", "z"], "shuffle"),
+        (["y", "z"], "sparse"),
+        (["x", "y"], None),
+        (["x", "y"], "shuffle"),
+    ],
+)
+def test_proper_unstack_memory(stack, isel):
+    """proper_unstack must not deep-copy the input;
+    peak memory must not exceed the size of the output.
+    """
+    rng = np.random.default_rng(0)
+    a = xarray.DataArray(
+        rng.random((100, 40, 25)),
+        dims=["x", "y", "z"],
+        coords={"x": np.arange(100), "y": np.arange(40), "z": np.arange(25)},
+    )
+    b = a.stack(s=stack)
+    if isel == "shuffle":
+        b = b.isel(s=rng.permutation(b.sizes["s"]))
+    elif isel == "sparse":
+        b = b.isel(s=np.arange(0, b.sizes["s"], 2))
+
+    c, peak = _peak_memory(lambda: proper_unstack(b, "s"))
+    assert peak < a.nbytes * 1.1
+    if isel != "sparse":
+        xarray.testing.assert_equal(c, a.transpose(*c.dims).sel(c.coords))
@@ -3,13 +3,16 @@ Normal use cases are tested in :mod:`test_roundtrip`
 """
 
 import io
+import warnings
 
 import numpy as np
 import pandas as pd
 import pytest
 import xarray
 
+import ndcsv.read
 from ndcsv import read_csv
+from ndcsv.read import _parse_header, _parse_small
 
 
 def test_malformed_input():
@@ -58,14 +61,57 @@ def test_coords_bool():
         "13/11/2017,14/11/2017",
         "11/13/2017,11/14/2017",
         "13 Nov 2017,14 Nov 2017",
+        "13NOV2017,14NOV2017",
     ],
 )
 def test_coords_date(s):
+    expect = pd.to_datetime(["13 Nov 2017", "14 Nov 2017"]).values
+    # On the columns
+    a = read_csv(io.StringIO(f"y,{s}\nx,,\nx0,1,2\n"))
+    np.testing.assert_equal(expect, a.coords["y"].values)
+    # On the rows
+    x0, x1 = s.split(",")
+    a = read_csv(io.StringIO(f"x,\n{x0},1\n{x1},2\n"))
+    np.testing.assert_equal(expect, a.coords["x"].values)
+
+
+@pytest.mark.parametrize(
+    "s,expect",
+    [
+        ("1,2", [1, 2]),
+        ("2017,2018", [2017, 2018]),
+        ("1e3,-inf", [1000.0, -np.inf]),
+        ("S001,00200", ["S001", "00200"]),
+        ("1-2,3", ["1-2", "3"]),
+        ('"1,5",3', ["1,5", "3"]),
+        ("today,now", ["today", "now"]),
+        ("y,n", [True, False]),
+        ("2017-01-02,x", ["2017-01-02", "x"]),
+        ("Jan 2017,Feb 2017", pd.to_datetime(["2017-01-01", "2017-02-01"]).values),
+        ("Jan2017,Feb2017", pd.to_datetime(["2017-01-01", "2017-02-01"]).values),
+        ("x0,abc1", ["x0", "abc1"]),
+        ("ö1,ö2", ["ö1", "ö2"]),
+        # ISO-8601 dates are never read with dayfirst=True
+        ("2017-01-02,2017-01-03", pd.to_datetime(["2017-01-02", "2017-01-03"]).values),
+        (
+            "2017-01-02T03:04,2017-01-02T03:05",
+            pd.to_datetime(["2017-01-02 03:04", "2017-01-02 03:05"]).values,
+        ),
+        (
+            "2017-01-02 03:04:05.5,NaT",
+            pd.to_datetime(["2017-01-02 03:04:05.5", "NaT"]).values,
+        ),
+        ("2017-13-01,2017-01-01", ["2017-13-01", "2017-01-01"]),
+    ],
+)
+def test_coords_classify(s, expect):
+    """Labels that look like numbers are always read as numbers, even when
+    pandas.to_datetime would accept them. Anything that only partially
+    matches a type remains a string.
+    """
     buf = io.StringIO(f"y,{s}\nx,,\nx0,1,2\n")
     a = read_csv(buf)
-    np.testing.assert_equal(
-        pd.to_datetime(["13 Nov 2017", "14 Nov 2017"]).values, a.coords["y"].values
-    )
+    np.testing.assert_equal(a.coords["y"].values, np.array(expect))
 
 
 def test_2d_onecol_nomultiindex():
@@ -155,6 +201,34 @@ def test_nonindex_coords_with_multiindex(unstack):
     xarray.testing.assert_equal(a, b)
 
 
+def test_nonindex_coords_sparse():
+    """Non-index coords of a sparse array are not confused by the NaNs
+    introduced by unstacking
+    """
+    buf = io.StringIO("x,y,z (x),\nx1,y1,z1,1\nx2,y2,,2\nx2,y1,,3\n")
+    a = read_csv(buf)
+    b = xarray.DataArray(
+        [[1.0, np.nan], [3.0, 2.0]],
+        dims=["x", "y"],
+        coords={
+            "x": ["x1", "x2"],
+            "y": ["y1", "y2"],
+            "z": ("x", np.array(["z1", np.nan], dtype=object)),
+        },
+    )
+    xarray.testing.assert_equal(a, b)
+
+
+def test_ambiguous_nonindex_coords_multiindex():
+    buf = io.StringIO("x,y,z (x),\nx1,y1,z1,1\nx1,y2,z2,2\n")
+    with pytest.raises(
+        ValueError,
+        match=r"Non-index coord z \(x\) has different values for "
+        r"the same value of its dimension x",
+    ):
+        read_csv(buf)
+
+
 @pytest.mark.parametrize("unstack", [False, True])
 def test_missing_index_coord1(unstack):
     """The index coord may be missing as long as matching non-index coord(s)
@@ -206,3 +280,192 @@ def test_float_precision(txt):
     """
     buf = io.StringIO(txt)
     assert read_csv(buf).values.ravel()[0] == 0.99988
+
+
+def test_3_levels_multiindex_rows():
+    buf = io.StringIO("w,,,w0,w1\nx,y,z,,\nx0,y0,z0,1,2\nx0,y0,z1,3,4\n")
+    a = read_csv(buf)
+    b = xarray.DataArray(
+        [[[[1, 3]]], [[[2, 4]]]],
+        dims=["w", "x", "y", "z"],
+        coords={"w": ["w0", "w1"], "x": ["x0"], "y": ["y0"], "z": ["z0", "z1"]},
+    )
+    xarray.testing.assert_equal(a, b)
+
+
+def test_header_cache():
+    """Files with identical headers reuse the parsed and converted coords on the
+    columns, but not the data or the coords on the rows
+    """
+    _parse_header.cache_clear()
+    a = read_csv(io.StringIO("y,2017-01-13,2017-01-14\nx,,\nx0,1,2\n"))
+    b = read_csv(io.StringIO("y,2017-01-13,2017-01-14\nx,,\nx1,3,4\nx2,5,6\n"))
+    assert _parse_header.cache_info().hits == 1
+    assert _parse_header.cache_info().misses == 1
+
+    y = pd.to_datetime(["2017-01-13", "2017-01-14"])
+    xarray.testing.assert_equal(
+        a,
+        xarray.DataArray([[1, 2]], dims=["x", "y"], coords={"x": ["x0"], "y": y}),
+    )
+    xarray.testing.assert_equal(
+        b,
+        xarray.DataArray(
+            [[3, 4], [5, 6]], dims=["x", "y"], coords={"x": ["x1", "x2"], "y": y}
+        ),
+    )
+
+
+def test_header_cache_not_shared():
+    """Altering the coords of the output does not alter the cache"""
+    txt = "y,,y0,y1\nz,,z0,z1\nx,w,,\nx0,w0,1,2\n"
+    a = read_csv(io.StringIO(txt), unstack=False)
+    a.coords["y"].values[0] = "foo"
+    b = read_csv(io.StringIO(txt), unstack=False)
+    assert b.coords["y"].values.tolist() == ["y0", "y1"]
+
+
+def test_newline_in_header():
+    buf = io.StringIO('y,"y\n0",y1\nx,,\nx0,1,2\n')
+    a = read_csv(buf)
+    b = xarray.DataArray(
+        [[1, 2]], dims=["x", "y"], coords={"x": ["x0"], "y": ["y\n0", "y1"]}
+    )
+    xarray.testing.assert_equal(a, b)
+
+
+def test_engine_invalid():
+    with pytest.raises(ValueError, match="engine must be"):
+        read_csv(io.StringIO("x,\nx0,1\n"), engine="foo")
+
+
+@pytest.mark.parametrize(
+    "txt",
+    [
+        # Quoted labels
+        'x,\n"x,0",1\nx1,2\n',
+        # NaN labels
+        "x,y,\nx0,,1\nx1,y1,2\n",
+        # Int overflow
+        "x,\nx0,99999999999999999999\nx1,1\n",
+        # Mixed ints and floats
+        "x,\nx0,1\nx1,2.5\n",
+        # Bools
+        "x,\nx0,True\nx1,False\n",
+        # Empty lines
+        "x,y,\nx0,y0,1\n\nx1,y1,2\n\n",
+    ],
+)
+def test_engine_numpy_fallback(txt):
+    """engine="numpy" returns the same as pandas in edge cases"""
+    a = read_csv(io.StringIO(txt), unstack=False, engine="numpy")
+    b = read_csv(io.StringIO(txt), unstack=False)
+    xarray.testing.assert_identical(a, b)
+
+
+def test_engine_numpy_fallback_warnings(monkeypatch):
+    """The fallback doesn't depend on numpy warnings being turned into errors,
+    as they are in the pytest config of this repo
+    """
+    fromstring = np.fromstring
+
+    def fromstring_numpy1(text, dtype, sep):
+        """Older versions of numpy warn instead of raising on
+        unparseable text, and returns what it parsed so far
+        """
+        try:
+            return fromstring(text, dtype=dtype, sep=sep)
+        except ValueError:
+            warnings.warn(
+                "string or file could not be read to its end due to unmatched "
+                "data; this will raise a ValueError in the future.",
+                DeprecationWarning,
+                stacklevel=2,
+            )
+            return np.array([], dtype=dtype)
+
+    monkeypatch.setattr(np, "fromstring", fromstring_numpy1)
+    txt = "x,\nx0,True\nx1,False\n"
+    with warnings.catch_warnings(record=True) as record:
+        warnings.simplefilter("always")
+        a = read_csv(io.StringIO(txt), unstack=False, engine="numpy")
+    assert not [w for w in record if w.category is DeprecationWarning]
+    b = read_csv(io.StringIO(txt), unstack=False)
+    xarray.testing.assert_identical(a, b)
+
+
+@pytest.mark.parametrize(
+    "txt,fast",
+    [
+        ("1\n", True),
+        ("-1.5\n", True),
+        ("foo\n", False),
+        ("2017-01-01\n", False),
+        ("x,\nx0,1\nx1,2\n", True),
+        ("x,\nx0,1.5\nx1,\n", True),
+        ("x,\nx0,nan\nx1,1\n", True),
+        ("x,\nx0,1\r\n\nx1,1e3\r\n", True),
+        ("x,\n1,1\n2,2\n", True),
+        ("x,\n2017-01-01,1\n2017-01-02,2\n", True),
+        ("x,\ntrue,1\nfalse,2\n", True),
+        ('x,\n"x,0",1\nx1,2\n', True),
+        ("x,\nx0,1\nx0,2\n", True),
+        ("x,\nNA,1\n", False),
+        ("x,\nx0,True\n", False),
+        ("x,\nx0,inf\n", False),
+        ("x,\nx0,1-2\n", False),
+        ("x,\nx0,99999999999999999999\n", False),
+        ("x,\nx0,1\nx1\n", False),
+        ("x,\nnan,1\nx0,1.5\n", False),
+        ("y,1,2\nx,,\nx0,1,2\nx1,3,\n", True),
+        ("y,2017-01-01,2017-01-02\nx\n1.5,1,2\n", True),
+        ("y,,y0\nx,z,\nx0,z0,1\n", False),
+        ("y,y0\nz,z0\nx,\nx0,1\n", False),
+        ("x,y,\nx0,y0,1\n", False),
+        ("y (x),\n1,2\n", False),
+        ("x (y),x0\nz,\nz0,1\n", False),
+    ],
+)
+def test_small_file(monkeypatch, txt, fast):
+    """Small files are read without pandas, with the same result"""
+    assert (_parse_small(txt) is not None) == fast
+    a = read_csv(io.StringIO(txt))
+    monkeypatch.setattr(ndcsv.read, "_SMALL_FILE_CHARS", -1)
+    b = read_csv(io.StringIO(txt))
+    xarray.testing.assert_identical(a, b)
+    assert a.dtype == b.dtype
+    for k, v in a.coords.items():
+        assert v.dtype == b.coords[k].dtype
+
+
+def test_small_file_threshold(monkeypatch):
+    txt = "x,\nx0,1\nx1,2\n"
+    calls = []
+    monkeypatch.setattr(ndcsv.read, "_parse_small", lambda txt, _: calls.append(txt))
+    monkeypatch.setattr(ndcsv.read, "_SMALL_FILE_CHARS", len(txt) - 1)
+    read_csv(io.StringIO(txt))
+    assert calls == []
+    monkeypatch.setattr(ndcsv.read, "_SMALL_FILE_CHARS", len(txt))
+    # _parse_small returns None; fall back to the normal path
+    b = read_csv(io.StringIO(txt))
+    assert calls == [txt]
+    assert b.values.tolist() == [1, 2]
+
+
+@pytest.mark.parametrize("engine", ["pandas", "numpy"])
+def test_small_file_floats(monkeypatch, engine):
+    """Small files parse floats the same way as the chosen engine does for
+    larger files. pandas.read_csv is not always correctly rounded in the last
+    bit, e.g. for -0.00918052952127611.
+    """
+    rng = np.random.default_rng(0)
+    values = rng.standard_normal(1000) * 10.0 ** rng.integers(-20, 20, 1000)
+    txt = "x,\n" + "".join(f"{i},{v!r}\n" for i, v in enumerate(values.tolist()))
+    txt += "1000,-0.00918052952127611\n"
+    assert len(txt) < ndcsv.read._SMALL_FILE_CHARS
+    a = read_csv(io.StringIO(txt), engine=engine)
+    monkeypatch.setattr(ndcsv.read, "_SMALL_FILE_CHARS", -1)
+    b = read_csv(io.StringIO(txt), engine=engine)
+    np.testing.assert_array_equal(a.values, b.values)
+    if engine == "numpy":
+        np.testing.assert_array_equal(a.values[:-1], values)
@@ -7,6 +7,7 @@
 """
 
 import io
+import tracemalloc
 
 import numpy as np
 import pandas as pd
@@ -14,6 +15,7 @@ import pytest
 import xarray
 from numpy import nan
 
+import ndcsv.read
 from ndcsv import read_csv, write_csv
 
 
@@ -320,3 +322,385 @@ def test_duplicate_index_multiindex():
     buf.seek(0)
     b = read_csv(buf, unstack=False)
     xarray.testing.assert_equal(a, b)
+
+
+@pytest.mark.parametrize(
+    "digits,txt",
+    [
+        (None, "x,\nx1,0.1234567891\nx2,123456789.0\nx3,\nx4,1e-20\n"),
+        (8, "x,\nx1,0.12345679\nx2,123456790.0\nx3,\nx4,1e-20\n"),
+        (3, "x,\nx1,0.123\nx2,123000000.0\nx3,\nx4,1e-20\n"),
+    ],
+)
+def test_significant_digits(digits, txt):
+    a = xarray.DataArray(
+        [0.1234567891, 123456789.0, nan, 1e-20],
+        dims=["x"],
+        coords={"x": ["x1", "x2", "x3", "x4"]},
+    )
+    buf = io.StringIO()
+    write_csv(a, buf, significant_digits=digits)
+    assert buf.getvalue() == txt
+    buf.seek(0)
+    b = read_csv(buf)
+    if digits is None:
+        xarray.testing.assert_equal(a, b)
+    else:
+        xarray.testing.assert_allclose(a, b, rtol=0.5 * 10 ** (1 - digits))
+
+
+@pytest.mark.parametrize("digits", [3, 15, 16, 17])
+def test_significant_digits_correctly_rounded(digits):
+    """The result is the float closest to the value rounded in decimal, even
+    when scaling by a power of ten is inexact
+    """
+    rng = np.random.default_rng(0)
+    data = rng.uniform(-1, 1, 10_000) * 10.0 ** rng.integers(-30, 30, 10_000)
+    txt = write_csv(xarray.DataArray(data, dims=["x"]), significant_digits=digits)
+    actual = [float(line.split(",")[1]) for line in txt.splitlines()[1:]]
+    expect = [float(f"{v:.{digits - 1}e}") for v in data.tolist()]
+    np.testing.assert_array_equal(actual, expect)
+    if digits == 17:
+        np.testing.assert_array_equal(actual, data)
+
+
+@pytest.mark.parametrize("digits", [1, 3, 17])
+def test_significant_digits_float_max(digits):
+    """No overflow warnings near the largest float"""
+    data = [1.5e308, -1.7e308, np.finfo(float).max, 5e-324]
+    txt = write_csv(xarray.DataArray(data, dims=["x"]), significant_digits=digits)
+    actual = [float(line.split(",")[1]) for line in txt.splitlines()[1:]]
+    expect = [float(f"{v:.{digits - 1}e}") for v in data]
+    np.testing.assert_array_equal(actual, expect)
+
+
+@pytest.mark.parametrize(
+    "data,txt",
+    [
+        (xarray.DataArray(1 / 3), "0.333\n"),
+        (xarray.DataArray([1, 2], dims=["x"]), "x,\n0,1\n1,2\n"),
+        (pd.Series([1 / 3, 2 / 3]), "dim_0,\n0,0.333\n1,0.667\n"),
+        (
+            pd.DataFrame({"a": [1 / 3], "b": ["1/3"], "c": [1]}),
+            "dim_1,a,b,c\ndim_0,,,\n0,0.333,1/3,1\n",
+        ),
+    ],
+)
+def test_significant_digits_dtypes(data, txt):
+    """Only float data is rounded"""
+    assert write_csv(data, significant_digits=3) == txt
+
+
+def test_layout_auto_small_first_dim():
+    """A tiny first dim is moved to the columns, instead of stacking all
+    other dims on the columns and producing a very wide file
+    """
+    a = xarray.DataArray(
+        np.arange(2 * 30 * 4).reshape((2, 30, 4)),
+        dims=["x", "y", "z"],
+        coords={"x": ["x0", "x1"], "y": np.arange(30), "z": ["z0", "z1", "z2", "z3"]},
+    )
+    txt = write_csv(a, layout="auto")
+    assert txt.startswith("x,,x0,x1\ny,z,,\n0,z0,0,120\n0,z1,1,121\n")
+    assert len(txt) < len(write_csv(a))
+    b = read_csv(io.StringIO(txt))
+    xarray.testing.assert_equal(a, b)
+
+
+def test_layout_auto_sparse():
+    """Sparse arrays are written in long format, omitting the NaNs"""
+    data = np.full((10, 10, 10), nan)
+    data[:, 0, 0] = 1.0
+    data[0, :, 0] = 2.0
+    data[0, 0, :] = 3.0
+    a = xarray.DataArray(
+        data,
+        dims=["x", "y", "z"],
+        coords={"x": np.arange(10), "y": np.arange(10), "z": np.arange(10)},
+    )
+    txt = write_csv(a, layout="auto")
+    assert txt.startswith("x,y,z,\n0,0,0,3.0\n0,0,1,3.0\n")
+    assert txt.count("\n") == 29
+    b = read_csv(io.StringIO(txt))
+    xarray.testing.assert_equal(a, b)
+
+
+def test_layout_auto_sparse_order():
+    """NaNs are not dropped if that would change the first-seen order of the
+    labels when reading the file back
+    """
+    data = np.full((10, 10, 10), nan)
+    data[:, 1, 1] = 1.0
+    data[1, :, 1] = 2.0
+    data[1, 1, :] = 3.0
+    a = xarray.DataArray(
+        data,
+        dims=["x", "y", "z"],
+        coords={"x": np.arange(10), "y": np.arange(10), "z": np.arange(10)},
+    )
+    txt = write_csv(a, layout="auto")
+    assert txt.count("\n") > 100
+    b = read_csv(io.StringIO(txt))
+    xarray.testing.assert_equal(a, b)
+
+
+@pytest.mark.parametrize(
+    "shape", [(3, 2), (2, 50), (50, 2), (3, 4, 2), (3, 40, 2), (2, 3, 4, 5)]
+)
+def test_layout_auto_roundtrip(shape):
+    dims = ["x", "y", "z", "w"][: len(shape)]
+    a = xarray.DataArray(
+        np.arange(np.prod(shape)).reshape(shape),
+        dims=dims,
+        coords={
+            **{
+                dim: [f"{dim}{i}" for i in range(size)]
+                for dim, size in zip(dims, shape)
+            },
+            "c": ("y", np.arange(shape[1]) * 10),
+        },
+    )
+    b = read_csv(io.StringIO(write_csv(a, layout="auto")))
+    xarray.testing.assert_equal(a, b)
+
+
+def test_layout_auto_multiindex():
+    """Dense MultiIndexes are unstacked before choosing the layout"""
+    a = xarray.DataArray(
+        np.arange(2 * 3 * 4).reshape((2, 3, 4)),
+        dims=["x", "y", "z"],
+        coords={"x": ["x0", "x1"], "y": ["y0", "y1", "y2"], "z": np.arange(4)},
+    )
+    b = a.stack(s=["x", "y"])
+    c = read_csv(io.StringIO(write_csv(b, layout="auto")))
+    xarray.testing.assert_equal(c, a.transpose("z", "x", "y"))
+
+
+@pytest.mark.parametrize(
+    "data",
+    [
+        np.random.default_rng(0).random((3, 4, 5)),
+        np.arange(60).reshape(3, 4, 5),
+        np.arange(60).reshape(3, 4, 5) * 1.5,
+        np.where(np.arange(60) % 7, np.arange(60), nan).reshape(3, 4, 5),
+        np.arange(60).reshape(3, 4, 5) % 3 == 0,
+        np.char.add("s", np.arange(60).astype(str)).reshape(3, 4, 5),
+    ],
+)
+@pytest.mark.parametrize("stack", [None, ["x", "y"], ["y", "z"], ["x", "y", "z"]])
+def test_engine_numpy(data, stack):
+    a = xarray.DataArray(
+        data,
+        dims=["x", "y", "z"],
+        coords={"x": ["x0", "x1", "x2"], "y": [10, 20, 30, 40], "z": np.arange(5)},
+    )
+    if stack:
+        a = a.stack(s=stack)
+    txt = write_csv(a)
+    b = read_csv(io.StringIO(txt), engine="numpy")
+    c = read_csv(io.StringIO(txt))
+    xarray.testing.assert_allclose(b, c, rtol=1e-15)
+    assert b.dtype == c.dtype
+    # Unlike pandas, floats are exact
+    if stack:
+        b = b.stack(s=stack)
+    xarray.testing.assert_identical(a.transpose(*b.dims), b)
+
+
+@pytest.mark.parametrize(
+    "stack,sparse",
+    [
+        (None, False),
+        (["x"], False),
+        (["x", "y"], False),
+        (["y", "z"], False),
+        (["x", "y", "z"], False),
+        (["x", "y", "z"], True),
+    ],
+)
+@pytest.mark.parametrize("factory", [False, True])
+def test_out(stack, sparse, factory):
+    a = xarray.DataArray(
+        np.arange(24).reshape(2, 3, 4),
+        dims=["x", "y", "z"],
+        coords={"x": ["x0", "x1"], "y": [10, 20, 30], "z": np.arange(4)},
+    )
+    if stack is None:
+        a = a.isel(z=0, drop=True)
+    else:
+        a = a.stack(s=stack)
+    if sparse:
+        a = a.isel(s=slice(1, None))
+    txt = write_csv(a)
+    expect = read_csv(io.StringIO(txt))
+
+    out = np.empty(expect.shape, dtype=expect.dtype)
+    if factory:
+        calls = []
+
+        def out_factory(shape, dtype):
+            calls.append((shape, dtype))
+            return out
+
+        b = read_csv(io.StringIO(txt), out=out_factory)
+        assert calls == [(expect.shape, expect.dtype)]
+    else:
+        b = read_csv(io.StringIO(txt), out=out)
+    xarray.testing.assert_identical(b, expect)
+    assert b.values is out or b.values.base is out
+
+
+def test_out_0d():
+    out = np.empty((), dtype=float)
+    b = read_csv(io.StringIO("1.5\n"), out=out)
+    xarray.testing.assert_identical(b, xarray.DataArray(1.5))
+    assert out == 1.5
+
+
+def test_out_unstack_false():
+    a = xarray.DataArray([[1, 2], [3, 4]], dims=["x", "y"]).stack(s=["x", "y"])
+    txt = write_csv(a)
+    out = np.empty(4, dtype=int)
+    b = read_csv(io.StringIO(txt), unstack=False, out=out)
+    np.testing.assert_array_equal(out, [1, 2, 3, 4])
+    assert np.shares_memory(b.values, out)
+
+
+def test_out_shared_memory():
+    shared_memory = pytest.importorskip("multiprocessing.shared_memory")
+    a = xarray.DataArray(
+        np.arange(6.0).reshape(2, 3),
+        dims=["x", "y"],
+        coords={"x": [1, 2], "y": ["y0", "y1", "y2"]},
+    )
+    shms = []
+
+    def out_factory(shape, dtype):
+        shm = shared_memory.SharedMemory(create=True, size=int(np.prod(shape)) * 8)
+        shms.append(shm)
+        return np.ndarray(shape, dtype=dtype, buffer=shm.buf)
+
+    b = read_csv(io.StringIO(write_csv(a)), out=out_factory)
+    try:
+        xarray.testing.assert_identical(a, b)
+        (shm,) = shms
+        np.testing.assert_array_equal(
+            np.ndarray((2, 3), dtype=float, buffer=shm.buf), a.values
+        )
+    finally:
+        del b
+        for shm in shms:
+            shm.close()
+            shm.unlink()
+
+
+def test_out_cast():
+    """ints can be read into an array of floats"""
+    a = xarray.DataArray([1, 2], dims=["x"], coords={"x": [10, 20]})
+    out = np.empty(2)
+    b = read_csv(io.StringIO(write_csv(a)), out=out)
+    xarray.testing.assert_identical(a.astype(float), b)
+
+
+@pytest.mark.parametrize(
+    "out,exc,match",
+    [
+        (np.empty((3, 2)), ValueError, r"out has shape \(3, 2\); the data has shape"),
+        (np.empty((2, 3), dtype=int), ValueError, "out has dtype int64; the data"),
+        (np.empty((3, 2)).T, ValueError, "C-contiguous"),
+        (lambda *_: [[0] * 3] * 2, TypeError, "out must be a numpy array"),
+    ],
+)
+def test_out_mismatch(out, exc, match):
+    a = xarray.DataArray(np.zeros((2, 3)), dims=["x", "y"])
+    with pytest.raises(exc, match=match):
+        read_csv(io.StringIO(write_csv(a)), out=out)
+
+
+@pytest.mark.parametrize("engine", ["pandas", "numpy"])
+@pytest.mark.parametrize("layout", ["plain", "rows", "columns", "long"])
+def test_read_csv_memory(tmpdir, monkeypatch, layout, engine):
+    """Test the peak memory bound documented in read_csv"""
+    # Keep the overhead of the chunk being parsed small compared to the data
+    monkeypatch.setattr(ndcsv.read, "_CHUNK_ROWS", 500)
+    monkeypatch.setattr(ndcsv.read, "_CHUNK_SIZE", 2**14)
+
+    rng = np.random.default_rng(0)
+    a = xarray.DataArray(
+        rng.random((10, 50, 100)),
+        dims=["x", "y", "z"],
+        coords={
+            "x": np.arange(10),
+            "y": [f"y{i}" for i in range(50)],
+            "z": np.arange(100),
+        },
+    )
+    if layout == "plain":
+        b = a.stack(r=["x", "y"]).reset_index("r", drop=True).T
+        b.coords["r"] = np.arange(b.sizes["r"])
+    elif layout == "rows":
+        b = a.stack(r=["x", "y"]).T
+    elif layout == "columns":
+        b = a.stack(c=["x", "y"])
+    else:
+        b = a.stack(s=["x", "y", "z"])
+    fname = f"{tmpdir}/test.csv"
+    write_csv(b, fname)
+    # Warm up caches and imports
+    read_csv(fname, engine=engine)
+
+    tracemalloc.start()
+    try:
+        base = tracemalloc.get_traced_memory()[0]
+        c = read_csv(fname, engine=engine)
+        peak = tracemalloc.get_traced_memory()[1] - base
+    finally:
+        tracemalloc.stop()
+
+    expect = b if layout == "plain" else a
+    xarray.testing.assert_allclose(c, expect.transpose(*c.dims), rtol=1e-15)
+    nrows = b.shape[0]
+    ncols = b.size // nrows
+    bound = 2 * c.nbytes + 24 * nrows + 2**19
+    if engine == "pandas":
+        bound += 1536 * ncols
+    assert peak < bound
+
+
+@pytest.mark.parametrize(
+    "txt,full_read",
+    [
+        # ints, then floats
+        ("x,\n1,1\n2,2\n3,3.5\n", False),
+        # ints, then floats, with string labels
+        ("x,\nx0,1\nx1,2\nx2,3.5\n", True),
+        # ints, then strings
+        ("x,\nx0,1\nx1,2\nx2,foo\n", True),
+        # bools, then NaN
+        ("x,\nx0,true\nx1,false\nx2,\n", True),
+        # labels: ints, then strings
+        ("x,\n1,1\n2,2\nfoo,3\n", True),
+        # labels: strings, then NaN
+        ("x,y,\nx0,y0,1\nx0,y1,2\nx1,,3\n", True),
+    ],
+)
+def test_read_csv_chunks(monkeypatch, txt, full_read):
+    """Reading in chunks gives the same result as reading all at once,
+    even when pandas infers different dtypes for different chunks, in which
+    case the file is read again all at once
+    """
+    expect = read_csv(io.StringIO(txt), unstack=False)
+    monkeypatch.setattr(ndcsv.read, "_CHUNK_ROWS", 2)
+    monkeypatch.setattr(ndcsv.read, "_SMALL_FILE_CHARS", 0)
+    results = []
+    read_pandas_body = ndcsv.read._read_pandas_body
+
+    def spy(*args, **kwargs):
+        res = read_pandas_body(*args, **kwargs)
+        results.append(res is None)
+        return res
+
+    monkeypatch.setattr(ndcsv.read, "_read_pandas_body", spy)
+    actual = read_csv(io.StringIO(txt), unstack=False, engine="pandas")
+    xarray.testing.assert_identical(actual, expect)
+    assert results == [full_read]
@@ -0,0 +1,235 @@
+import os
+
+import numpy as np
+import pandas as pd
+import pytest
+import xarray
+
+import ndcsv
+import ndcsv.update
+from ndcsv import read_csv, update_csv, write_csv
+
+
+@pytest.mark.parametrize("ext", ["csv", "csv.gz", "csv.bz2", "csv.xz"])
+def test_update(tmpdir, ext):
+    a = xarray.DataArray(
+        np.arange(12.0).reshape(4, 3),
+        dims=["t", "x"],
+        coords={
+            "t": pd.date_range("2020-01-01", periods=4),
+            "x": ["x0", "x1", "x2"],
+        },
+    )
+    fname = f"{tmpdir}/foo.{ext}"
+    write_csv(a, fname)
+    delta = xarray.DataArray(
+        [[100.0, 200.0], [300.0, 400.0]],
+        dims=["t", "x"],
+        coords={"t": pd.to_datetime(["2020-01-03", "2020-01-09"]), "x": ["x2", "x0"]},
+    )
+    update_csv(fname, delta)
+    expect = a.copy()
+    expect.loc["2020-01-03", "x2"] = 100
+    expect.loc["2020-01-03", "x0"] = 200
+    expect = xarray.concat(
+        [
+            expect,
+            xarray.DataArray(
+                [[400.0, np.nan, 300.0]],
+                dims=["t", "x"],
+                coords={"t": pd.to_datetime(["2020-01-09"]), "x": a.x},
+            ),
+        ],
+        dim="t",
+    )
+    xarray.testing.assert_identical(read_csv(fname), expect)
+    assert os.listdir(tmpdir) == [f"foo.{ext}"]
+
+
+def test_untouched_rows_verbatim(tmpdir):
+    fname = f"{tmpdir}/foo.csv"
+    with open(fname, "w") as fh:
+        fh.write('x,a,b\nt,,\n2020-01-01,1.00,2\n2020-01-02,3,4\n"2020-01-03",5,6\n')
+    delta = xarray.DataArray(
+        [[7]], dims=["t", "x"], coords={"t": pd.to_datetime(["2020-01-02"]), "x": ["b"]}
+    )
+    update_csv(fname, delta)
+    with open(fname) as fh:
+        assert fh.read() == (
+            'x,a,b\nt,,\n2020-01-01,1.00,2\n2020-01-02,3,7\n"2020-01-03",5,6\n'
+        )
+
+
+def test_1d(tmpdir):
+    s = xarray.DataArray(
+        [1.0, 2.0, 3.0],
+        dims=["t"],
+        coords={"t": pd.date_range("2020-01-01", periods=3)},
+    )
+    fname = f"{tmpdir}/foo.csv"
+    write_csv(s, fname)
+    update_csv(fname, xarray.DataArray([np.nan], dims=["t"], coords={"t": s.t[:1]}))
+    expect = s.copy()
+    expect[0] = np.nan
+    xarray.testing.assert_identical(read_csv(fname), expect)
+
+
+def test_1d_first_nan(tmpdir):
+    """An empty first cell of the body of a 1-D file would be confused with
+    the header. The first value of the delta is not NaN, so on its own it
+    would write NaNs as empty cells.
+    """
+    fname = f"{tmpdir}/foo.csv"
+    with open(fname, "w") as fh:
+        fh.write("x,\n1,1.0\n2,2.0\n3,3.0\n")
+    delta = xarray.DataArray([5.0, np.nan], dims=["x"], coords={"x": [2, 1]})
+    update_csv(fname, delta)
+    with open(fname) as fh:
+        assert fh.read() == "x,\n1,nan\n2,5.0\n3,3.0\n"
+    expect = xarray.DataArray([np.nan, 5.0, 3.0], dims=["x"], coords={"x": [1, 2, 3]})
+    xarray.testing.assert_identical(read_csv(fname), expect)
+
+
+def test_multiindex(tmpdir):
+    """MultiIndex on the columns, and non-index coords on the rows"""
+    b = xarray.DataArray(
+        np.arange(12).reshape(3, 2, 2),
+        dims=["r", "c1", "c2"],
+        coords={
+            "r": ["a", "b", "c"],
+            "c1": ["x", "y"],
+            "c2": [10, 20],
+            "w": ("r", ["wa", "wb", "wc"]),
+        },
+    )
+    fname = f"{tmpdir}/foo.csv"
+    write_csv(b, fname)
+    delta = xarray.DataArray(
+        [[[500], [700]], [[1100], [1300]]],
+        dims=["r", "c1", "c2"],
+        coords={
+            "r": ["b", "d"],
+            "c1": ["x", "y"],
+            "c2": [20],
+            "w": ("r", ["new", "wd"]),
+        },
+    )
+    update_csv(fname, delta)
+    # The rows are matched on the index coords only; the non-index coords of
+    # the existing rows are not updated.
+    expect = xarray.concat([b, b[:1].assign_coords(r=["d"], w=("r", ["wd"]))], "r")
+    expect = expect.astype(float)
+    expect[3] = np.nan
+    expect.loc["b", :, 20] = [500, 700]
+    expect.loc["d", :, 20] = [1100, 1300]
+    xarray.testing.assert_identical(read_csv(fname), expect)
+
+
+def test_mixed_types(tmpdir):
+    """Labels of a block are converted to a different type than those of the
+    delta
+    """
+    b = xarray.DataArray([1, 2, 3], dims=["x"], coords={"x": ["1", "2", "y"]})
+    fname = f"{tmpdir}/foo.csv"
+    write_csv(b, fname)
+    update_csv(fname, xarray.DataArray([10], dims=["x"], coords={"x": ["2"]}))
+    xarray.testing.assert_identical(read_csv(fname), b.copy(data=[1, 10, 3]))
+
+
+def test_int_and_float(tmpdir):
+    """Integer labels of the delta match float labels of the file"""
+    b = xarray.DataArray([1.0, 2.0, 3.0], dims=["x"], coords={"x": [0.5, 1.0, 2.0]})
+    fname = f"{tmpdir}/foo.csv"
+    write_csv(b, fname)
+    update_csv(fname, xarray.DataArray([9.0], dims=["x"], coords={"x": [1]}))
+    xarray.testing.assert_identical(read_csv(fname), b.copy(data=[1.0, 9.0, 3.0]))
+
+
+def test_blocks(tmpdir, monkeypatch):
+    monkeypatch.setattr(ndcsv.update, "_CHUNK_ROWS", 3)
+    b = xarray.DataArray(np.arange(10), dims=["x"], coords={"x": np.arange(10)})
+    fname = f"{tmpdir}/foo.csv"
+    write_csv(b, fname)
+    delta = xarray.DataArray([-1, -2, -3], dims=["x"], coords={"x": [9, 2, 3]})
+    update_csv(fname, delta)
+    expect = b.copy(data=[0, 1, -2, -3, 4, 5, 6, 7, 8, -1])
+    xarray.testing.assert_identical(read_csv(fname), expect)
+
+
+def test_permissions(tmpdir):
+    a = xarray.DataArray(
+        [[1.0, 2.0], [3.0, 4.0]],
+        dims=["t", "x"],
+        coords={"t": pd.date_range("2020-01-01", periods=2), "x": ["x0", "x1"]},
+    )
+    fname = f"{tmpdir}/foo.csv"
+    write_csv(a, fname)
+    os.chmod(fname, 0o640)
+    update_csv(fname, a[:1])
+    assert os.stat(fname).st_mode & 0o777 == 0o640
+
+
+@pytest.mark.parametrize(
+    "delta,match",
+    [
+        (
+            xarray.DataArray([[1.0]], dims=["u", "x"], coords={"u": [1], "x": ["x0"]}),
+            "index names",
+        ),
+        (
+            xarray.DataArray([[1.0]], dims=["t", "y"], coords={"t": [1], "y": ["x0"]}),
+            "coords on the columns",
+        ),
+        (
+            xarray.DataArray([[1.0]], dims=["t", "x"], coords={"t": [1], "x": ["x3"]}),
+            "not in the file",
+        ),
+        (
+            xarray.DataArray([1.0], dims=["t"], coords={"t": [1]}),
+            "coords on the columns",
+        ),
+        (
+            xarray.DataArray(
+                [[1.0], [2.0]], dims=["t", "x"], coords={"t": [1, 1], "x": ["x0"]}
+            ),
+            "duplicate",
+        ),
+        (xarray.DataArray(1), "0-dimensional"),
+    ],
+)
+def test_invalid(tmpdir, delta, match):
+    a = xarray.DataArray(
+        [[1.0, 2.0], [3.0, 4.0]],
+        dims=["t", "x"],
+        coords={"t": pd.date_range("2020-01-01", periods=2), "x": ["x0", "x1"]},
+    )
+    fname = f"{tmpdir}/foo.csv"
+    write_csv(a, fname)
+    with pytest.raises(ValueError, match=match):
+        update_csv(fname, delta)
+    xarray.testing.assert_identical(read_csv(fname), a)
+    assert os.listdir(tmpdir) == ["foo.csv"]
+
+
+def test_invalid_type(tmpdir):
+    a = xarray.DataArray(
+        [[1.0, 2.0], [3.0, 4.0]],
+        dims=["t", "x"],
+        coords={"t": pd.date_range("2020-01-01", periods=2), "x": ["x0", "x1"]},
+    )
+    with pytest.raises(TypeError, match="not a xarray"):
+        update_csv(f"{tmpdir}/foo.csv", a.to_pandas())
+
+
+def test_profile(tmpdir):
+    a = xarray.DataArray(
+        [[1.0, 2.0], [3.0, 4.0]],
+        dims=["t", "x"],
+        coords={"t": pd.date_range("2020-01-01", periods=2), "x": ["x0", "x1"]},
+    )
+    fname = f"{tmpdir}/foo.csv"
+    write_csv(a, fname)
+    with ndcsv.profile() as prof:
+        update_csv(fname, a[:1])
+    assert {r.func for r in prof.records} == {"update_csv"}
+    assert [r.phase for r in prof.records][-3:] == ["delta", "header", "merge"]
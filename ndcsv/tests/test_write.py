@@ -4,11 +4,15 @@ Normal use cases are tested in :mod:`test_roundtrip`
 
 import io
 
+import numpy as np
+import pandas as pd
 import pytest
 import xarray
 from numpy import nan
 
+import ndcsv.write
 from ndcsv import write_csv
+from ndcsv.write import _write_small
 
 
 @pytest.mark.parametrize(
@@ -68,3 +72,73 @@ def test_blank_coord(nancoord):
         buf = io.StringIO()
         with pytest.raises(ValueError, match=msg):
             write_csv(inp, buf)
+
+
+@pytest.mark.parametrize("digits", [0, -1])
+def test_significant_digits_invalid(digits):
+    a = xarray.DataArray([1.5])
+    with pytest.raises(ValueError, match="significant_digits"):
+        write_csv(a, significant_digits=digits)
+
+
+def test_layout_invalid():
+    a = xarray.DataArray([1.5])
+    with pytest.raises(ValueError, match="layout"):
+        write_csv(a, layout="foo")
+
+
+def test_validate_false():
+    """validate=False skips the checks for empty strings and NaNs"""
+    a = xarray.DataArray([10, 20], dims=["x"], coords={"x": ["", "x1"]})
+    with pytest.raises(ValueError, match="Empty string in index"):
+        write_csv(a)
+    assert write_csv(a, validate=False) == "x,\n,10\nx1,20\n"
+
+
+dates = pd.date_range("2017-01-01", periods=3)
+
+
+@pytest.mark.parametrize(
+    "a,fast",
+    [
+        (xarray.DataArray([1, 2, 3]), True),
+        (xarray.DataArray([nan, 1.5, 1e-20], dims=["x"], coords={"x": dates}), True),
+        (
+            xarray.DataArray([True, False], dims=["x"], coords={"x": ["x,0", 'x"1']}),
+            True,
+        ),
+        (
+            xarray.DataArray(
+                [[1.0, nan], [-0.0, 1e16]],
+                dims=["x", "y"],
+                coords={"x": [0.5, 1.0], "y": dates[:2]},
+            ),
+            True,
+        ),
+        (
+            xarray.DataArray(
+                [[1, 2]],
+                dims=["x", "y"],
+                coords={"x": dates[:1] + pd.Timedelta("1h"), "y": [True, False]},
+            ),
+            True,
+        ),
+        (xarray.DataArray(["foo"], dims=["x"]), False),
+        (xarray.DataArray(np.ones(2, dtype=np.float32), dims=["x"]), False),
+        (
+            xarray.DataArray(
+                [1], dims=["x"], coords={"x": dates[:1] + pd.Timedelta("1ms")}
+            ),
+            False,
+        ),
+        (xarray.DataArray([1], dims=["x"], coords={"x": [1], "y": ("x", [2])}), False),
+        (xarray.DataArray(np.ones((2, 2, 2))), False),
+        (xarray.DataArray(np.ones(5000)), False),
+    ],
+)
+def test_small_array(monkeypatch, a, fast):
+    """Small arrays are written without pandas, with the same output"""
+    assert _write_small(a, io.StringIO()) == fast
+    expect = write_csv(a)
+    monkeypatch.setattr(ndcsv.write, "_SMALL_ARRAY_SIZE", -1)
+    assert write_csv(a) == expect
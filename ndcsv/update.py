@@ -0,0 +1,279 @@
+"""Update the cells of an existing NDCSV file without loading it"""
+
+from __future__ import annotations
+
+import csv
+import io
+import os
+import re
+import stat
+import tempfile
+from collections.abc import Iterator
+from typing import TextIO, cast
+
+import numpy as np
+import pandas as pd
+import pshell as sh
+import xarray
+
+from ndcsv.profiling import _lap, _profiled
+from ndcsv.read import (
+    _CHUNK_ROWS,
+    _convert_coord,
+    _parse_header,
+    _record_lines,
+    _sniff_header,
+)
+from ndcsv.write import write_csv
+
+
+@_profiled("update_csv")
+def update_csv(
+    path: str,
+    delta: xarray.DataArray,
+    *,
+    significant_digits: int | None = None,
+) -> None:
+    """Merge the cells of an array into an existing NDCSV file.
+
+    The file is streamed block by block of rows, without ever loading it
+    whole. Every row of the file whose labels match a row of the delta has its
+    cells replaced, on the columns of the delta, with the values of the delta.
+    The rows of the delta that are not in the file are appended at its end;
+    their cells on the columns that are not in the delta are left empty
+    (NaN). All other rows are copied verbatim.
+
+    The result is written to a temporary file in the same directory, which
+    then atomically replaces the original file. Memory usage is bounded by
+    the size of the delta plus one block of rows.
+
+    :param str path:
+        Path to a .csv, .csv.gz, .csv.bz2, or .csv.xz file with 1 or more
+        dimensions
+    :param delta:
+        :class:`xarray.DataArray` with the same dims as the file, as written
+        by :func:`write_csv` with the default layout. It may have only some of
+        the labels on the rows and only some of the labels on the columns.
+        NaNs in the delta are written as NaNs.
+    :param int significant_digits:
+        See :func:`write_csv`. Only applies to the delta.
+    :raises ValueError:
+        If the index names or the names of the coords on the columns differ
+        from those of the file, or if the delta has labels on the columns that
+        are not in the file
+    """
+    if not isinstance(delta, xarray.DataArray):
+        raise TypeError("Input data is not a xarray.DataArray")
+    if delta.ndim == 0:
+        raise ValueError("Cannot update with a 0-dimensional array")
+
+    delta_rows = _Rows(write_csv(delta, significant_digits=significant_digits))
+    _lap("delta", delta_rows.header_text)
+
+    directory, fname = os.path.split(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(
+        prefix=f".{fname}.", suffix=os.path.splitext(path)[1], dir=directory
+    )
+    os.close(fd)
+    try:
+        os.chmod(tmp_path, stat.S_IMODE(os.stat(path).st_mode))
+        with sh.open(path) as src:
+            file_rows = _Rows(cast(TextIO, src))
+            columns = file_rows.match_columns(delta_rows)
+            _lap("header", file_rows.header_text)
+            with sh.open(tmp_path, "w") as dst:
+                _merge(file_rows, delta_rows, columns, cast(TextIO, dst))
+        # On Windows, a file can't be replaced while it's open
+        os.replace(tmp_path, path)
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+    _lap("merge")
+
+
+def _merge(
+    file_rows: _Rows, delta_rows: _Rows, columns: np.ndarray, dst: TextIO
+) -> None:
+    """Write the rows of the file, updated with the rows of the delta
+
+    :param columns:
+        Positions of the value columns of the delta among those of the file
+    """
+    num_index_col = file_rows.size.num_index_col
+    key_levels = file_rows.key_levels
+    delta_labels, delta_cells = delta_rows.load()
+    delta_text = [delta_labels[:, i] for i in key_levels]
+    delta_conv = [np.asarray(_convert_coord(x)) for x in delta_text]
+    delta_keys = _keys(delta_conv)
+    if not delta_keys.is_unique:
+        raise ValueError("The delta has duplicate labels on the rows")
+    matched = np.zeros(len(delta_keys), dtype=bool)
+    writer = csv.writer(dst, lineterminator="\n")
+    # In a 1-D file, an empty first cell of the body would make its row look
+    # like part of the header. Write it as nan, like write_csv does.
+    first_row = not file_rows.header.columns
+
+    dst.write(file_rows.header_text)
+    for raw, rows, _ in file_rows.blocks():
+        labels = np.array([row[:num_index_col] for row in rows])
+        labels = labels.reshape(len(rows), num_index_col)
+        conv = [np.asarray(_convert_coord(labels[:, i])) for i in key_levels]
+        if all(x.dtype.kind == y.dtype.kind for x, y in zip(conv, delta_conv)):
+            indexer = delta_keys.get_indexer(_keys(conv))
+        else:
+            # The labels of this block were converted to a different type than
+            # those of the delta. Compare numbers as numbers, e.g. 1.0 vs. 1,
+            # and anything else as text, e.g. 1 vs. "1".
+            block_levels = []
+            delta_levels = []
+            for level, x, y, y_text in zip(key_levels, conv, delta_conv, delta_text):
+                if x.dtype.kind == y.dtype.kind:
+                    block_levels.append(x)
+                    delta_levels.append(y)
+                elif x.dtype.kind in "iuf" and y.dtype.kind in "iuf":
+                    block_levels.append(x.astype(np.float64))
+                    delta_levels.append(y.astype(np.float64))
+                else:
+                    block_levels.append(labels[:, level])
+                    delta_levels.append(y_text)
+            indexer = _keys(delta_levels).get_indexer(_keys(block_levels))
+
+        for line, row, i in zip(raw, rows, indexer):
+            if i < 0:
+                dst.write(line)
+                first_row = False
+                continue
+            matched[i] = True
+            cells = row[num_index_col:]
+            cells += [""] * (file_rows.num_columns - len(cells))
+            for j, cell in zip(columns, delta_cells[i]):
+                cells[j] = cell
+            if first_row and cells == [""]:
+                cells = ["nan"]
+            writer.writerow(row[:num_index_col] + cells)
+            first_row = False
+
+    # Insert the new rows at the end
+    for i in np.flatnonzero(~matched):
+        cells = [""] * file_rows.num_columns
+        for j, cell in zip(columns, delta_cells[i]):
+            cells[j] = cell
+        if first_row and cells == [""]:
+            cells = ["nan"]
+        writer.writerow(delta_labels[i].tolist() + cells)
+        first_row = False
+
+
+def _keys(levels: list[np.ndarray]) -> pd.Index:
+    """Build an index to match the rows of the file and of the delta"""
+    if len(levels) == 1:
+        return pd.Index(levels[0])
+    return pd.MultiIndex.from_arrays(levels)
+
+
+class _Rows:
+    """Header and rows of an NDCSV file with 1 or more dimensions
+
+    :param buf:
+        Text buffer positioned at the start of the file, or its whole text
+    :param lines:
+        Optional empty list, which is populated with the lines of text read
+        to parse the header. If the file has 0 dimensions or is malformed,
+        this is the whole file.
+    """
+
+    def __init__(self, buf: TextIO | str, lines: list[str] | None = None):
+        if isinstance(buf, str):
+            buf = io.StringIO(buf)
+        self._buf = buf
+        self._lines = [] if lines is None else lines
+        rows, size = _sniff_header(buf, self._lines)
+        if size is None:
+            raise ValueError("Not an NDCSV file with 1 or more dimensions")
+        self.size = size
+        self.header_text = "".join(self._lines[: size.num_header_lines])
+        self.header = _parse_header(self.header_text, size.num_index_col)
+        self.num_columns = len(self.header.columns[0][1]) if self.header.columns else 1
+        # Non-index coords on the rows are formatted as `name (dim)`; match
+        # the rows on their index coords only.
+        names = self.header.index_names
+        self.key_levels = [
+            i for i, name in enumerate(names) if not re.match(r"(.+) \((.+)\)$", name)
+        ] or list(range(len(names)))
+        # Lines and rows read by _sniff_header after the header
+        self._pending = (
+            self._lines[size.num_header_lines :],
+            rows[size.num_header_rows :],
+        )
+
+    def match_columns(self, delta: _Rows) -> np.ndarray:
+        """Positions of the value columns of delta among those of self"""
+        if delta.header.index_names != self.header.index_names or [
+            name for name, _ in delta.header.columns
+        ] != [name for name, _ in self.header.columns]:
+            raise ValueError(
+                "The index names or the coords on the columns of the delta "
+                "differ from those in the file"
+            )
+        if not self.header.columns:
+            return np.array([0])
+        indexer = _columns_index(self).get_indexer(_columns_index(delta))
+        if (indexer < 0).any():
+            raise ValueError(
+                "The delta has labels on the columns that are not in the file"
+            )
+        return indexer
+
+    def blocks(self) -> Iterator[tuple[list[str], list[list[str]], list[int]]]:
+        """Iterate over the rows after the header, in blocks.
+
+        :returns:
+            Tuples of (raw text of every row, cells of every row, line number
+            of the start of every row, counting from 1)
+        """
+        raw, rows = self._pending
+        line = self.size.num_header_lines + 1
+        numbers: list[int] = []
+        lines: list[str] = []
+        reader = csv.reader(_record_lines(self._buf, lines))
+        # A row may span multiple lines, if there are newlines in quotes
+        if rows:
+            numbers = [line]
+            line += len(raw)
+            raw = ["".join(raw)]
+            # _sniff_header dropped the trailing empty cells; parse it again
+            (row,) = csv.reader(io.StringIO(raw[0]))
+            rows = [[cell.strip() for cell in row]]
+
+        for row in reader:
+            text = "".join(lines)
+            num_lines = len(lines)
+            lines.clear()
+            if row:
+                # Not a blank line
+                raw.append(text)
+                rows.append([cell.strip() for cell in row])
+                numbers.append(line)
+            line += num_lines
+            if len(rows) == _CHUNK_ROWS:
+                yield raw, rows, numbers
+                raw, rows, numbers = [], [], []
+        if rows:
+            yield raw, rows, numbers
+
+    def load(self) -> tuple[np.ndarray, list[list[str]]]:
+        """Read the whole body. Only for the delta.
+
+        :returns:
+            Tuple of (labels on the rows, as a 2-D array of text with shape
+            (rows, index columns), value cells of every row)
+        """
+        n = self.size.num_index_col
+        rows = [row for _, block, _ in self.blocks() for row in block]
+        labels = np.array([row[:n] for row in rows]).reshape(len(rows), n)
+        return labels, [row[n:] for row in rows]
+
+
+def _columns_index(rows: _Rows) -> pd.Index:
+    """Labels on the columns of a file with 2 or more dimensions"""
+    return pd.MultiIndex.from_arrays([values for _, values in rows.header.columns])
@@ -7,19 +7,31 @@ from __future__ import annotations
 
 import csv
 import io
-from typing import IO, Literal, overload
+from collections.abc import Hashable
+from typing import IO, Any, Literal, TextIO, TypeVar, cast, overload
 
+import numpy as np
 import pandas as pd
 import pshell as sh
 import xarray
 
+from ndcsv.profiling import Progress, _lap, _profiled
 from ndcsv.proper_unstack import proper_unstack
+from ndcsv.read import _sniff_header
+
+T = TypeVar("T", xarray.DataArray, pd.Series, pd.DataFrame)
 
 
 @overload
 def write_csv(
     array: xarray.DataArray | pd.Series | pd.DataFrame,
     path_or_buf: str | IO,
+    *,
+    significant_digits: int | None = None,
+    layout: Literal["default", "auto"] = "default",
+    validate: bool = True,
+    progress: Progress | None = None,
+    mode: Literal["w", "a"] = "w",
 ) -> None: ...
 
 
@@ -27,12 +39,25 @@ def write_csv(
 def write_csv(
     array: xarray.DataArray | pd.Series | pd.DataFrame,
     path_or_buf: Literal[None] = None,
+    *,
+    significant_digits: int | None = None,
+    layout: Literal["default", "auto"] = "default",
+    validate: bool = True,
+    progress: Progress | None = None,
+    mode: Literal["w", "a"] = "w",
 ) -> str: ...
 
 
+@_profiled("write_csv")
 def write_csv(
     array: xarray.DataArray | pd.Series | pd.DataFrame,
     path_or_buf: str | IO | None = None,
+    *,
+    significant_digits: int | None = None,
+    layout: Literal["default", "auto"] = "default",
+    validate: bool = True,
+    progress: Progress | None = None,
+    mode: Literal["w", "a"] = "w",
 ) -> str | None:
     """Write an n-dimensional array to an NDCSV file.
 
@@ -40,7 +65,7 @@ def write_csv(
     dimensions, all dimensions beyond the first are automatically stacked
     together on the columns of the CSV file; if you want to stack dimensions on
     the rows you'll need to manually invoke :meth:`xarray.DataArray.stack`
-    beforehand.
+    beforehand, or let ``layout="auto"`` choose for you.
 
     This function is conceptually similar to :meth:`pandas.DataFrame.to_csv`,
     except that none of the many configuration settings is made available to
@@ -61,20 +86,101 @@ def write_csv(
           is inferred automatically)
         - file-like object open for writing
         - None (the result is returned as a string)
+
+    :param int significant_digits:
+        Optional. Round floating point data to this many significant digits
+        before writing it, in order to produce smaller files. Rounding is
+        vectorized and the output remains plain NDCSV, so :func:`read_csv`
+        needs no hints to read it back. Coords and non-float data are never
+        rounded. Default: write floats at full precision.
+
+    :param str layout:
+        How to flatten a :class:`xarray.DataArray` with 2 or more dimensions
+        onto the rows and columns of the CSV file. One of:
+
+        default
+            Write the array exactly as it is, stacking all dimensions beyond
+            the first on the columns.
+        auto
+            Unstack any dense MultiIndex, then estimate file size and parsing
+            cost of all the representations that :func:`read_csv` loads back
+            to the same array, and pick the cheapest one. Candidates include a
+            1-dimensional file where all dimensions are stacked on the rows,
+            which omits the NaN cells of sparse arrays altogether.
+
+        pandas objects are always written as they are.
+
+    :param bool validate:
+        Set to False to skip checking the coords for empty strings and NaNs,
+        which cannot be read back. Only use for trusted producers that build
+        the coords themselves. Default: True.
+
+    :param progress:
+        Optional function ``progress(done, total)``, which is invoked after
+        writing each chunk of rows with the number of rows of the CSV body
+        written so far and the total number of rows.
+
+    :param str mode:
+        One of:
+
+        w
+            Overwrite the file (default)
+        a
+            Append the rows of the array to the end of an existing file,
+            without reading or rewriting its body; the cost is proportional to
+            the size of the array, not of the file. Compressed files are
+            appended a new gzip, bz2, or xz stream, which :func:`read_csv`
+            reads seamlessly. Only the header of the file is read, to verify
+            that it is exactly the header that the array would be written
+            with: same index names and the same coords on the columns. If the
+            file doesn't exist, it is created as with ``mode="w"``.
+
+            The rows are appended as they are; this doesn't check that the
+            labels on the rows of the array are not already in the file. The
+            array must have at least 1 dimension, and ``path_or_buf`` must be
+            a file path.
     """
+    if layout not in ("default", "auto"):
+        raise ValueError(f"layout must be 'default' or 'auto'; got {layout!r}")
+    if mode == "a":
+        if not isinstance(path_or_buf, str):
+            raise ValueError("mode='a' requires a file path")
+        _append_csv(
+            array,
+            path_or_buf,
+            significant_digits=significant_digits,
+            layout=layout,
+            validate=validate,
+            progress=progress,
+        )
+        return None
+    if mode != "w":
+        raise ValueError(f"mode must be 'w' or 'a'; got {mode!r}")
+
     if path_or_buf is None:
         buf = io.StringIO()
-        write_csv(array, buf)
+        write_csv(
+            array,
+            buf,
+            significant_digits=significant_digits,
+            layout=layout,
+            validate=validate,
+            progress=progress,
+        )
         return buf.getvalue()
 
+    if significant_digits is not None:
+        array = _round_array(array, significant_digits)
+        _lap("round", array)
+
     if isinstance(path_or_buf, str):
         # Automatically detect .csv or .csv.gz extension
         with sh.open(path_or_buf, "w") as fh:
-            write_csv(array, fh)
+            write_csv(array, fh, layout=layout, validate=validate, progress=progress)
     elif isinstance(array, xarray.DataArray):
-        _write_csv_dataarray(array, path_or_buf)
+        _write_csv_dataarray(array, path_or_buf, layout, validate, progress)
     elif isinstance(array, (pd.Series, pd.DataFrame)):
-        _write_csv_pandas(array, path_or_buf)
+        _write_csv_pandas(array, path_or_buf, validate, progress)
     else:
         raise TypeError(
             "Input data is not a xarray.DataArray, pd.Series or pd.DataFrame"
@@ -83,13 +189,410 @@ def write_csv(
     return None
 
 
-def _write_csv_dataarray(array: xarray.DataArray, buf: IO) -> None:
+def compile_writer(template: xarray.DataArray) -> CompiledWriter:
+    """Prepare to write many arrays with the same dims and coords and different
+    data, e.g. many scenarios of the same hypercube.
+
+    The expensive steps of :func:`write_csv` which depend only on the dims and
+    coords - stacking, validation, and formatting of the header and of the row
+    labels - are performed once here. The returned object then only needs to
+    format the data of each array.
+
+    Example::
+
+        >>> writer = ndcsv.compile_writer(arrays[0])
+        >>> for i, array in enumerate(arrays):
+        ...     writer.write_csv(array, f"scenario{i}.csv")
+
+    :param template:
+        :class:`xarray.DataArray` whose dims and coords are shared by all arrays
+        that will be written. Its data is ignored.
+    :returns:
+        :class:`CompiledWriter`
+    """
+    return CompiledWriter(template)
+
+
+class CompiledWriter:
+    """Output of :func:`compile_writer`. Do not instantiate directly."""
+
+    def __init__(self, template: xarray.DataArray):
+        if not isinstance(template, xarray.DataArray):
+            raise TypeError("Template is not a xarray.DataArray")
+        self._template = template
+        self._header = ""
+        self._prefixes: list[str] = []
+        self._positions = np.empty(0, dtype=np.intp)
+        self._missing: np.ndarray | None = None
+        self._is_series = False
+
+        if template.ndim == 0:
+            return
+
+        # Follow the elements of the data through all the stack, unstack and
+        # transpose operations of write_csv()
+        positions = template.copy(data=np.arange(template.size).reshape(template.shape))
+        obj = _dataarray_to_pandas(positions)
+        _check_empty_index(obj.index)
+        if obj.ndim > 1:
+            _check_empty_index(obj.columns)
+
+        buf = io.StringIO()
+        _write_header(obj, buf)
+        self._header = buf.getvalue()
+        self._is_series = obj.ndim == 1
+
+        pos = obj.to_numpy()
+        if pos.dtype.kind == "f":
+            # Unstacking a sparse MultiIndex created NaNs
+            self._missing = np.isnan(pos)
+            pos = np.where(self._missing, 0, pos)
+        self._positions = pos.astype(np.intp)
+
+        # Let pandas format the row labels, then split them by row
+        buf = io.StringIO()
+        obj.index.to_frame(index=False).to_csv(
+            buf, header=False, index=False, lineterminator="\n"
+        )
+        buf.seek(0)
+        line = io.StringIO()
+        writer = csv.writer(line, lineterminator=",")
+        for row in csv.reader(buf):
+            writer.writerow(row)
+            self._prefixes.append(line.getvalue())
+            line.seek(0)
+            line.truncate()
+
+    @overload
+    def write_csv(
+        self,
+        array: xarray.DataArray,
+        path_or_buf: str | IO,
+        *,
+        significant_digits: int | None = None,
+    ) -> None: ...
+
+    @overload
+    def write_csv(
+        self,
+        array: xarray.DataArray,
+        path_or_buf: Literal[None] = None,
+        *,
+        significant_digits: int | None = None,
+    ) -> str: ...
+
+    @_profiled("CompiledWriter.write_csv")
+    def write_csv(
+        self,
+        array: xarray.DataArray,
+        path_or_buf: str | IO | None = None,
+        *,
+        significant_digits: int | None = None,
+    ) -> str | None:
+        """Write an array with the same dims and coords as the template to an
+        NDCSV file. The output is identical to :func:`write_csv`.
+
+        :param array:
+            :class:`xarray.DataArray` with the same dims, shape and coords as
+            the template
+        :param path_or_buf:
+            See :func:`write_csv`
+        :param int significant_digits:
+            See :func:`write_csv`
+        :raises ValueError:
+            If the dims, shape, or coords differ from the template
+        """
+        if path_or_buf is None:
+            buf = io.StringIO()
+            self.write_csv(array, buf, significant_digits=significant_digits)
+            return buf.getvalue()
+
+        if isinstance(path_or_buf, str):
+            with sh.open(path_or_buf, "w") as fh:
+                self.write_csv(array, fh, significant_digits=significant_digits)
+            return None
+
+        if not isinstance(array, xarray.DataArray):
+            raise TypeError("Input data is not a xarray.DataArray")
+        if (
+            array.dims != self._template.dims
+            or array.shape != self._template.shape
+            or not array.coords.equals(self._template.coords)
+        ):
+            raise ValueError("Array does not match the template of compile_writer()")
+        if significant_digits is not None:
+            array = _round_array(array, significant_digits)
+            _lap("round", array)
+
+        data = array.values.ravel()
+        if (
+            array.ndim == 0
+            or data.dtype.kind not in "biuf"
+            or (self._missing is not None and data.dtype.kind != "f")
+        ):
+            # Strings, dates, and objects need quoting and special formatting
+            write_csv(array, path_or_buf)
+            return None
+
+        data = data[self._positions]
+        if self._missing is not None:
+            data[self._missing] = np.nan
+
+        # This is the same as what pandas.DataFrame.to_csv() does
+        cells = data.astype(str)
+        if data.dtype.kind == "f":
+            na_rep = ""
+            if self._is_series and np.isnan(data[0]):
+                # See _write_csv_pandas()
+                na_rep = "nan"
+            cells[np.isnan(data)] = na_rep
+
+        lines = cells.tolist() if self._is_series else map(",".join, cells.tolist())
+        text = "".join(
+            f"{prefix}{line}\n" for prefix, line in zip(self._prefixes, lines)
+        )
+        _lap("format", data)
+        path_or_buf.write(self._header)
+        path_or_buf.write(text)
+        _lap("write", len(self._header) + len(text))
+        return None
+
+
+def _append_csv(
+    array: xarray.DataArray | pd.Series | pd.DataFrame,
+    path: str,
+    **kwargs: Any,
+) -> None:
+    """Implement :func:`write_csv` with ``mode="a"``"""
+    text = write_csv(array, **kwargs)
+    try:
+        with sh.open(path) as fh:
+            old_rows, old_size = _sniff_header(cast(TextIO, fh), [])
+    except FileNotFoundError:
+        with sh.open(path, "w") as fh:
+            fh.write(text)
+        return
+
+    buf = io.StringIO(text)
+    lines: list[str] = []
+    new_rows, new_size = _sniff_header(buf, lines)
+    if new_size is None:
+        raise ValueError("Cannot append a 0-dimensional array")
+    if not old_rows:
+        # Empty file
+        body = text
+    elif (
+        old_size is None
+        or old_size.num_index_col != new_size.num_index_col
+        or old_rows[: old_size.num_header_rows] != new_rows[: new_size.num_header_rows]
+    ):
+        raise ValueError(
+            f"Cannot append to {path}: the index names or the coords on the "
+            "columns of the array differ from those in the file"
+        )
+    else:
+        body = "".join(lines[new_size.num_header_lines :]) + buf.read()
+
+    with sh.open(path, "a") as fh:
+        fh.write(body)
+    _lap("write", len(body))
+
+
+def _round_array(array: T, digits: int) -> T:
+    """Round all float data of a DataArray, Series or DataFrame to the given
+    number of significant digits.
+    """
+    if digits < 1:
+        raise ValueError(f"significant_digits must be 1 or greater; got {digits}")
+
+    if isinstance(array, xarray.DataArray):
+        if array.dtype.kind == "f":
+            array = array.copy(data=_round_significant(array.values, digits))
+    elif isinstance(array, pd.Series):
+        if array.dtype.kind == "f":
+            array = pd.Series(
+                _round_significant(array.to_numpy(), digits),
+                index=array.index,
+                name=array.name,
+            )
+    elif isinstance(array, pd.DataFrame):
+        float_cols = [i for i, dtype in enumerate(array.dtypes) if dtype.kind == "f"]
+        if float_cols:
+            array = array.copy()
+            for i in float_cols:
+                array.iloc[:, i] = _round_significant(
+                    array.iloc[:, i].to_numpy(), digits
+                )
+    # Anything else: let write_csv() raise TypeError
+    return array
+
+
+def _round_significant(x: np.ndarray, digits: int) -> np.ndarray:
+    """Round an array of floats to the given number of significant digits.
+
+    Unlike ``np.round(x / 10**e) * 10**e``, which leaves noise such as
+    0.30000000000000004 behind, this only ever multiplies or divides an
+    integer by an exactly representable power of ten (up to 1e22), so that the
+    result is the float closest to the rounded decimal and its shortest repr
+    has at most ``digits`` significant digits.
+
+    Scaling ``x`` by a power of ten before rounding it to an integer is itself
+    inexact. The elements where this could change the result, because the
+    scaled value is above 2**53 or within one ulp of a half-integer, are
+    rounded through string formatting instead, as well as the few elements
+    that would need a power of ten larger than 1e22. In practice, this means
+    all elements for ``digits >= 17`` and many for ``digits == 16``.
+    NaN, inf and zero are returned unaltered.
+    """
+    dtype = x.dtype
+    shape = x.shape
+    x = np.asarray(x, dtype=np.float64).ravel()
+    absx = np.abs(x)
+    with np.errstate(divide="ignore", invalid="ignore", over="ignore"):
+        exp = np.floor(np.log10(absx))
+        exp[~np.isfinite(exp)] = 0
+        # log10 may be off by one close to powers of ten
+        exp += absx >= 10.0 ** (exp + 1)
+        exp -= absx < 10.0**exp
+
+    shift = digits - 1 - exp
+    fast = (np.abs(shift) <= 22) & np.isfinite(x)
+    scale = 10.0 ** np.where(fast, np.abs(shift), 0)
+    with np.errstate(invalid="ignore", over="ignore"):
+        scaled = np.where(shift >= 0, x * scale, x / scale)
+        rounded = np.round(scaled)
+        # The exact scaled value is within one ulp of the computed one; it may
+        # round the other way if there's a half-integer in between.
+        absscaled = np.abs(scaled)
+        fast &= absscaled < 2**53
+        fast &= 0.5 - np.abs(scaled - rounded) > np.spacing(absscaled)
+        out = np.where(shift >= 0, rounded / scale, rounded * scale)
+
+    slow = ~fast & np.isfinite(x)
+    if slow.any():
+        out[slow] = [float(f"{v:.{digits - 1}e}") for v in x[slow].tolist()]
+    return out.astype(dtype, copy=False).reshape(shape)
+
+
+def _write_csv_dataarray(
+    array: xarray.DataArray,
+    buf: IO,
+    layout: str = "default",
+    validate: bool = True,
+    progress: Progress | None = None,
+) -> None:
     """Write :class:`xarray.DataArray` to buffer"""
     if array.ndim == 0:
         # 0D (scalar) array
         buf.write(f"{array.values}\n")
+        _lap("body", array)
+        if progress is not None:
+            progress(1, 1)
+        return
+
+    if layout == "default" and _write_small(array, buf, validate, progress):
         return
 
+    obj = _dataarray_to_pandas(array, layout)
+    _lap("to_pandas", obj)
+    _write_csv_pandas(obj, buf, validate, progress)
+
+
+#: Arrays with up to this many elements are written by :func:`_write_small`
+_SMALL_ARRAY_SIZE = 2**12
+
+
+def _write_small(
+    array: xarray.DataArray,
+    buf: IO,
+    validate: bool = True,
+    progress: Progress | None = None,
+) -> bool:
+    """Fast path of write_csv() for small arrays, e.g. config tables or FX
+    rates, where the fixed overhead of converting to pandas would dominate.
+
+    Format the labels and the values with numpy and write them with
+    :mod:`csv`. The output is identical to :func:`_write_csv_pandas`.
+    Only arrays of numbers or bools with 1 or 2 dimensions, without
+    MultiIndex and without non-index or scalar coords are supported.
+
+    :returns:
+        True if the array has been written; False, without writing anything,
+        if it's not supported.
+    """
+    if (
+        array.ndim not in (1, 2)
+        or array.size > _SMALL_ARRAY_SIZE
+        or array.dtype.kind not in "biuf"
+        or (array.dtype.kind == "f" and array.dtype != np.float64)
+        or any(k not in array.dims for k in array.coords)
+    ):
+        return False
+    indexes = [array.get_index(dim) for dim in array.dims]
+    labels = _format_labels(indexes[0])
+    if labels is None or any(isinstance(idx, pd.MultiIndex) for idx in indexes):
+        return False
+
+    if validate:
+        for idx in indexes:
+            _check_empty_index(idx)
+        _lap("validate")
+
+    writer = csv.writer(buf, lineterminator="\n")
+    if array.ndim == 1:
+        writer.writerow([array.dims[0], ""])
+    else:
+        writer.writerow([array.dims[1], *indexes[1].values.tolist()])
+        writer.writerow([array.dims[0]] + [""] * array.shape[1])
+    _lap("header")
+
+    # This is the same as what pandas.DataFrame.to_csv() does; see also
+    # _write_csv_pandas() and CompiledWriter.write_csv()
+    data = array.values
+    cells = data.astype(str)
+    if data.dtype.kind == "f":
+        nans = np.isnan(data)
+        cells[nans] = "nan" if array.ndim == 1 and nans[0] else ""
+    if array.ndim == 1:
+        writer.writerows(zip(labels, cells.tolist()))
+    else:
+        writer.writerows([label, *row] for label, row in zip(labels, cells.tolist()))
+    if progress is not None:
+        progress(array.shape[0], array.shape[0])
+    _lap("body", array)
+    return True
+
+
+def _format_labels(idx: pd.Index) -> list[str] | None:
+    """Format the labels of a dimension on the rows the same way as
+    :meth:`pandas.DataFrame.to_csv`. Return None for anything that
+    :func:`_write_small` doesn't support.
+    """
+    values = idx.to_numpy()
+    kind = values.dtype.kind
+    if kind in "biu" or (kind == "f" and not np.isnan(values).any()):
+        return values.astype(str).tolist()
+    if kind == "O":
+        values = values.tolist()
+        return values if all(isinstance(v, str) for v in values) else None
+    if kind == "M" and not np.isnat(values).any():
+        # pandas omits the time when all labels are at midnight
+        days = values.astype("datetime64[D]")
+        if (days == values).all():
+            return days.astype(str).tolist()
+        seconds = values.astype("datetime64[s]")
+        if (seconds == values).all():
+            return [v.replace("T", " ") for v in seconds.astype(str).tolist()]
+    return None
+
+
+def _dataarray_to_pandas(
+    array: xarray.DataArray, layout: str = "default"
+) -> pd.Series | pd.DataFrame:
+    """Convert a :class:`xarray.DataArray` with 1 or more dimensions to a
+    :class:`pandas.Series` or :class:`pandas.DataFrame`, incorporating all
+    dimensions beyond the second and all non-index coords into MultiIndexes.
+    """
     # Keep track of non-index coordinates
     # Note that scalar (a-dimensional) coords are silently discarded
     coord_renames = {}
@@ -104,7 +607,9 @@ def _write_csv_dataarray(array: xarray.DataArray, buf: IO) -> None:
                 coord_renames[k] = f"{k} ({v.dims[0]})"
     array = array.rename(coord_renames)
 
-    if array.ndim > 2:
+    if layout == "auto":
+        array = _auto_layout(array)
+    elif array.ndim > 2:
         # Automatically stack dims beyond the first.
         # In the case where there's already a MultiIndex on a dim beyond
         # the first, first unstack them and then stack them again back all
@@ -131,23 +636,151 @@ def _write_csv_dataarray(array: xarray.DataArray, buf: IO) -> None:
             indexes = {dim if from_mindex else f"{dim}_mindex": list(array[dim].coords)}
             array = array.set_index(indexes)
 
-    _write_csv_pandas(array.to_pandas(), buf)
+    return array.to_pandas()
 
 
-def _write_csv_pandas(array: pd.Series | pd.DataFrame, buf: IO) -> None:
-    """Write :class:`pandas.Series` or :class:`pandas.DataFrame` to buffer"""
-    # Raise ValueError if there's empty strings in the header
-    _check_empty_index(array.index)
-    if array.ndim > 1:
-        _check_empty_index(array.columns)
+# Parsing cost of a CSV file, expressed in bytes of text, for each column
+# and for each label of a MultiIndex on the rows. These are on top of the
+# size of the file itself and reflect the fixed overhead of pandas.read_csv
+# (which creates an array for every column) and of unstacking.
+_COLUMN_COST = 100
+_ROW_LABEL_COST = 20
 
-    writer = csv.writer(buf, lineterminator="\n")
-    if array.index.name is None:
-        array.index.name = "dim_0"
 
+def _auto_layout(array: xarray.DataArray) -> xarray.DataArray:
+    """Implement ``write_csv(layout="auto")``.
+
+    Return an array with 1 or 2 dimensions, which may be stacked and may have
+    had its NaN elements dropped, that reads back to ``array`` with
+    :func:`~ndcsv.read_csv`.
+    """
+    # Unstack MultiIndexes, as long as this doesn't create any NaNs and
+    # there are no non-index coords that would become multi-dimensional.
+    for dim in array.dims:
+        idx = array.get_index(dim)
+        if (
+            isinstance(idx, pd.MultiIndex)
+            and idx.is_unique
+            and int(np.prod(idx.levshape)) == len(idx)
+            and all(
+                v.dims != (dim,) or k == dim or k in idx.names
+                for k, v in array.coords.items()
+            )
+        ):
+            # Note: unstacked dims end up on the right
+            array = proper_unstack(array, dim)
+
+    if array.ndim < 2:
+        return array
+
+    dims = array.dims
+    sizes = [array.sizes[dim] for dim in dims]
+    label_len = {dim: _mean_label_len(array, dim) for dim in dims}
+
+    # Sample the data to estimate the length of a cell
+    values = array.values.ravel()
+    notnull: np.ndarray | None = None
+    nnz = values.size
+    if values.dtype.kind in "fcOmM":
+        notnull = pd.notna(values)
+        nnz = int(notnull.sum())
+    sample = values[:: max(1, values.size // 1000)]
+    sample = sample[pd.notna(sample)]
+    value_len = 1.0
+    if sample.size:
+        value_len += float(pd.Series(sample).astype(str).str.len().mean())
+
+    # Enumerate the row/columns splits that read_csv() returns with the
+    # dimensions in the original order. Rows MultiIndex + flat columns yields
+    # (columns, *rows); all other layouts yield (*rows, *columns).
+    candidates: list[tuple[tuple, tuple, bool]] = [(dims[:1], dims[1:], False)]
+    candidates += [(dims[:k], dims[k:], False) for k in range(2, len(dims) - 1)]
+    if len(dims) > 2:
+        candidates.append((dims[1:], dims[:1], False))
+    candidates.append((dims, (), False))
+    if nnz < values.size:
+        candidates.append((dims, (), True))
+
+    def cost(rows: tuple, cols: tuple, dropna: bool) -> float:
+        nrows = int(np.prod([sizes[dims.index(d)] for d in rows]))
+        ncols = int(np.prod([sizes[dims.index(d)] for d in cols]))
+        if dropna:
+            nrows = nnz
+            body = nnz * value_len
+        else:
+            body = nnz * value_len + (nrows * ncols - nnz)
+        size = sum(ncols * label_len[d] for d in cols)
+        size += nrows * sum(label_len[d] for d in rows) + body
+        return (
+            size
+            + _COLUMN_COST * ncols
+            + (_ROW_LABEL_COST * nrows * len(rows) if len(rows) > 1 else 0)
+        )
+
+    # Sort is stable: on a tie, prefer the default layout
+    for rows, cols, dropna in sorted(candidates, key=lambda c: cost(*c)):
+        if dropna:
+            assert notnull is not None
+            if not _first_seen_order_preserved(notnull, sizes):
+                continue
+            array = array.stack(__rows__=rows)
+            return array.isel(__rows__=np.flatnonzero(notnull))
+        if len(rows) > 1:
+            array = array.stack(__rows__=rows)
+        if len(cols) > 1:
+            array = array.stack(__columns__=cols)
+        if cols:
+            array = array.transpose(
+                "__rows__" if len(rows) > 1 else rows[0],
+                "__columns__" if len(cols) > 1 else cols[0],
+            )
+        return array
+    raise AssertionError("unreachable")  # pragma: nocover
+
+
+def _mean_label_len(array: xarray.DataArray, dim: Hashable) -> float:
+    """Estimated number of characters, including the separator, that are
+    needed to write the labels of a dimension on a row or column
+    """
+    coords = [v for v in array.coords.values() if v.dims == (dim,)]
+    if dim not in array.coords:
+        coords.append(array[dim])
+    return sum(
+        1 + float(np.mean(v.to_index().astype(str).str.len())) for v in coords if v.size
+    )
+
+
+def _first_seen_order_preserved(notnull: np.ndarray, sizes: list[int]) -> bool:
+    """Return True if, after dropping the NaN elements of a C-contiguous array
+    with the given shape, every label along every axis still appears at least
+    once and in the original order
+    """
+    idx = np.unravel_index(np.flatnonzero(notnull), sizes)
+    return all(
+        np.array_equal(pd.unique(i), np.arange(size)) for i, size in zip(idx, sizes)
+    )
+
+
+def _write_csv_pandas(
+    array: pd.Series | pd.DataFrame,
+    buf: IO,
+    validate: bool = True,
+    progress: Progress | None = None,
+) -> None:
+    """Write :class:`pandas.Series` or :class:`pandas.DataFrame` to buffer"""
+    if validate:
+        # Raise ValueError if there's empty strings in the header
+        _check_empty_index(array.index)
+        if array.ndim > 1:
+            _check_empty_index(array.columns)
+        _lap("validate")
+
+    _write_header(array, buf)
+    _lap("header")
+
+    # Keep the output CSV as clean as possible
+    na_rep = ""
     if array.ndim == 1:
-        # pd.Series. Write header by hand.
-        writer.writerow([*array.index.names, ""])
         # First element is empty
         if array.iloc[0] == "":
             # An empty cell would confuse read_csv() below. Make it explicit.
@@ -155,14 +788,42 @@ def _write_csv_pandas(array: pd.Series | pd.DataFrame, buf: IO) -> None:
             na_rep = "nan"
         elif pd.isna(array.iloc[0]):
             na_rep = "nan"
-        else:
-            # Keep the output CSV as clean as possible
-            na_rep = ""
-        array.to_csv(buf, header=None, na_rep=na_rep)
+
+    # Write one chunk of rows at a time, to report progress. This is the same
+    # chunk size that to_csv() uses internally, so the output is identical to
+    # a single call to to_csv(); this matters because pandas chooses the
+    # format of dates separately for each chunk.
+    nrows = len(array)
+    ncols = 1 if array.ndim == 1 else len(array.columns)
+    step = max(_CHUNK_CELLS // max(ncols, 1), 1)
+    for start in range(0, nrows, step):
+        array.iloc[start : start + step].to_csv(buf, header=None, na_rep=na_rep)
+        if progress is not None:
+            progress(min(start + step, nrows), nrows)
+    _lap("body", array)
+
+
+#: Number of cells formatted at once by :func:`_write_csv_pandas`. This is
+#: the same as the default chunk size of :meth:`pandas.DataFrame.to_csv`.
+_CHUNK_CELLS = 100_000
+
+
+def _write_header(array: pd.Series | pd.DataFrame, buf: IO) -> None:
+    """Write the header rows of a :class:`pandas.Series` or
+    :class:`pandas.DataFrame` to buffer. Set default names for unnamed
+    dimensions.
+    """
+    writer = csv.writer(buf, lineterminator="\n")
+    if array.index.name is None:
+        array.index.name = "dim_0"
+
+    if array.ndim == 1:
+        # pd.Series. Write header by hand.
+        writer.writerow([*array.index.names, ""])
     elif isinstance(array.columns, pd.MultiIndex):
         # pd.DataFrame with a MultiIndex on the columns.
         # Simplest case - works out of the box with Pandas!
-        array.to_csv(buf)
+        array.iloc[:0].to_csv(buf, lineterminator="\n")
     else:
         # pd.DataFrame without MultiIndex on the columns.
         # Write header by hand.
@@ -174,33 +835,40 @@ def _write_csv_pandas(array: pd.Series | pd.DataFrame, buf: IO) -> None:
         header_cols += array.columns.values.tolist()
         writer.writerow(header_cols)
         writer.writerow(list(array.index.names) + [""] * len(array.columns))
-        array.to_csv(buf, header=None)
 
 
 def _check_empty_index(idx: pd.Index) -> None:
     """Check for empty strings and NaNs in pd.Index
 
+    For a MultiIndex, only look at the levels and the codes, without ever
+    expanding its values.
+
     :param pandas.Index idx:
         Series.index, DataFrame.index, or DataFrame.columns.
     :raises ValueError:
         If one or more cells of the index are empty strings or NaN
     """
     if isinstance(idx, pd.MultiIndex):
-        for level, label in zip(idx.levels, idx.codes):
-            # A MultiIndex with NaNs will have a levels and -1 labels
+        for level, codes in zip(idx.levels, idx.codes):
+            # A MultiIndex with NaNs will have a levels and -1 codes
             # In this example, x = [NaN, 1.0] y = [0, 1]
             # MultiIndex(levels=[[1.0], [0, 1]],
-            #            labels=[[-1, -1, 0, 0], [0, 1, 0, 1]],
+            #            codes=[[-1, -1, 0, 0], [0, 1, 0, 1]],
             #            names=['x', 'y'])
-            if (label < 0).any():
+            if codes.size and codes.min() < 0:
                 raise ValueError("NaN in index")
             # Check for empty strings
             _check_empty_index(level)
-    else:
-        if (
-            idx.dtype.kind in "OU"  # Object or Unicode
-            and pd.Series(idx.str.contains("^$")).fillna(False).any()
-        ):
+    elif idx.dtype.kind in "biu":
+        # Integers and bools can't be NaN or empty
+        pass
+    elif idx.dtype.kind in "OU":  # Object or Unicode
+        # Look for NaNs and empty strings in a single pass
+        values = np.asarray(idx)
+        bad = pd.isna(values) | (values == "")
+        if bad.any():
+            if pd.isna(values[bad.argmax()]):
+                raise ValueError("NaN in index")
             raise ValueError("Empty string in index")
-        if pd.isna(idx).any():
-            raise ValueError("NaN in index")
+    elif idx.hasnans:
+        raise ValueError("NaN in index")